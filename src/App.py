@@ -9,7 +9,15 @@ from components.dashboard_tabs import (
     render_tab_comex,
     render_tab_harvard,
     render_tab_comtrade,
+    render_tab_cnae,
+    render_tab_mensal,
+    render_tab_municipal,
 )
+from components.debug_panel import iniciar_rastreio, render_painel
+from components.streamlit_runtime import carregar_ou_parar, instalar
+
+# O núcleo (core) não depende do Streamlit: aqui ele passa a usar os caches do app
+instalar()
 
 # Configuração inicial do Streamlit
 st.set_page_config(
@@ -18,9 +26,12 @@ st.set_page_config(
     initial_sidebar_state="collapsed",
 )
 
+# Rastreio de desempenho por rerun (painel escondido, ligado com ?debug=1 na URL)
+rerun_rastreado = iniciar_rastreio()
+
 # --- 1. CARREGAMENTO CENTRALIZADO DE DADOS ---
-# A função get_all_data já trata a checagem de arquivos e os decoradores @st.cache_data
-comexstat_df, harvard_df, comtrade_df = get_all_data()
+# get_all_data checa os arquivos (ErroDados se ausentes) e usa os caches do núcleo
+comexstat_df, harvard_df, comtrade_df = carregar_ou_parar(get_all_data)
 
 # %%
 st.title("Dashboard de Análise de Comércio Internacional 📊")
@@ -29,12 +40,23 @@ st.markdown(
 )
 
 # Criação e Renderização das Abas (Chama os componentes refatorados)
-tab_compare, tab_comex, tab_harvard, tab_comtrade = st.tabs(
+(
+    tab_compare,
+    tab_comex,
+    tab_harvard,
+    tab_comtrade,
+    tab_cnae,
+    tab_municipal,
+    tab_mensal,
+) = st.tabs(
     [
         "Análise Comparativa",
         "ComexStat",
         "Harvard Dataverse",
         "Comtrade",
+        "Setores CNAE",
+        "Municípios",
+        "Mensal",
     ]
 )
 
@@ -54,4 +76,19 @@ with tab_harvard:
 with tab_comtrade:
     render_tab_comtrade(comtrade_df)
 
+# Aba Setores CNAE (exportações alocadas às CNAEs pela tabela NCM x CNAE)
+with tab_cnae:
+    render_tab_cnae(comexstat_df)
+
+# Aba Municípios (lê os agregados do store municipal, não as bases acima)
+with tab_municipal:
+    render_tab_municipal()
+
+# Aba Mensal (roll-ups mensais, trimestrais, T12M e acumulado do store mensal)
+with tab_mensal:
+    render_tab_mensal()
+
+# Painel de desempenho (só com ?debug=1): gráfico de chama dos últimos reruns
+render_painel(rerun_rastreado)
+
 # %%
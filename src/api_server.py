@@ -0,0 +1,152 @@
+"""
+API HTTP local (JSON/Arrow) com rankings, VCR por seleção e consultas HS.
+
+Uso (a partir da raiz do projeto):
+    python src/api_server.py --porta 8765
+
+Rotas (GET):
+    /ranking?estado=Ceará&ano=2023&preset=padrao&pci=0.5&limite=50
+    /vcr?estados=Ceará,Piauí&anos=2023&hs=0201,2710
+    /hs?codigo=84  |  /hs?inicio=0100&fim=0500  |  /hs?q=soja
+    /saude
+Todas aceitam formato=json (padrão) ou formato=arrow (Arrow IPC stream).
+
+Exportações em arquivo (enviadas em partes, Transfer-Encoding: chunked):
+    /export/ranking?estado=Ceará&ano=2023&preset=padrao   (todos os produtos)
+    /export/vcr?estados=Ceará&anos=2023
+    /export/cubo?anos=2023&presets=padrao&estados=Ceará   (cubo do ranking_cli.py)
+Aceitam formato=csv (padrão), formato=parquet ou formato=xlsx.
+"""
+
+import argparse
+import json
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from core import runtime
+from core.data_loader import COMEXSTAT_PATH, HARVARD_PATH, versao_arquivos
+from data.query_service import ErroConsulta, ServicoConsultas
+from data.ranking_cube import carregar_bases
+
+logger = logging.getLogger("zpe.api")
+
+
+def criar_handler(servico):
+    """Classe de handler HTTP ligada a um ServicoConsultas."""
+
+    class Handler(BaseHTTPRequestHandler):
+        # Keep-alive: clientes reaproveitam a conexão entre requisições; sem Nagle,
+        # cabeçalho e corpo não esperam o ACK atrasado do cliente
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            if url.path == "/saude":
+                self._enviar(200, {"versao": servico.versao, "anos": servico.anos})
+                return
+
+            parametros = parse_qs(url.query)
+            if url.path.startswith("/export/"):
+                self._exportar(url.path, parametros)
+                return
+
+            etag = servico.etag(url.path, parametros)
+            if self.headers.get("If-None-Match") == etag:
+                self._enviar_bytes(304, b"", etag=etag)
+                return
+
+            try:
+                etag, tipo, corpo = servico.responder(url.path, parametros)
+            except KeyError:
+                self._enviar(404, {"erro": f"rota desconhecida: {url.path}"})
+            except ErroConsulta as erro:
+                # Só erros de parâmetro (com o nome dele) vão ao cliente; outros
+                # ValueError são falhas internas e não expõem o texto do Python
+                self._enviar(400, {"erro": str(erro)})
+            except Exception:
+                logger.exception("Falha ao responder %s", self.path)
+                self._enviar(500, {"erro": "falha interna"})
+            else:
+                self._enviar_bytes(200, corpo, tipo, etag)
+
+        def _exportar(self, rota, parametros):
+            try:
+                tipo, nome_arquivo, blocos = servico.exportacao(rota, parametros)
+            except KeyError:
+                self._enviar(404, {"erro": f"rota desconhecida: {rota}"})
+                return
+            except ErroConsulta as erro:
+                self._enviar(400, {"erro": str(erro)})
+                return
+            except Exception:
+                logger.exception("Falha ao preparar a exportação %s", self.path)
+                self._enviar(500, {"erro": "falha interna"})
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", tipo)
+            self.send_header("Content-Disposition", f'attachment; filename="{nome_arquivo}"')
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                for bloco in blocos:
+                    if bloco:  # bloco vazio encerraria a resposta chunked
+                        self.wfile.write(b"%X\r\n%b\r\n" % (len(bloco), bloco))
+                self.wfile.write(b"0\r\n\r\n")
+            except Exception:
+                # O status já foi enviado: sem o bloco final, o cliente vê a resposta
+                # truncada; a conexão é fechada em vez de reaproveitada
+                logger.exception("Falha durante a exportação %s", self.path)
+                self.close_connection = True
+
+        def _enviar(self, status, dados):
+            corpo = json.dumps(dados, ensure_ascii=False).encode("utf-8")
+            self._enviar_bytes(status, corpo, "application/json; charset=utf-8")
+
+        def _enviar_bytes(self, status, corpo, tipo=None, etag=None):
+            self.send_response(status)
+            if tipo:
+                self.send_header("Content-Type", tipo)
+            if etag:
+                self.send_header("ETag", etag)
+                self.send_header("Cache-Control", "no-cache")
+            self.send_header("Content-Length", str(len(corpo)))
+            self.end_headers()
+            if corpo:
+                self.wfile.write(corpo)
+
+        def log_message(self, formato, *args):
+            logger.debug(formato, *args)
+
+    return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+
+    # O cache LRU de respostas do serviço substitui o cache por função do núcleo
+    runtime.configurar(backend=runtime.SemCache())
+    comexstat_df, harvard_df = carregar_bases()
+    servico = ServicoConsultas(
+        comexstat_df, harvard_df, versao_arquivos(COMEXSTAT_PATH, HARVARD_PATH)
+    )
+
+    servidor = ThreadingHTTPServer((args.host, args.porta), criar_handler(servico))
+    logger.info("API em http://%s:%s", args.host, args.porta)
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
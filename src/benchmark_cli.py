@@ -0,0 +1,101 @@
+"""
+Benchmarks de carga, análise e renderização das abas sobre bases sintéticas.
+
+Uso (a partir da raiz do projeto):
+    python src/benchmark_cli.py --escalas 1x 10x
+    python src/benchmark_cli.py --casos process_comparison_data render_tab_compare
+    python src/benchmark_cli.py --salvar-baseline        # fixa a referência atual
+
+Cada execução é acrescentada a data_cache/benchmarks/historico.jsonl e comparada ao
+baseline (se houver); o código de saída é 1 quando há regressões.
+"""
+
+import argparse
+import logging
+import sys
+
+from benchmarks.casos import CASOS
+from benchmarks.suite import (
+    BASELINE_PATH,
+    HISTORICO_PATH,
+    TOLERANCIA_PADRAO,
+    carregar_baseline,
+    comparar,
+    curvas_de_escala,
+    executar_suite,
+    registrar,
+    salvar_baseline,
+)
+from data.synthetic import ESCALAS, SEMENTE_PADRAO
+
+
+def _formatar(valor, casas=1):
+    return "-" if valor is None else f"{valor:.{casas}f}"
+
+
+def _imprimir(registro, curvas):
+    print(
+        f"{'caso':<34} {'escala':<17} {'linhas':>10} {'mediana ms':>11} "
+        f"{'min ms':>9} {'RSS MB':>8} {'aloc MB':>8} {'Δ tempo':>8}"
+    )
+    for r in registro["resultados"]:
+        variacao = r.get("variacao", {}).get("tempo_mediano")
+        print(
+            f"{r['caso']:<34} {r['escala']:<17} {r['linhas']:>10} "
+            f"{r['tempo_mediano'] * 1000:>11.1f} {r['tempo_min'] * 1000:>9.1f} "
+            f"{_formatar(r['pico_rss_mb']):>8} {_formatar(r['pico_alocado_mb']):>8} "
+            f"{'-' if variacao is None else f'{variacao:+.0%}':>8}"
+        )
+
+    if any(len(c["pontos"]) > 1 for c in curvas.values()):
+        print("\nCurvas de escala (expoente do tempo em relação às linhas de entrada):")
+        for caso, curva in curvas.items():
+            if len(curva["pontos"]) > 1:
+                pontos = "  ".join(
+                    f"{escala}: {tempo * 1000:.1f} ms" for escala, _, tempo in curva["pontos"]
+                )
+                print(f"  {caso:<34} {pontos}  expoente={_formatar(curva['expoente'], 2)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--escalas", nargs="+", choices=list(ESCALAS), default=["1x", "10x"])
+    parser.add_argument("--casos", nargs="+", choices=list(CASOS), help="Padrão: todos")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--semente", type=int, default=SEMENTE_PADRAO)
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA_PADRAO)
+    parser.add_argument("--historico", default=HISTORICO_PATH)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument(
+        "--salvar-baseline", action="store_true", help="Grava esta execução como baseline"
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(message)s")
+
+    registro = executar_suite(args.escalas, args.casos, args.repeticoes, args.semente)
+
+    baseline = carregar_baseline(args.baseline)
+    regressoes = comparar(registro, baseline, args.tolerancia) if baseline else []
+    registrar(registro, args.historico)
+    if args.salvar_baseline:
+        salvar_baseline(registro, args.baseline)
+
+    _imprimir(registro, curvas_de_escala(registro))
+    if args.salvar_baseline:
+        print(f"\nBaseline gravado em {args.baseline}.")
+    if baseline is None:
+        if not args.salvar_baseline:
+            print(f"\nSem baseline em {args.baseline} (use --salvar-baseline).")
+    elif regressoes:
+        print(f"\nRegressões (tolerância {args.tolerancia:.0%}):")
+        for caso, escala, metrica, anterior, atual in regressoes:
+            print(f"  {caso} [{escala}] {metrica}: {anterior:.4g} -> {atual:.4g}")
+        return 1
+    else:
+        print(f"\nSem regressões em relação ao baseline de {baseline['quando']}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
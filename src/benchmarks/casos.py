@@ -0,0 +1,182 @@
+import os
+from functools import partial
+
+import streamlit as st
+from streamlit import logger as st_logger
+from streamlit.testing.v1 import AppTest
+
+from core import runtime
+from core.analytics import carregar_tabela_ncm_xls, classificar_cenarios_vcr
+from core.cnae_allocation import vcr_setorial_estados
+from core.complexity import complexidade_estados, complexidade_paises
+from core.config import PRESETS_PESOS, TARGET_STATE_NAME
+from core.data_loader import (
+    COMEXSTAT_PATH,
+    COMTRADE_PATH,
+    HARVARD_PATH,
+    NCM_CNAE_PATH,
+    load_data,
+)
+from core.metric_fetchers import obter_pci_e_distancia
+from core.product_space import espaco_produto_estados
+from core.vcr_series import serie_vcr_estados
+from core.vcr_calculators import calcular_vcr_ceara_brasil, calcular_vcr_dentro_selecao
+from data.data_processor import consolidar_metricas, process_comparison_data
+
+# Aba renderizada pelo script do AppTest: (função render_tab_*, argumentos).
+# O AppTest roda no mesmo processo, então o script lê daqui as bases já carregadas.
+_aba_atual = None
+
+SCRIPT_ABA = """
+from benchmarks import casos
+casos.renderizar_aba_atual()
+"""
+
+TEMPO_LIMITE_RENDER = 600
+
+# A tabela NCM x CNAE não faz parte das bases sintéticas: o caminho é resolvido na
+# importação, a partir da raiz do projeto, antes do chdir para o diretório da escala
+NCM_CNAE_PROJETO = os.path.abspath(NCM_CNAE_PATH)
+
+
+class CasoIndisponivel(Exception):
+    """O caso depende de um recurso ausente; a suíte o pula em vez de abortar."""
+
+
+def renderizar_aba_atual():
+    funcao, argumentos = _aba_atual
+    funcao(*argumentos)
+
+
+def carregar_bases():
+    """Bases da escala (diretório atual), lidas sem cache."""
+    return {
+        "comexstat": load_data(COMEXSTAT_PATH),
+        "harvard": load_data(HARVARD_PATH),
+        "comtrade": load_data(COMTRADE_PATH),
+    }
+
+
+# --- 1. FUNÇÕES DO NÚCLEO ---
+# Cada preparador recebe as bases e devolve (função sem argumentos, linhas de entrada)
+
+
+def _load_data(caminho, base):
+    return lambda bases: (partial(load_data, caminho), len(bases[base]))
+
+
+def _vcr_ceara_brasil(bases):
+    return partial(calcular_vcr_ceara_brasil, bases["comexstat"]), len(bases["comexstat"])
+
+
+def _vcr_dentro_selecao(bases):
+    # Seleção padrão da aba ComexStat ampliada para dois estados (base = seleção)
+    comex = bases["comexstat"]
+    filtrado = comex[comex["state"].isin([TARGET_STATE_NAME, "São Paulo"])]
+    return partial(calcular_vcr_dentro_selecao, filtrado, comex), len(comex)
+
+
+def _pci_e_distancia(bases):
+    return partial(obter_pci_e_distancia, bases["harvard"]), len(bases["harvard"])
+
+
+def _cenarios_vcr(bases):
+    df = consolidar_metricas(bases["comexstat"], bases["harvard"], TARGET_STATE_NAME)
+    return partial(classificar_cenarios_vcr, df), len(df)
+
+
+def _complexidade(funcao, base):
+    return lambda bases: (partial(funcao, bases[base]), len(bases[base]))
+
+
+def _espaco_produto(bases):
+    executar = partial(espaco_produto_estados, bases["comexstat"], bases["harvard"])
+    return executar, len(bases["comexstat"]) + len(bases["harvard"])
+
+
+def _vcr_setorial(bases):
+    df_ncm = carregar_tabela_ncm_xls(NCM_CNAE_PROJETO)
+    if df_ncm is None:
+        raise CasoIndisponivel(f"tabela NCM x CNAE não encontrada em '{NCM_CNAE_PROJETO}'")
+    return partial(vcr_setorial_estados, bases["comexstat"], df_ncm), len(bases["comexstat"])
+
+
+def _process_comparison(bases):
+    executar = partial(
+        process_comparison_data,
+        bases["comexstat"],
+        bases["harvard"],
+        PRESETS_PESOS["padrao"],
+    )
+    return executar, len(bases["comexstat"]) + len(bases["harvard"])
+
+
+# --- 2. ABAS DO DASHBOARD (HEADLESS, VIA AppTest) ---
+
+
+def _render(nome_funcao, nomes_bases, rerun=False):
+    """
+    Renderização de uma aba sem navegador. A frio, os caches do Streamlit são
+    limpos antes de cada execução; com rerun=True, mede-se o rerun com caches quentes
+    (o que o usuário sente ao mexer num controle).
+    """
+
+    def preparar(bases):
+        from components import dashboard_tabs
+        from components.streamlit_runtime import instalar
+
+        global _aba_atual
+        instalar()  # núcleo nos caches do Streamlit, como no App.py
+        _aba_atual = (getattr(dashboard_tabs, nome_funcao), [bases[n] for n in nomes_bases])
+        app = AppTest.from_string(SCRIPT_ABA, default_timeout=TEMPO_LIMITE_RENDER)
+        if rerun:
+            app.run()
+
+        def executar():
+            if not rerun:
+                st.cache_data.clear()
+                st.cache_resource.clear()
+            app.run()
+            if app.exception:
+                raise RuntimeError(f"{nome_funcao}: {app.exception[0].value}")
+
+        return executar, sum(len(bases[n]) for n in nomes_bases)
+
+    return preparar
+
+
+_ABAS = {
+    "render_tab_compare": ["comexstat", "harvard", "comtrade"],
+    "render_tab_comex": ["comexstat"],
+    "render_tab_harvard": ["harvard"],
+    "render_tab_comtrade": ["comtrade"],
+}
+
+# Ordem de execução: funções do núcleo (sem cache) antes das abas, que instalam o
+# backend de cache do Streamlit no processo
+CASOS = {
+    "load_data:comexstat": _load_data(COMEXSTAT_PATH, "comexstat"),
+    "load_data:harvard": _load_data(HARVARD_PATH, "harvard"),
+    "load_data:comtrade": _load_data(COMTRADE_PATH, "comtrade"),
+    "calcular_vcr_ceara_brasil": _vcr_ceara_brasil,
+    "calcular_vcr_dentro_selecao": _vcr_dentro_selecao,
+    "obter_pci_e_distancia": _pci_e_distancia,
+    "classificar_cenarios_vcr": _cenarios_vcr,
+    "process_comparison_data": _process_comparison,
+    "complexidade_estados": _complexidade(complexidade_estados, "comexstat"),
+    "complexidade_paises": _complexidade(complexidade_paises, "harvard"),
+    "espaco_produto_estados": _espaco_produto,
+    "serie_vcr_estados": _complexidade(serie_vcr_estados, "comexstat"),
+    "vcr_setorial_estados": _vcr_setorial,
+    **{nome: _render(nome, bases) for nome, bases in _ABAS.items()},
+    **{f"{nome}:rerun": _render(nome, bases, rerun=True) for nome, bases in _ABAS.items()},
+}
+
+
+def preparar_processo():
+    """
+    Núcleo sem cache (cada repetição mede o cálculo, não um acerto de cache) e sem os
+    avisos do Streamlit sobre rodar fora de um servidor.
+    """
+    st_logger.set_log_level("error")
+    runtime.configurar(backend=runtime.SemCache())
@@ -0,0 +1,94 @@
+import gc
+import resource
+import statistics
+import time
+import tracemalloc
+
+MB = 1024 * 1024
+
+
+# --- 1. MEMÓRIA DO PROCESSO (LINUX: /proc; DEMAIS: ru_maxrss) ---
+
+
+def _status_kb(campo):
+    try:
+        with open("/proc/self/status") as status:
+            for linha in status:
+                if linha.startswith(campo + ":"):
+                    return int(linha.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _zerar_pico_rss():
+    """Zera o pico de RSS do processo (VmHWM). Retorna False se o SO não permitir."""
+    try:
+        with open("/proc/self/clear_refs", "w") as arquivo:
+            arquivo.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def rss_atual_mb():
+    kb = _status_kb("VmRSS")
+    return None if kb is None else kb / 1024
+
+
+def pico_rss_mb():
+    kb = _status_kb("VmHWM")
+    if kb is None:
+        kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return kb / 1024
+
+
+# --- 2. MEDIÇÃO DE UM CASO ---
+
+
+def medir(executar, repeticoes=5, aquecimento=1):
+    """
+    Mede uma função sem argumentos:
+
+    - tempo: `aquecimento` execuções descartadas e `repeticoes` cronometradas
+      (mediana, mínimo e máximo, em segundos);
+    - pico de RSS: uma execução com o pico do processo zerado antes; o valor é o
+      acréscimo sobre o RSS de partida (inclui memória de Arrow/polars);
+    - alocações: uma execução sob tracemalloc (pico e número de blocos vivos no
+      pico do Python/numpy). Fica separada para não distorcer o tempo.
+    """
+    for _ in range(aquecimento):
+        executar()
+
+    tempos = []
+    for _ in range(repeticoes):
+        gc.collect()
+        inicio = time.perf_counter()
+        executar()
+        tempos.append(time.perf_counter() - inicio)
+
+    gc.collect()
+    pico_rss = None
+    if _zerar_pico_rss():
+        partida = rss_atual_mb()
+        executar()
+        pico_rss = max(0.0, pico_rss_mb() - partida)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        executar()
+        _, pico_alocado = tracemalloc.get_traced_memory()
+        blocos = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "tempo_mediano": statistics.median(tempos),
+        "tempo_min": min(tempos),
+        "tempo_max": max(tempos),
+        "repeticoes": repeticoes,
+        "pico_rss_mb": None if pico_rss is None else round(pico_rss, 2),
+        "pico_alocado_mb": round(pico_alocado / MB, 2),
+        "blocos_retidos": blocos,
+    }
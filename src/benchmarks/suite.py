@@ -0,0 +1,167 @@
+import json
+import logging
+import math
+import multiprocessing
+import os
+import platform
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from core.config import CACHE_DIR
+from data.synthetic import SEMENTE_PADRAO, SYNTHETIC_DIR, gerar_bases_sinteticas
+
+BENCHMARK_DIR = os.path.join(CACHE_DIR, "benchmarks")
+HISTORICO_PATH = os.path.join(BENCHMARK_DIR, "historico.jsonl")
+BASELINE_PATH = os.path.join(BENCHMARK_DIR, "baseline.json")
+
+# Regressão: pior que o baseline em mais que a tolerância relativa E que o mínimo
+# absoluto (evita alarmes por ruído em casos de poucos milissegundos)
+TOLERANCIA_PADRAO = 0.15
+MINIMOS_ABSOLUTOS = {"tempo_mediano": 0.005, "pico_rss_mb": 8.0, "pico_alocado_mb": 4.0}
+
+
+# --- 1. BASES SINTÉTICAS POR ESCALA ---
+
+
+def garantir_base(escala, semente=SEMENTE_PADRAO):
+    """Diretório da base sintética da escala; gera (uma vez) se não existir para a semente."""
+    destino = os.path.abspath(os.path.join(SYNTHETIC_DIR, escala))
+    manifesto = os.path.join(destino, "manifesto.json")
+    if os.path.exists(manifesto):
+        with open(manifesto, encoding="utf-8") as arquivo:
+            if json.load(arquivo).get("semente") == semente:
+                return destino
+    gerar_bases_sinteticas(escala=escala, semente=semente, destino=destino)
+    return destino
+
+
+# --- 2. EXECUÇÃO (UM PROCESSO NOVO POR ESCALA) ---
+
+
+def _executar_escala(diretorio, nomes_casos, repeticoes):
+    """
+    Roda no processo filho: carrega as bases da escala uma vez e mede cada caso.
+    Processo novo por escala para que RSS e caches de uma não contaminem a outra.
+    """
+    from benchmarks import casos
+    from benchmarks.medicao import medir
+
+    os.chdir(diretorio)
+    casos.preparar_processo()
+    bases = casos.carregar_bases()
+
+    resultados = []
+    for nome in nomes_casos:
+        try:
+            executar, linhas = casos.CASOS[nome](bases)
+        except casos.CasoIndisponivel as erro:
+            logging.warning("Caso %s ignorado: %s", nome, erro)
+            continue
+        resultado = medir(executar, repeticoes=repeticoes)
+        resultados.append({"caso": nome, "linhas": linhas, **resultado})
+    return resultados
+
+
+def executar_suite(escalas, nomes_casos=None, repeticoes=5, semente=SEMENTE_PADRAO):
+    """Mede os casos em cada escala e devolve o registro da execução (metadados + resultados)."""
+    from benchmarks.casos import CASOS
+
+    nomes_casos = [n for n in CASOS if nomes_casos is None or n in nomes_casos]
+    registro = {
+        "quando": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": _commit_atual(),
+        "python": platform.python_version(),
+        "maquina": f"{platform.system()} {platform.machine()} ({os.cpu_count()} CPUs)",
+        "semente": semente,
+        "repeticoes": repeticoes,
+        "resultados": [],
+    }
+    contexto = multiprocessing.get_context("spawn")
+    for escala in escalas:
+        diretorio = garantir_base(escala, semente)
+        with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as pool:
+            resultados = pool.submit(
+                _executar_escala, diretorio, nomes_casos, repeticoes
+            ).result()
+        for resultado in resultados:
+            registro["resultados"].append({"escala": escala, **resultado})
+    return registro
+
+
+def _commit_atual():
+    try:
+        saida = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        )
+        return saida.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# --- 3. HISTÓRICO, BASELINE E REGRESSÕES ---
+
+
+def registrar(registro, caminho=HISTORICO_PATH):
+    """Acrescenta a execução ao histórico (uma linha JSON por execução)."""
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    with open(caminho, "a", encoding="utf-8") as arquivo:
+        arquivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+
+def salvar_baseline(registro, caminho=BASELINE_PATH):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        json.dump(registro, arquivo, ensure_ascii=False, indent=2)
+
+
+def carregar_baseline(caminho=BASELINE_PATH):
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, encoding="utf-8") as arquivo:
+        return json.load(arquivo)
+
+
+def comparar(registro, baseline, tolerancia=TOLERANCIA_PADRAO):
+    """
+    Marca em cada resultado a variação relativa ao baseline (mesmo caso e escala) e
+    devolve a lista de regressões: (caso, escala, métrica, valor base, valor atual).
+    """
+    referencia = {(r["caso"], r["escala"]): r for r in baseline["resultados"]}
+    regressoes = []
+    for resultado in registro["resultados"]:
+        base = referencia.get((resultado["caso"], resultado["escala"]))
+        if base is None:
+            continue
+        variacoes = {}
+        for metrica, minimo in MINIMOS_ABSOLUTOS.items():
+            atual, anterior = resultado.get(metrica), base.get(metrica)
+            if atual is None or anterior is None:
+                continue
+            variacoes[metrica] = (atual - anterior) / anterior if anterior else None
+            if atual > anterior * (1 + tolerancia) and atual - anterior > minimo:
+                regressoes.append((resultado["caso"], resultado["escala"], metrica, anterior, atual))
+        resultado["variacao"] = variacoes
+    return regressoes
+
+
+def curvas_de_escala(registro):
+    """
+    Por caso: [(escala, linhas, tempo)] e o expoente empírico de crescimento entre a
+    menor e a maior escala (1 = linear nas linhas de entrada). Sem expoente quando a
+    entrada não chega a dobrar entre as escalas (caso com tamanho fixo).
+    """
+    pontos = {}
+    for resultado in registro["resultados"]:
+        pontos.setdefault(resultado["caso"], []).append(
+            (resultado["escala"], resultado["linhas"], resultado["tempo_mediano"])
+        )
+    curvas = {}
+    for caso, serie in pontos.items():
+        serie.sort(key=lambda ponto: ponto[1])
+        expoente = None
+        (_, n0, t0), (_, n1, t1) = serie[0], serie[-1]
+        if n0 > 0 and n1 >= 2 * n0 and t0 > 0 and t1 > 0:
+            expoente = math.log(t1 / t0) / math.log(n1 / n0)
+        curvas[caso] = {"pontos": serie, "expoente": expoente}
+    return curvas
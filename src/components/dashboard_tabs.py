@@ -1,21 +1,323 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
+import polars as pl
 
 from core.analytics import (
     calcular_vcr_ceara_brasil,
-    obter_vcr_brasil_mundo,
-    obter_pci_e_distancia,
     normalizar_vcr,
     format_fob_metric,
     carregar_mapeamento_ncm_cnae,
+    carregar_ponte_ncm_hs4,
+    carregar_tabela_ncm_xls,
     classificar_cenarios_vcr,
     calcular_indice_prioridade_ajustado,
 )
-from core.priority_index import calcular_indice_prioridade_ajustado
+from core.chart_data import agregar_top_n
+from core.cnae_allocation import (
+    CNAE_NAO_MAPEADA,
+    carregar_pesos_cnae,
+    ql_emprego_hs4,
+    vcr_setorial_estados,
+)
+from core.complexity import complexidade_estados
+from core.config import PRESETS_PESOS, TARGET_STATE_NAME, VERSOES_HS_FONTES
+from core.data_loader import (
+    DIMENSOES_COMEXSTAT,
+    DIMENSOES_COMTRADE,
+    DIMENSOES_HARVARD,
+    NCM_CNAE_PATH,
+    PESOS_CNAE_PATH,
+    carregar_indice_busca,
+    carregar_indice_filtros,
+    versao_dataframe,
+)
+from core.filters import (
+    assinatura_filtros,
+    mascara_de_posicoes,
+    mascara_filtros,
+    materializar,
+    somar_filtrado,
+)
+from core.formatting import SUFIXOS_CURTOS, formatar_fob_coluna
+from core.hs_concordance import versao_concordancias
+from core.hs_hierarchy import HierarquiaHS, normalizar_codigo_hs
+from core.metric_fetchers import obter_pci_e_distancia, obter_vcr_brasil_mundo
+from core.priority_index import calcular_serie_indice_prioridade, calcular_vcr_ajustado
+from core.product_space import metricas_espaco_produto
+from core.tracing import rastrear, rastrear_cache, span
+from core.vcr_series import JANELA_PADRAO, TENDENCIAS, serie_vcr_estados
 from core.vcr_calculators import calcular_vcr_dentro_selecao
+from data.emprego import ano_referencia, ler_emprego, versao_emprego
+from data.ncm import abrir_fatos, versao_fatos
+from data.monthly import indice_sazonal, ler_rollup, meses_disponiveis, versao_rollups
+from data.municipal import (
+    ler_vcr_municipal,
+    opcoes_agregados,
+    resumo_municipios,
+    versao_agregados,
+)
+
+from components.debug_panel import fragmento
+from components.export_buttons import render_exportacao
+from components.paged_table import render_tabela_paginada
+
+# Texto oficial ipsis verbis para tooltips e legendas
+TOOLTIP_LEGEND = (
+    "**Cenário 1:** Setores com Vantagem Comparativa no Ceará e no Brasil\n\n"
+    "**Cenário 2:** Setores com Vantagem Comparativa apenas no Ceará\n\n"
+    "**Cenário 3:** Setores com Vantagem Comparativa apenas no Brasil\n\n"
+    "**Cenário 4:** Setores com Potencial de Vantagem Comparativa no Ceará e no Brasil\n\n"
+    "**Cenário 5:** Setores com Potencial de Vantagem Comparativa apenas no Ceará\n\n"
+    "**Cenário 6:** Setores com Potencial de Vantagem Comparativa apenas no Brasil\n\n"
+    "**Cenário 7:** Setores sem Vantagem Comparativa ou Potencial de Vantagem"
+)
+
+
+# Valores iniciais dos sliders de peso
+PESOS_PADRAO = PRESETS_PESOS["padrao"]
+
+
+# --- PRÉ-CÁLCULOS CACHEADOS ---
+# Os DataFrames base entram com "_" (não são hasheados pelo Streamlit);
+# a chave de cache é a versão dos dados retornada por versao_dataframe.
+# rastrear_cache registra acertos/execuções no painel de desempenho (?debug=1).
+
+
+@rastrear_cache(st.cache_data(show_spinner=False))
+def _preparar_base_comparativa(_comexstat_df, _harvard_df, versao, fonte_distancia="harvard"):
+    """
+    Consolida as métricas da aba comparativa (VCRs, PCI, distância, ponte NCM/CNAE,
+    cenários e normalização Min-Max). Nada aqui depende dos pesos ou filtros.
+    Com fonte_distancia="estado", a distância vem do espaço-produto do Ceará
+    (core.product_space), junto com Densidade e COG. Com o store de emprego
+    (src/emprego_cli.py), entram QL_Emprego e o VCR Ajustado pelo emprego.
+    As métricas do Harvard passam pela concordância de versões do SH
+    (core.hs_concordance) antes do join por headingCode.
+    """
+    # Métricas Base
+    df_ce = calcular_vcr_ceara_brasil(_comexstat_df)
+    # Harvard (HS92) convertido para a versão do SH do ComexStat antes do join
+    df_br = obter_vcr_brasil_mundo(_harvard_df, VERSOES_HS_FONTES["comexstat"])
+    df_metrics = obter_pci_e_distancia(_harvard_df, VERSOES_HS_FONTES["comexstat"])
+    if fonte_distancia == "estado":
+        df_espaco = metricas_espaco_produto(_comexstat_df, _harvard_df, TARGET_STATE_NAME)
+        df_metrics = df_metrics.drop(columns="Distancia_Parceiros").merge(
+            df_espaco.rename(columns={"Distancia_Estado": "Distancia_Parceiros"}),
+            on="headingCode",
+            how="left",
+        )
+
+    # Descrições HS4
+    df_descricoes = _comexstat_df[["headingCode", "heading"]].drop_duplicates()
+    df_descricoes["headingCode"] = normalizar_codigo_hs(df_descricoes["headingCode"], 4)
+
+    # FOB por HS4 (Ceará e Brasil) para os agregados por capítulo/seção
+    df_comex_valid = _comexstat_df[_comexstat_df["metricFOB"] > 0]
+    df_fob = (
+        pd.DataFrame(
+            {
+                "headingCode": normalizar_codigo_hs(df_comex_valid["headingCode"], 4),
+                "FOB_Ceara": df_comex_valid["metricFOB"].where(
+                    df_comex_valid["state"] == "Ceará", 0
+                ),
+                "FOB_Brasil": df_comex_valid["metricFOB"],
+            }
+        )
+        .groupby("headingCode")
+        .sum()
+        .reset_index()
+    )
+
+    # Merge Principal
+    df_final = df_ce.merge(df_br, on="headingCode", how="left")
+    df_final = df_final.merge(df_metrics, on="headingCode", how="left")
+    df_final["headingCode"] = normalizar_codigo_hs(df_final["headingCode"], 4)
+    df_final = df_final.merge(df_fob, on="headingCode", how="left")
+    df_final = df_final.merge(df_descricoes, on="headingCode", how="left").fillna(0)
+
+    # Mapeamento NCM/CNAE (Agrupado em linha única)
+    df_ponte = carregar_ponte_ncm_hs4(NCM_CNAE_PATH)
+    if df_ponte is not None:
+        df_final = df_final.merge(df_ponte, on="headingCode", how="left")
+    else:
+        df_final["ncm8"] = "Não disp."
+        df_final["cnae_raw"] = "Não disp."
+
+    # VCR Ajustado pelo emprego formal (RAIS), quando há store de emprego
+    ano_emprego = ano_referencia(int(_comexstat_df["year"].max()))
+    df_ncm = carregar_tabela_ncm_xls(NCM_CNAE_PATH) if ano_emprego is not None else None
+    if df_ncm is not None:
+        df_ql = ql_emprego_hs4(ler_emprego(ano_emprego), df_ncm, TARGET_STATE_NAME)
+        df_final = calcular_vcr_ajustado(df_final, df_ql)
+
+    # Aplicação da Classificação por Cenários (IDs 1 a 7)
+    df_final = classificar_cenarios_vcr(df_final)
+
+    # Normalização (Colunas M, N, O, P do .ods) -> cria colunas com sufixo _norm
+    metricas = ["VCR_Ceara_Brasil", "VCR_Brasil_Mundo", "PCI", "Distancia_Parceiros"]
+    for col in metricas:
+        df_final = normalizar_vcr(df_final, col)
+
+    return df_final
+
+
+@rastrear_cache(st.cache_data(show_spinner=False))
+def _complexidade_estados(_comexstat_df, versao):
+    """ECI dos estados por ano (matriz estado x HS4 do ComexStat)."""
+    df_estados, _ = complexidade_estados(_comexstat_df)
+    return df_estados
+
+
+@rastrear_cache(st.cache_data(show_spinner=False))
+def _tendencias_vcr_estado(_comexstat_df, versao, estado):
+    """Tendências da VCR (série anual, janela móvel, inclinação e CAGR) de um estado."""
+    _, df_tendencia = serie_vcr_estados(_comexstat_df)
+    return df_tendencia[df_tendencia["state"] == estado].drop(columns="state")
+
+
+@rastrear_cache(st.cache_resource(show_spinner=False), etapa="carga")
+def _fatos_ncm(versao):
+    """Tabela de fatos NCM-8 aberta só nos metadados (None se não construída)."""
+    return abrir_fatos()
 
 
+@rastrear_cache(st.cache_data(show_spinner=False), etapa="carga")
+def _descricoes_ncm(caminho):
+    """Descrição de cada NCM-8, da tabela NCM x CNAE."""
+    df_ncm = carregar_tabela_ncm_xls(caminho)
+    if df_ncm is None:
+        return {}
+    return dict(zip(df_ncm["ncm8"], df_ncm["desc_ncm"]))
+
+
+@rastrear_cache(st.cache_resource(show_spinner=False))
+def _hierarquia_comparativa(_df_final, versao):
+    """Hierarquia HS das linhas da aba comparativa, com roll-ups de FOB."""
+    return HierarquiaHS(_df_final["headingCode"], _df_final[["FOB_Ceara", "FOB_Brasil"]])
+
+
+def _campo_busca(chave):
+    """
+    Caixa de busca de produtos (código ou descrição, sem acento, por prefixo ou
+    aproximada). Retorna os códigos HS4 encontrados, ou None se a busca estiver vazia.
+    """
+    consulta = st.text_input(
+        "🔎 Buscar produto (código ou descrição)",
+        key=chave,
+        placeholder="ex.: soja, calcados, 8703",
+    )
+    if not consulta.strip():
+        return None
+    codigos = carregar_indice_busca().codigos_encontrados(consulta)
+    st.caption(f"{len(codigos)} posição(ões) HS4 encontrada(s) para a busca.")
+    return codigos
+
+
+@rastrear_cache(st.cache_data(show_spinner=False))
+def _rotulos_hs_comex(_comexstat_df, versao):
+    """Rótulo 'código - descrição...' de cada headingCode (opções do multiselect)."""
+    df_headings = _comexstat_df[["headingCode", "heading"]].drop_duplicates(
+        subset="headingCode"
+    )
+    rotulos = (
+        df_headings["headingCode"].astype(str)
+        + " - "
+        + df_headings["heading"].astype(str).str[:50]
+        + "..."
+    )
+    return dict(zip(df_headings["headingCode"], rotulos))
+
+
+# --- FIGURAS (pré-agregadas e em cache pela assinatura dos filtros) ---
+
+LIMIAR_DEMAIS_COMEX = 0.02
+
+
+@rastrear_cache(
+    st.cache_resource(show_spinner=False, max_entries=64), etapa="render"
+)
+def _figura_comex(_comexstat_df, _posicoes, chave):
+    """Barras de FOB por título/estado, com os pares abaixo de 2% em 'Demais/Outros'."""
+    df_plot = agregar_top_n(
+        materializar(_comexstat_df, _posicoes, ["heading", "state", "metricFOB"]),
+        ["heading", "state"],
+        "metricFOB",
+        n=None,
+        limiar=LIMIAR_DEMAIS_COMEX,
+        rotulo_outros=f"Demais/Outros (< {LIMIAR_DEMAIS_COMEX * 100:.0f}%)",
+    )
+    return px.bar(
+        df_plot,
+        x="heading",
+        y="metricFOB",
+        color="state",
+        title=f"Valor FOB por Título (Top Headings + Demais/Outros)",
+        labels={
+            "heading": "Título (Heading)",
+            "metricFOB": "Valor FOB (US$)",
+            "state": "Estado",
+        },
+        hover_data={"percentage": ":.2%"},
+    )
+
+
+@rastrear_cache(
+    st.cache_resource(show_spinner=False, max_entries=64), etapa="render"
+)
+def _figura_harvard(_harvard_df, _posicoes, chave):
+    """Barras da proporção exportada pelos 15 maiores produtos HS."""
+    df_plot_product = agregar_top_n(
+        materializar(_harvard_df, _posicoes, ["product_hs92_code", "export_value", "pci"]),
+        ["product_hs92_code"],
+        "export_value",
+        n=15,
+        rotulo_outros=None,
+        agregacoes=(pl.col("pci").mean().alias("average_pci"),),
+    ).rename(columns={"export_value": "total_export", "percentage": "proportion"})
+
+    fig = px.bar(
+        df_plot_product,
+        x="product_hs92_code",
+        y="proportion",
+        color="proportion",
+        title="Proporção de Exportação (Export Value) por Código HS",
+        labels={
+            "product_hs92_code": "Código HS (Produto)",
+            "proportion": "Proporção do Total (%)",
+            "total_export": "Valor Exportado (US$)",
+        },
+        hover_data={
+            "total_export": True,
+            "average_pci": ":.3f",
+            "proportion": ":.2%",
+        },
+        template="plotly_dark",
+    )
+    fig.update_layout(yaxis_tickformat=".0%")
+    return fig
+
+
+@rastrear_cache(
+    st.cache_resource(show_spinner=False, max_entries=64), etapa="render"
+)
+def _figura_comtrade(_comtrade_df, _posicoes, chave):
+    """Pizza do valor primário pelas maiores descrições de produto + 'Outros'."""
+    df_plot = agregar_top_n(
+        materializar(_comtrade_df, _posicoes, ["cmdDesc", "primaryValue"]),
+        ["cmdDesc"],
+        "primaryValue",
+    )
+    return px.pie(
+        df_plot,
+        names="cmdDesc",
+        values="primaryValue",
+        title="Distribuição do Valor Primário por Descrição do Produto",
+    )
+
+
+@rastrear("render")
 def render_tab_compare(comexstat_df, harvard_df, comtrade_df):
     """
     Renderiza a aba Análise Comparativa com lógica de normalização Min-Max (M-AA)
@@ -24,86 +326,78 @@ def render_tab_compare(comexstat_df, harvard_df, comtrade_df):
     st.header("Análise Comparativa de Especialização e Complexidade")
 
     # --- 1. PROCESSAMENTO E CONSOLIDAÇÃO DE DADOS ---
+    fonte_distancia = st.radio(
+        "Distância usada no índice",
+        ["harvard", "estado"],
+        format_func={
+            "harvard": "Média mundial (Harvard)",
+            "estado": f"Espaço-produto do {TARGET_STATE_NAME}",
+        }.get,
+        horizontal=True,
+        key="compare_fonte_distancia",
+        help=(
+            "A distância do próprio estado é 1 - densidade: quanto das capacidades "
+            "próximas ao produto (proximidade entre produtos no comércio mundial) o "
+            "estado já exporta com vantagem comparativa."
+        ),
+    )
     with st.spinner("Consolidando métricas e aplicando lógica de normalização..."):
-        # Métricas Base
-        df_ce = calcular_vcr_ceara_brasil(comexstat_df)
-        df_br = obter_vcr_brasil_mundo(harvard_df)
-        df_metrics = obter_pci_e_distancia(harvard_df)
-
-        # Descrições HS4
-        df_descricoes = comexstat_df[["headingCode", "heading"]].drop_duplicates()
-        df_descricoes["headingCode"] = (
-            df_descricoes["headingCode"].astype(str).str.zfill(4)
-        )
-
-        # Merge Principal
-        df_final = df_ce.merge(df_br, on="headingCode", how="left")
-        df_final = df_final.merge(df_metrics, on="headingCode", how="left")
-        df_final["headingCode"] = df_final["headingCode"].astype(str).str.zfill(4)
-        df_final = df_final.merge(df_descricoes, on="headingCode", how="left").fillna(0)
-
-        # Mapeamento NCM/CNAE (Agrupado em linha única)
-        PATH_MAP = "resources/NCM2012XCNAE20.xls"
-        try:
-            df_map_raw = pd.read_excel(PATH_MAP, skiprows=1, engine="xlrd").iloc[:, :3]
-            df_map_raw.columns = ["ncm_raw", "desc_ncm", "cnae_raw"]
-            df_map_raw["ncm8"] = (
-                df_map_raw["ncm_raw"]
-                .astype(str)
-                .str.replace(r"\.0$", "", regex=True)
-                .str.zfill(8)
-            )
-            df_map_raw["headingCode"] = df_map_raw["ncm8"].str[:4]
-
-            df_ponte = (
-                df_map_raw.groupby("headingCode")
-                .agg(
-                    {
-                        "ncm8": lambda x: ", ".join(sorted(set(x.astype(str)))),
-                        "cnae_raw": lambda x: ", ".join(
-                            sorted(
-                                set(str(val) for val in x if str(val).lower() != "nan")
-                            )
-                        ),
-                    }
-                )
-                .reset_index()
-            )
-            df_final = df_final.merge(df_ponte, on="headingCode", how="left")
-        except:
-            df_final["ncm8"] = "Não disp."
-            df_final["cnae_raw"] = "Não disp."
+        versao = "|".join(
+            [
+                versao_dataframe(comexstat_df),
+                versao_dataframe(harvard_df),
+                versao_emprego(),
+                versao_concordancias(),
+            ]
+        )
+        df_final = _preparar_base_comparativa(
+            comexstat_df, harvard_df, versao, fonte_distancia
+        )
+        hierarquia = _hierarquia_comparativa(df_final, versao)
 
-        # Aplicação da Classificação por Cenários (IDs 1 a 7)
-        df_final = classificar_cenarios_vcr(df_final)
+    # --- 2. PESOS, FILTROS E RANKING (reexecutados isoladamente) ---
+    _fragmento_ranking_compare(df_final, hierarquia, f"{versao}|{fonte_distancia}")
+
+    # --- 6. VISÃO AGREGADA POR SEÇÃO / CAPÍTULO ---
+    _fragmento_visao_hierarquica(hierarquia)
+
+    # --- 7. COMPLEXIDADE ECONÔMICA DOS ESTADOS (ECI) ---
+    _render_complexidade_estados(comexstat_df, versao_dataframe(comexstat_df))
+
+    # --- 8. TENDÊNCIA DA VCR AO LONGO DOS ANOS ---
+    _fragmento_tendencias_vcr(comexstat_df, versao_dataframe(comexstat_df))
 
-    # --- 2. ÁREA DE CONFIGURAÇÃO (UX: EXPANDER) ---
-    # Texto oficial ipsis verbis para tooltips e legendas
-    tooltip_legend = (
-        "**Cenário 1:** Setores com Vantagem Comparativa no Ceará e no Brasil\n\n"
-        "**Cenário 2:** Setores com Vantagem Comparativa apenas no Ceará\n\n"
-        "**Cenário 3:** Setores com Vantagem Comparativa apenas no Brasil\n\n"
-        "**Cenário 4:** Setores com Potencial de Vantagem Comparativa no Ceará e no Brasil\n\n"
-        "**Cenário 5:** Setores com Potencial de Vantagem Comparativa apenas no Ceará\n\n"
-        "**Cenário 6:** Setores com Potencial de Vantagem Comparativa apenas no Brasil\n\n"
-        "**Cenário 7:** Setores sem Vantagem Comparativa ou Potencial de Vantagem"
-    )
 
+@fragmento
+def _fragmento_ranking_compare(df_final, hierarquia, versao):
+    """
+    Região interativa da aba comparativa: sliders de peso, filtros e tabela de ranking.
+    Roda como fragmento, então mexer nos controles não reexecuta o app inteiro.
+    """
+    codigos_busca = _campo_busca("compare_busca")
+
+    # --- 2. ÁREA DE CONFIGURAÇÃO (UX: EXPANDER) ---
     with st.expander("🛠️ Configurações de Pesos e Filtros de Busca", expanded=False):
         st.markdown("#### ⚖️ Pesos do Índice (Lógica Planilha8)")
         c1, c2, c3, c4 = st.columns(4)
         pesos_dict = {
-            "vcr_ceara": c1.slider("Peso VCR Estadual", 0.0, 1.0, 0.4, 0.05),
-            "vcr_brasil": c2.slider("Peso VCR País", 0.0, 1.0, 0.3, 0.05),
-            "pci": c3.slider("Peso PCI", 0.0, 1.0, 0.3, 0.05),
-            "distancia": c4.slider("Peso Distância", 0.0, 1.0, 0.4, 0.05),
+            "vcr_ceara": c1.slider(
+                "Peso VCR Estadual", 0.0, 1.0, PESOS_PADRAO["vcr_ceara"], 0.05
+            ),
+            "vcr_brasil": c2.slider(
+                "Peso VCR País", 0.0, 1.0, PESOS_PADRAO["vcr_brasil"], 0.05
+            ),
+            "pci": c3.slider("Peso PCI", 0.0, 1.0, PESOS_PADRAO["pci"], 0.05),
+            "distancia": c4.slider(
+                "Peso Distância", 0.0, 1.0, PESOS_PADRAO["distancia"], 0.05
+            ),
         }
 
         st.markdown("---")
         st.markdown("#### 🔍 Filtros Avançados")
         f1, f2, f3 = st.columns([1, 1, 2])
 
-        all_codes = sorted(df_final["headingCode"].unique().tolist())
+        all_codes = hierarquia.codigos
         start_hs = f1.selectbox("Faixa HS (Início)", ["Início"] + all_codes)
         end_hs = f2.selectbox("Faixa HS (Fim)", ["Fim"] + all_codes)
 
@@ -113,44 +407,49 @@ def render_tab_compare(comexstat_df, harvard_df, comtrade_df):
             "Posicionamento Estratégico",
             options=cenarios_disponiveis,
             default=cenarios_disponiveis,
-            help=tooltip_legend,
+            help=TOOLTIP_LEGEND,
         )
 
-    # --- 3. CÁLCULOS FINAIS (NORMALIZAÇÃO MIN-MAX E SOMA PONDERADA) ---
-    # 1. Normalização (Colunas M, N, O, P do .ods)
-    metricas = ["VCR_Ceara_Brasil", "VCR_Brasil_Mundo", "PCI", "Distancia_Parceiros"]
-    for col in metricas:
-        df_final = normalizar_vcr(df_final, col)  # Isso criará colunas com sufixo _norm
-
-        # 2. Cálculo do Índice (Colunas X, Y, Z, AA e soma final)
-        # Agora a função não vai mais quebrar!
-    df_final = calcular_indice_prioridade_ajustado(df_final, pesos_dict)
+    # --- 3. CÁLCULOS FINAIS (SOMA PONDERADA) ---
+    # Cálculo do Índice (Colunas X, Y, Z, AA e soma final) sobre as colunas _norm
+    indice = calcular_serie_indice_prioridade(df_final, pesos_dict)
 
-    # 3. Aplicação de Filtros de Visualização
-    df_view = df_final.copy()
-    if start_hs != "Início":
-        df_view = df_view[df_view["headingCode"] >= start_hs]
-    if end_hs != "Fim":
-        df_view = df_view[df_view["headingCode"] <= end_hs]
-    if selected_ids:
-        df_view = df_view[df_view["Cenário ID"].isin(selected_ids)]
+    # 3. Aplicação de Filtros de Visualização (máscaras sobre a base compartilhada)
+    # Faixa HS resolvida por busca binária na hierarquia (sem comparar strings)
+    posicoes_faixa = hierarquia.posicoes(
+        None if start_hs == "Início" else start_hs,
+        None if end_hs == "Fim" else end_hs,
+    )
+    mascara = mascara_de_posicoes(len(df_final), posicoes_faixa)
+    mascara &= mascara_filtros(df_final, (("Cenário ID", selected_ids),))
+    if codigos_busca is not None:
+        mascara &= df_final["headingCode"].isin(codigos_busca).to_numpy()
+
+    mapping = {
+        "headingCode": "HS4",
+        "heading": "Produto",
+        "Cenário ID": "Cenário",
+        "ncm8": "NCMs",
+        "cnae_raw": "CNAE",
+        "INDICE_PRIORIDADE_AJUSTADO": "Prioridade",
+        "VCR_Ceara_Brasil": "VCR Est.",
+        "VCR_Brasil_Mundo": "VCR Nac.",
+    }
+    if "COG" in df_final.columns:
+        mapping["Densidade"] = "Densidade"
+        mapping["COG"] = "COG"
+    if "QL_Emprego" in df_final.columns:
+        mapping["QL_Emprego"] = "QL Emprego"
+        mapping["VCR_AJUSTADO"] = "VCR Ajust."
+    colunas_exibidas = [c for c in mapping if c != "INDICE_PRIORIDADE_AJUSTADO"]
+    df_view = materializar(df_final, mascara, colunas_exibidas)
+    df_view["INDICE_PRIORIDADE_AJUSTADO"] = indice[mascara]
 
     # 4. Ordenação (Ranking conforme Planilha8)
     df_view = df_view.sort_values(by="INDICE_PRIORIDADE_AJUSTADO", ascending=False)
 
     # --- 4. EXIBIÇÃO DA TABELA PRINCIPAL ---
     if not df_view.empty:
-        mapping = {
-            "headingCode": "HS4",
-            "heading": "Produto",
-            "Cenário ID": "Cenário",
-            "ncm8": "NCMs",
-            "cnae_raw": "CNAE",
-            "INDICE_PRIORIDADE_AJUSTADO": "Prioridade",
-            "VCR_Ceara_Brasil": "VCR Est.",
-            "VCR_Brasil_Mundo": "VCR Nac.",
-        }
-
         st.dataframe(
             df_view[list(mapping.keys())].rename(columns=mapping),
             use_container_width=True,
@@ -161,34 +460,284 @@ def render_tab_compare(comexstat_df, harvard_df, comtrade_df):
                 ),
                 "Cenário": st.column_config.TextColumn(
                     width="small",
-                    help=tooltip_legend,  # Tooltip oficial no cabeçalho
+                    help=TOOLTIP_LEGEND,  # Tooltip oficial no cabeçalho
+                ),
+                "Densidade": st.column_config.NumberColumn(format="%.3f"),
+                "QL Emprego": st.column_config.NumberColumn(
+                    format="%.2f",
+                    help="Quociente locacional do emprego formal (RAIS) nas CNAEs "
+                    "do produto, pela tabela NCM x CNAE.",
+                ),
+                "VCR Ajust.": st.column_config.NumberColumn(
+                    format="%.2f",
+                    help="Média geométrica da VCR estadual e do QL do emprego.",
+                ),
+                "COG": st.column_config.NumberColumn(
+                    format="%.3f",
+                    help="Ganho de perspectiva de complexidade: quanto o produto "
+                    "aproxima o estado de produtos complexos que ele ainda não exporta.",
                 ),
             },
         )
 
+        # Exportação do ranking filtrado (valores brutos, nos nomes da tabela)
+        render_exportacao(
+            df_view,
+            "ranking_prioridade",
+            key="compare_exportar",
+            assinatura=assinatura_filtros(
+                versao,
+                (
+                    ("pesos", [f"{k}={v}" for k, v in pesos_dict.items()]),
+                    ("faixa", [start_hs, end_hs]),
+                    ("Cenário ID", selected_ids),
+                    ("busca", codigos_busca),
+                ),
+            ),
+            colunas=mapping,
+        )
+
+        # Drill-down da posição escolhida até as linhas NCM-8
+        _render_detalhe_ncm(df_view)
+
         # --- 5. APOIO DIDÁTICO (LEGENDA FIXA) ---
         st.markdown("---")
         with st.expander(
             "📖 Legenda dos Cenários Estratégicos (Descrições Oficiais)", expanded=False
         ):
-            st.caption(tooltip_legend)
+            st.caption(TOOLTIP_LEGEND)
 
     else:
         st.info("Nenhum dado encontrado para os critérios selecionados no expander.")
 
 
+def _render_detalhe_ncm(df_view):
+    """
+    Detalha uma posição HS4 do ranking nas suas linhas NCM-8 (FOB, kg, preço
+    médio, participação na posição e VCR). Só a faixa da posição é lida da
+    tabela de fatos gerada por src/ncm_cli.py.
+    """
+    fatos = _fatos_ncm(versao_fatos())
+    if fatos is None:
+        return
+    with st.expander("🔬 Detalhar posição HS4 em NCM-8", expanded=False):
+        produtos = dict(zip(df_view["headingCode"], df_view["heading"]))
+        posicao = st.selectbox(
+            "Posição HS4",
+            [c for c in produtos if c in fatos],
+            format_func=lambda c: f"{c} - {produtos[c]}",
+            key="compare_ncm_posicao",
+        )
+        with span("detalhe_ncm", "carga"):
+            df_ncm = fatos.detalhar(posicao, TARGET_STATE_NAME) if posicao else None
+        if df_ncm is None or df_ncm.empty:
+            st.info(f"Sem exportações NCM-8 do {TARGET_STATE_NAME} nesta posição.")
+            return
+
+        anos = sorted(df_ncm["year"].unique(), reverse=True)
+        ano = st.selectbox("Ano", anos, key="compare_ncm_ano")
+        df_ano = df_ncm[df_ncm["year"] == ano].sort_values("metricFOB", ascending=False)
+        df_ano.insert(2, "Descrição", df_ano["ncm8"].map(_descricoes_ncm(NCM_CNAE_PATH)))
+        st.dataframe(
+            df_ano[["ncm8", "Descrição", "metricFOB", "metricKG", "US$/kg", "Participacao", "VCR"]],
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "ncm8": st.column_config.TextColumn("NCM", width="small"),
+                "metricFOB": st.column_config.NumberColumn("FOB (US$)", format="%.0f"),
+                "metricKG": st.column_config.NumberColumn("Peso (kg)", format="%.0f"),
+                "US$/kg": st.column_config.NumberColumn(format="%.2f"),
+                "Participacao": st.column_config.ProgressColumn(
+                    "Part. na posição", format="%.2f", min_value=0, max_value=1
+                ),
+                "VCR": st.column_config.NumberColumn(
+                    "VCR Est.",
+                    format="%.2f",
+                    help="VCR do estado no NCM-8 contra o Brasil, no ano.",
+                ),
+            },
+        )
+
+
+@fragmento
+def _fragmento_visao_hierarquica(hierarquia):
+    """
+    Exportações e VCR do Ceará agregados por Seção ou Capítulo (HS2), lidos dos
+    roll-ups pré-calculados da hierarquia HS (sem reagrupar as linhas HS4).
+    """
+    with st.expander("🗂️ Visão Agregada por Seção / Capítulo HS", expanded=False):
+        nivel = st.radio(
+            "Nível de agregação",
+            ["Seção", "Capítulo (HS2)"],
+            horizontal=True,
+            key="compare_nivel_hs",
+        )
+        df_nivel = hierarquia.agregado("secao" if nivel == "Seção" else "hs2")
+
+        total_ceara = hierarquia.soma("FOB_Ceara")
+        total_brasil = hierarquia.soma("FOB_Brasil")
+        if total_ceara == 0 or total_brasil == 0:
+            st.info("Sem exportações válidas para calcular a VCR agregada.")
+            return
+
+        parcela_ceara = df_nivel["FOB_Ceara"] / total_ceara
+        parcela_brasil = df_nivel["FOB_Brasil"] / total_brasil
+        df_nivel = df_nivel.assign(
+            VCR=np.where(parcela_brasil > 0, parcela_ceara / parcela_brasil, 0.0)
+        )
+
+        st.dataframe(
+            df_nivel.rename(
+                columns={
+                    "codigo": nivel,
+                    "n_folhas": "Qtd. HS4",
+                    "FOB_Ceara": "FOB Ceará (US$)",
+                    "FOB_Brasil": "FOB Brasil (US$)",
+                    "VCR": "VCR Est.",
+                }
+            ),
+            width="stretch",
+            hide_index=True,
+            column_config={
+                "FOB Ceará (US$)": st.column_config.NumberColumn(format="%.0f"),
+                "FOB Brasil (US$)": st.column_config.NumberColumn(format="%.0f"),
+                "VCR Est.": st.column_config.NumberColumn(format="%.3f"),
+            },
+        )
+
+
+def _render_complexidade_estados(comexstat_df, versao):
+    """
+    ECI calculado localmente para todos os estados (RCA binária estado x HS4,
+    autovetor do método dos reflexos), com a posição do estado-alvo no último ano.
+    """
+    with st.expander("🧩 Complexidade Econômica dos Estados (ECI)", expanded=False):
+        df_eci = _complexidade_estados(comexstat_df, versao).dropna(subset=["ECI"])
+        if df_eci.empty:
+            st.info("Dados insuficientes para calcular o ECI (mínimo de dois estados).")
+            return
+
+        ultimo_ano = int(df_eci["year"].max())
+        df_ano = df_eci[df_eci["year"] == ultimo_ano].sort_values("ECI", ascending=False)
+        df_ano = df_ano.assign(Posição=np.arange(1, len(df_ano) + 1))
+
+        alvo = df_ano[df_ano["state"] == TARGET_STATE_NAME]
+        if not alvo.empty:
+            anterior = df_eci[
+                (df_eci["state"] == TARGET_STATE_NAME) & (df_eci["year"] == ultimo_ano - 1)
+            ]
+            c1, c2, c3 = st.columns(3)
+            c1.metric(
+                f"ECI {TARGET_STATE_NAME} ({ultimo_ano})",
+                f"{alvo['ECI'].iloc[0]:.2f}",
+                delta=None
+                if anterior.empty
+                else f"{alvo['ECI'].iloc[0] - anterior['ECI'].iloc[0]:+.2f} vs {ultimo_ano - 1}",
+            )
+            c2.metric("Posição entre os estados", f"{alvo['Posição'].iloc[0]}º de {len(df_ano)}")
+            c3.metric("Diversidade (HS4 com VCR ≥ 1)", int(alvo["diversidade"].iloc[0]))
+
+        # ECI por ano (colunas) dos estados, na ordem do último ano
+        df_anos = df_eci.pivot(index="state", columns="year", values="ECI")
+        df_tabela = (
+            df_ano.set_index("state")[["Posição", "diversidade"]]
+            .join(df_anos.rename(columns=lambda ano: f"ECI {ano}"))
+            .reset_index()
+            .rename(columns={"state": "Estado", "diversidade": "Diversidade"})
+        )
+        st.dataframe(
+            df_tabela,
+            width="stretch",
+            hide_index=True,
+            column_config={
+                col: st.column_config.NumberColumn(format="%.2f")
+                for col in df_tabela.columns
+                if col.startswith("ECI ")
+            },
+        )
+
+
+@fragmento
+def _fragmento_tendencias_vcr(comexstat_df, versao):
+    """
+    Série anual da VCR do estado-alvo por HS4 (sparkline), com a VCR da janela
+    móvel, a inclinação e o CAGR do FOB para separar setores em alta e em queda.
+    """
+    with st.expander("📈 Tendência da VCR ao Longo dos Anos", expanded=False):
+        df_tendencia = _tendencias_vcr_estado(comexstat_df, versao, TARGET_STATE_NAME)
+        if df_tendencia.empty or len(df_tendencia["Serie_VCR"].iloc[0]) < 2:
+            st.info("São necessários ao menos dois anos de dados para medir tendências.")
+            return
+
+        contagem = df_tendencia["Tendencia"].value_counts()
+        colunas = st.columns(len(TENDENCIAS))
+        for coluna, tendencia in zip(colunas, TENDENCIAS):
+            coluna.metric(f"HS4 {tendencia.lower()}", int(contagem.get(tendencia, 0)))
+
+        selecionadas = st.multiselect(
+            "Tendência",
+            TENDENCIAS,
+            default=[TENDENCIAS[0], TENDENCIAS[2]],
+            key="compare_tendencias",
+        )
+        df_view = df_tendencia[df_tendencia["Tendencia"].isin(selecionadas)]
+        df_view = df_view.sort_values("Inclinacao_VCR", ascending=False)
+        st.dataframe(
+            df_view[
+                [
+                    "headingCode",
+                    "Serie_VCR",
+                    "VCR_Final",
+                    "VCR_Janela_Final",
+                    "Inclinacao_VCR",
+                    "CAGR_FOB",
+                    "Tendencia",
+                ]
+            ],
+            width="stretch",
+            hide_index=True,
+            column_config={
+                "headingCode": "HS4",
+                "Serie_VCR": st.column_config.LineChartColumn("VCR por ano", y_min=0),
+                "VCR_Final": st.column_config.NumberColumn("VCR último ano", format="%.3f"),
+                "VCR_Janela_Final": st.column_config.NumberColumn(
+                    f"VCR {JANELA_PADRAO} anos", format="%.3f"
+                ),
+                "Inclinacao_VCR": st.column_config.NumberColumn(
+                    "Inclinação (VCR/ano)", format="%+.3f"
+                ),
+                "CAGR_FOB": st.column_config.NumberColumn("CAGR FOB", format="percent"),
+                "Tendencia": "Tendência",
+            },
+        )
+
+
+@rastrear("render")
 def render_tab_comex(comexstat_df):
     """
     Renderiza a aba ComexStat (Tab 2).
     """
     st.header("Dados do ComexStat")
 
+    _fragmento_comex(comexstat_df, versao_dataframe(comexstat_df))
+
+
+@fragmento
+def _fragmento_comex(comexstat_df, versao):
+    """Filtros, métricas, tabela de VCR e gráfico da aba ComexStat (fragmento)."""
+    indice = carregar_indice_filtros(comexstat_df, versao, DIMENSOES_COMEXSTAT)
+
+    codigos_busca = _campo_busca("comex_busca")
+    if codigos_busca == []:
+        st.info("Nenhum produto encontrado para a busca.")
+        return
+
     # --- FILTROS DENTRO DA ABA ---
     with st.expander("Opções de Filtragem", expanded=True):
         col_state, col_year, col_hs = st.columns(3)
 
         # 1. Filtro de Estado (UF)
-        states = sorted(comexstat_df["state"].dropna().unique().tolist())
+        states = indice.opcoes["state"]
         default_state = ["Ceará"] if "Ceará" in states else states[:1]
 
         selected_states = col_state.multiselect(
@@ -199,56 +748,45 @@ def render_tab_comex(comexstat_df):
         )
 
         # 2. Filtro de Ano
-        years = sorted(comexstat_df["year"].dropna().unique().astype(int).tolist())
+        years = indice.opcoes["year"]
         selected_years = col_year.multiselect(
             "Selecione o(s) Ano(s)", years, default=years, key="comex_year_select"
         )
 
         # 3. Filtro de Código HS (Lógica completa)
-        df_for_hs_options = comexstat_df.copy()
-        if selected_states:
-            df_for_hs_options = df_for_hs_options[
-                df_for_hs_options["state"].isin(selected_states)
-            ]
-        if selected_years:
-            df_for_hs_options = df_for_hs_options[
-                df_for_hs_options["year"].isin(selected_years)
-            ]
-
-        df_for_hs_options["HS_Desc"] = (
-            df_for_hs_options["headingCode"].astype(str)
-            + " - "
-            + df_for_hs_options["heading"].astype(str).str[:50]
-            + "..."
-        )
-        products_options = sorted(
-            df_for_hs_options["HS_Desc"].dropna().unique().tolist()
+        rotulos_hs = _rotulos_hs_comex(comexstat_df, versao)
+        codigos_disponiveis = indice.opcoes_disponiveis(
+            "headingCode", (("state", selected_states), ("year", selected_years))
         )
+        if codigos_busca is not None:
+            encontrados = set(codigos_busca)
+            codigos_disponiveis = [c for c in codigos_disponiveis if c in encontrados]
+        products_options = sorted(rotulos_hs[c] for c in codigos_disponiveis)
 
         selected_hs_desc = col_hs.multiselect(
             "Selecione o(s) Código(s) HS", products_options, key="comex_hs_select"
         )
         selected_products = [desc.split(" - ")[0] for desc in selected_hs_desc]
 
+        # Sem seleção explícita, a busca define os produtos filtrados
+        if not selected_products and codigos_busca is not None:
+            selected_products = list(codigos_busca)
+
     # --- APLICAÇÃO DOS FILTROS ---
-    comexstat_filtered = comexstat_df.copy()
-    if selected_states:
-        comexstat_filtered = comexstat_filtered[
-            comexstat_filtered["state"].isin(selected_states)
-        ]
-    if selected_years:
-        comexstat_filtered = comexstat_filtered[
-            comexstat_filtered["year"].isin(selected_years)
-        ]
-    if selected_products:
-        comexstat_filtered = comexstat_filtered[
-            comexstat_filtered["headingCode"].isin(selected_products)
-        ]
+    filtros = (
+        ("state", selected_states),
+        ("year", selected_years),
+        ("headingCode", selected_products),
+    )
+    posicoes = indice.selecionar(filtros)
+    comexstat_filtered = materializar(
+        comexstat_df, posicoes, ["state", "headingCode", "heading", "metricFOB"]
+    )
 
     # --- BLOCO DE MÉTRICAS ANALÍTICAS ---
     col_metric1, col_metric2, col_metric3 = st.columns(3)
 
-    total_selected_fob = comexstat_filtered["metricFOB"].sum()
+    total_selected_fob = somar_filtrado(comexstat_df["metricFOB"], posicoes)
     total_brasil_fob = comexstat_df["metricFOB"].sum()
     total_mundo_display = "$49,71 Tri"
 
@@ -271,7 +809,7 @@ def render_tab_comex(comexstat_df):
         df_vcr_display = calcular_vcr_dentro_selecao(comexstat_filtered, comexstat_df)
         df_display = df_vcr_display[
             ["state", "headingCode", "heading", "metricFOB", "VCR"]
-        ].copy()
+        ]
 
         # Renomear e formatar
         df_display = df_display.rename(
@@ -283,9 +821,7 @@ def render_tab_comex(comexstat_df):
                 "VCR": "VCR (Relevância Revelada)",
             }
         )
-        df_display["Valor FOB (US$)"] = df_display["Valor FOB (US$)"].apply(
-            format_fob_metric
-        )
+        df_display["Valor FOB (US$)"] = formatar_fob_coluna(df_display["Valor FOB (US$)"])
         df_display["VCR (Relevância Revelada)"] = df_display[
             "VCR (Relevância Revelada)"
         ].round(3)
@@ -305,75 +841,60 @@ def render_tab_comex(comexstat_df):
             ),
         )
 
-        # --- GRÁFICO DE BARRAS FOB (Top Headings) ---
-        df_agg = (
-            comexstat_filtered.groupby(["heading", "state"])["metricFOB"]
-            .sum()
-            .reset_index()
-        )
-        # Lógica de agrupamento "Demais/Outros" (MANTIDA)
-        total_fob_selection = df_agg["metricFOB"].sum()
-        THRESHOLD_PERCENT = 0.02
-
-        df_agg["percentage"] = df_agg["metricFOB"] / total_fob_selection
-        df_small = df_agg[df_agg["percentage"] < THRESHOLD_PERCENT].copy()
-
-        if not df_small.empty:
-            outros_fob = df_small["metricFOB"].sum()
-            outros_data = pd.DataFrame(
-                [
-                    {
-                        "heading": f"Demais/Outros (< {THRESHOLD_PERCENT * 100:.0f}%)",
-                        "state": "Agregado",
-                        "metricFOB": outros_fob,
-                        "percentage": outros_fob / total_fob_selection,
-                    }
-                ]
-            )
-            df_large = df_agg[df_agg["percentage"] >= THRESHOLD_PERCENT]
-            df_plot = pd.concat([df_large, outros_data], ignore_index=True)
-        else:
-            df_plot = df_agg.copy()
-
-        # Gráfico de barras FOB
-        fig = px.bar(
-            df_plot.sort_values(by="metricFOB", ascending=False),
-            x="heading",
-            y="metricFOB",
-            color="state",
-            title=f"Valor FOB por Título (Top Headings + Demais/Outros)",
-            labels={
-                "heading": "Título (Heading)",
-                "metricFOB": "Valor FOB (US$)",
+        # Exportação com FOB numérico e VCR sem arredondamento (não a tabela formatada)
+        render_exportacao(
+            df_vcr_display,
+            "vcr_comexstat",
+            key="comex_exportar",
+            assinatura=assinatura_filtros(versao, filtros),
+            colunas={
                 "state": "Estado",
+                "headingCode": "Código HS",
+                "heading": "Descrição do Produto",
+                "VCR": "VCR (Relevância Revelada)",
+                "metricFOB": "Valor FOB (US$)",
             },
-            hover_data={"percentage": ":.2%"},
         )
-        st.plotly_chart(fig, use_container_width=True)
+
+        # --- GRÁFICO DE BARRAS FOB (Top Headings) ---
+        fig = _figura_comex(comexstat_df, posicoes, assinatura_filtros(versao, filtros))
+        with span("plotly_chart", "render"):
+            st.plotly_chart(fig, use_container_width=True)
 
 
+@rastrear("render")
 def render_tab_harvard(harvard_df):
     """
     Renderiza a aba Harvard Dataverse (Tab 3).
     """
     st.header("Dados do Harvard Dataverse")
 
+    _fragmento_harvard(harvard_df, versao_dataframe(harvard_df))
+
+
+@fragmento
+def _fragmento_harvard(harvard_df, versao):
+    """Filtros, tabelas e gráfico da aba Harvard Dataverse (fragmento)."""
+    indice = carregar_indice_filtros(harvard_df, versao, DIMENSOES_HARVARD)
+
+    codigos_busca = _campo_busca("harvard_busca")
+    if codigos_busca == []:
+        st.info("Nenhum produto encontrado para a busca.")
+        return
+
     # --- FILTROS DENTRO DA ABA ---
     with st.expander("Opções de Filtragem"):
-        df_filtered = harvard_df.copy()
         col_year, col_country, col_hs = st.columns(3)
 
         # 1. Filtro de Ano
-        years = sorted(df_filtered["year"].dropna().unique().astype(int).tolist())
+        years = indice.opcoes["year"]
         selected_years = col_year.multiselect(
             "Selecione o(s) Ano(s)", years, default=years, key="harvard_year_select"
         )
-        if selected_years:
-            df_filtered = df_filtered[df_filtered["year"].isin(selected_years)]
 
         # 2. Filtro de País
-        countries_options = sorted(
-            df_filtered["country_iso3_code"].dropna().unique().astype(str).tolist()
+        countries_options = indice.opcoes_disponiveis(
+            "country_iso3_code", (("year", selected_years),)
         )
         default_country = (
             ["BRA"] if "BRA" in countries_options else countries_options[:1]
@@ -385,24 +906,29 @@ def render_tab_harvard(harvard_df):
             default=default_country,
             key="harvard_country_select",
         )
-        if selected_countries:
-            df_filtered = df_filtered[
-                df_filtered["country_iso3_code"].isin(selected_countries)
-            ]
 
         # 3. Filtro de Código HS
-        products = sorted(
-            df_filtered["product_hs92_code"].dropna().unique().astype(str).tolist()
+        products = indice.opcoes_disponiveis(
+            "product_hs92_code",
+            (("year", selected_years), ("country_iso3_code", selected_countries)),
         )
+        if codigos_busca is not None:
+            encontrados = set(codigos_busca)
+            products = [c for c in products if c in encontrados]
         selected_products = col_hs.multiselect(
             "Selecione o(s) Código(s) HS", products, key="harvard_hs_select"
         )
-        if selected_products:
-            df_filtered = df_filtered[
-                df_filtered["product_hs92_code"].isin(selected_products)
-            ]
-
-    harvard_filtered = df_filtered
+        if not selected_products and codigos_busca is not None:
+            selected_products = list(codigos_busca)
+
+    # --- APLICAÇÃO DOS FILTROS (uma única materialização) ---
+    filtros = (
+        ("year", selected_years),
+        ("country_iso3_code", selected_countries),
+        ("product_hs92_code", selected_products),
+    )
+    posicoes = indice.selecionar(filtros)
+    harvard_filtered = materializar(harvard_df, posicoes)
 
     # --- AGREGAÇÃO PARA EXIBIÇÃO SUMARIZADA E LIMPA ---
     if not harvard_filtered.empty:
@@ -443,12 +969,7 @@ def render_tab_harvard(harvard_df):
 
         # Formatação
         for col in ["Exportação Total (US$)", "Importação Total (US$)"]:
-            df_aggregated[col] = df_aggregated[col].apply(
-                lambda x: format_fob_metric(x)
-                .replace(" Tri", "T")
-                .replace(" Bi", "B")
-                .replace(" Mi", "M")
-            )
+            df_aggregated[col] = formatar_fob_coluna(df_aggregated[col], SUFIXOS_CURTOS)
         for col in [
             "Share Global Médio",
             "VCR Médio",
@@ -462,89 +983,401 @@ def render_tab_harvard(harvard_df):
         st.dataframe(df_aggregated, width="stretch")
 
         with st.expander("Visualizar Detalhes por Produto (Granularidade Máxima)"):
-            st.dataframe(harvard_filtered, width="stretch")
+            render_tabela_paginada(
+                harvard_df,
+                assinatura_filtros(versao, filtros),
+                key="harvard_detalhes",
+                selecao=posicoes,
+            )
 
         # --- GRÁFICO DE BARRA DE PROPORÇÃO DE PRODUTOS ---
         st.subheader("Distribuição de Exportação por Produto (Top 10)")
-        df_product_export = (
-            harvard_filtered.groupby("product_hs92_code")
-            .agg(
-                total_export=("export_value", "sum"),
-                average_pci=("pci", "mean"),
-            )
-            .reset_index()
-        )
-
-        total_global_export = df_product_export["total_export"].sum()
-        df_product_export["proportion"] = (
-            df_product_export["total_export"] / total_global_export
-        )
-        df_plot_product = df_product_export.sort_values(
-            by="total_export", ascending=False
-        ).head(15)
-
-        fig = px.bar(
-            df_plot_product,
-            x="product_hs92_code",
-            y="proportion",
-            color="proportion",
-            title="Proporção de Exportação (Export Value) por Código HS",
-            labels={
-                "product_hs92_code": "Código HS (Produto)",
-                "proportion": "Proporção do Total (%)",
-                "total_export": "Valor Exportado (US$)",
-            },
-            hover_data={
-                "total_export": True,
-                "average_pci": ":.3f",
-                "proportion": ":.2%",
-            },
-            template="plotly_dark",
-        )
-        fig.update_layout(yaxis_tickformat=".0%")
-
-        st.plotly_chart(fig, use_container_width=True)
+        fig = _figura_harvard(harvard_df, posicoes, assinatura_filtros(versao, filtros))
+        with span("plotly_chart", "render"):
+            st.plotly_chart(fig, use_container_width=True)
     else:
         st.info("Nenhum dado encontrado com os filtros aplicados.")
 
 
+@rastrear("render")
 def render_tab_comtrade(comtrade_df):
     """
     Renderiza a aba Comtrade (Tab 4).
     """
     st.header("Dados do Comtrade")
 
+    _fragmento_comtrade(comtrade_df, versao_dataframe(comtrade_df))
+
+
+@fragmento
+def _fragmento_comtrade(comtrade_df, versao):
+    """Filtros, tabela e gráfico da aba Comtrade (fragmento)."""
+    indice = carregar_indice_filtros(comtrade_df, versao, DIMENSOES_COMTRADE)
+
+    codigos_busca = _campo_busca("comtrade_busca")
+    if codigos_busca == []:
+        st.info("Nenhum produto encontrado para a busca.")
+        return
+
     # --- FILTROS DENTRO DA ABA ---
     with st.expander("Opções de Filtragem"):
-        df_filtered = comtrade_df.copy()
         col_year, col_hs = st.columns(2)
 
         # Filtro de ano
-        years = sorted(df_filtered["refYear"].dropna().unique().astype(int).tolist())
+        years = indice.opcoes["refYear"]
         selected_years = col_year.multiselect(
             "Selecione o(s) Ano(s)", years, default=years, key="comtrade_year_select"
         )
-        if selected_years:
-            df_filtered = df_filtered[df_filtered["refYear"].isin(selected_years)]
 
         # Filtro de produto (códigos HS)
-        products = sorted(df_filtered["cmdCode"].dropna().unique().astype(str).tolist())
+        products = indice.opcoes_disponiveis("cmdCode", (("refYear", selected_years),))
+        if codigos_busca is not None:
+            encontrados = set(codigos_busca)
+            products = [c for c in products if c in encontrados]
         selected_products = col_hs.multiselect(
             "Selecione o(s) Código(s) HS", products, key="comtrade_hs_select"
         )
-        if selected_products:
-            df_filtered = df_filtered[df_filtered["cmdCode"].isin(selected_products)]
+        if not selected_products and codigos_busca is not None:
+            selected_products = list(codigos_busca)
+
+    # --- APLICAÇÃO DOS FILTROS (uma única materialização) ---
+    filtros = (("refYear", selected_years), ("cmdCode", selected_products))
+    posicoes = indice.selecionar(filtros)
+
+    render_tabela_paginada(
+        comtrade_df,
+        assinatura_filtros(versao, filtros),
+        key="comtrade_tabela",
+        selecao=posicoes,
+    )
 
-    comtrade_filtered = df_filtered
+    if len(posicoes):
+        # Gráfico de pizza para a distribuição do valor primário por produto
+        fig = _figura_comtrade(comtrade_df, posicoes, assinatura_filtros(versao, filtros))
+        with span("plotly_chart", "render"):
+            st.plotly_chart(fig, use_container_width=True)
 
-    st.dataframe(comtrade_filtered, width="stretch")
 
-    if not comtrade_filtered.empty:
-        # Gráfico de pizza para a distribuição do valor primário por produto
-        fig = px.pie(
-            comtrade_filtered,
-            names="cmdDesc",
-            values="primaryValue",
-            title="Distribuição do Valor Primário por Descrição do Produto",
+@rastrear_cache(st.cache_data(show_spinner=False), etapa="carga")
+def _opcoes_municipais(versao):
+    """Estados e anos presentes nos agregados municipais."""
+    return opcoes_agregados()
+
+
+@rastrear_cache(st.cache_data(show_spinner=False), etapa="carga")
+def _vcr_municipal(estado, ano, versao):
+    """VCR municipal de um estado/ano, lida dos agregados pré-calculados."""
+    return ler_vcr_municipal(estado, ano)
+
+
+@rastrear("render")
+def render_tab_municipal():
+    """
+    Renderiza a aba Municípios: VCR de cada município x HS4 contra o estado e contra
+    o Brasil, lida dos agregados gerados por src/municipal_cli.py.
+    """
+    st.header("Exportações por Município")
+
+    versao = versao_agregados()
+    opcoes = _opcoes_municipais(versao)
+    if not opcoes:
+        st.info(
+            "Agregados municipais ainda não gerados. Alimente o store e calcule a VCR com "
+            "`python src/municipal_cli.py importar <parquet>` (ou `baixar`) e "
+            "`python src/municipal_cli.py agregar`."
         )
-        st.plotly_chart(fig, use_container_width=True)
+        return
+    _fragmento_municipal(opcoes, versao)
+
+
+@fragmento
+def _fragmento_municipal(opcoes, versao):
+    """Seleção de estado/ano, ranking de municípios e VCR por produto (fragmento)."""
+    col_estado, col_ano = st.columns(2)
+    estados = opcoes["estados"]
+    estado = col_estado.selectbox(
+        "Estado",
+        estados,
+        index=estados.index(TARGET_STATE_NAME) if TARGET_STATE_NAME in estados else 0,
+        key="municipal_estado",
+    )
+    ano = col_ano.selectbox("Ano", opcoes["anos"][::-1], key="municipal_ano")
+
+    df_vcr = _vcr_municipal(estado, ano, versao)
+    if df_vcr.empty:
+        st.info("Nenhum dado municipal para o estado e ano selecionados.")
+        return
+
+    df_municipios = resumo_municipios(df_vcr)
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Municípios exportadores", len(df_municipios))
+    c2.metric("Total (US$)", format_fob_metric(df_municipios["FOB"].sum()))
+    c3.metric(
+        "Participação do maior município",
+        f"{df_municipios['FOB'].iloc[0] / df_municipios['FOB'].sum():.1%}",
+    )
+
+    st.subheader("Municípios por valor exportado")
+    st.dataframe(
+        df_municipios.rename(
+            columns={
+                "city": "Município",
+                "FOB": "Valor FOB (US$)",
+                "Diversidade": "HS4 com VCR ≥ 1 (Brasil)",
+                "Principal_HS4": "Principal HS4",
+            }
+        ).drop(columns="cityCode"),
+        width="stretch",
+        hide_index=True,
+        column_config={"Valor FOB (US$)": st.column_config.NumberColumn(format="compact")},
+    )
+
+    st.subheader("VCR por produto no município")
+    municipio = st.selectbox(
+        "Município", df_municipios["city"].tolist(), key="municipal_municipio"
+    )
+    df_view = df_vcr[df_vcr["city"] == municipio].sort_values("VCR_Brasil", ascending=False)
+    st.dataframe(
+        df_view[
+            ["headingCode", "heading", "FOB", "VCR_Estado", "VCR_Brasil", "Participacao_Estado"]
+        ],
+        width="stretch",
+        hide_index=True,
+        column_config={
+            "headingCode": "HS4",
+            "heading": "Produto",
+            "FOB": st.column_config.NumberColumn("Valor FOB (US$)", format="compact"),
+            "VCR_Estado": st.column_config.NumberColumn("VCR vs. estado", format="%.3f"),
+            "VCR_Brasil": st.column_config.NumberColumn("VCR vs. Brasil", format="%.3f"),
+            "Participacao_Estado": st.column_config.NumberColumn(
+                "Fatia do estado no HS4", format="percent"
+            ),
+        },
+    )
+
+
+# --- SETORES CNAE (ALOCAÇÃO NCM -> CNAE) ---
+
+MODOS_ALOCACAO_ROTULOS = {
+    "uniforme": "Partes iguais entre as CNAEs do NCM",
+    "principal": "Só a CNAE principal do NCM",
+    "personalizado": "Pesos personalizados (resources/pesos_ncm_cnae.csv)",
+}
+
+
+@rastrear_cache(st.cache_data(show_spinner=False))
+def _vcr_setorial(_comexstat_df, versao, modo):
+    """VCR e ranking dos estados por CNAE, com o HS4 alocado conforme o modo."""
+    df_ncm = carregar_tabela_ncm_xls(NCM_CNAE_PATH)
+    if df_ncm is None:
+        return None
+    pesos = carregar_pesos_cnae(PESOS_CNAE_PATH) if modo == "personalizado" else None
+    return vcr_setorial_estados(_comexstat_df, df_ncm, modo, pesos)
+
+
+@rastrear("render")
+def render_tab_cnae(comexstat_df):
+    """
+    Renderiza a aba Setores CNAE: exportações do ComexStat alocadas às classes
+    CNAE pela tabela NCM x CNAE, com VCR e ranking setorial de cada estado.
+    """
+    st.header("Especialização por Setor (CNAE)")
+    _fragmento_cnae(comexstat_df, versao_dataframe(comexstat_df))
+
+
+@fragmento
+def _fragmento_cnae(comexstat_df, versao):
+    """Modo de alocação, estado/ano, cobertura e ranking setorial (fragmento)."""
+    modos = [m for m in MODOS_ALOCACAO_ROTULOS if m != "personalizado"]
+    if carregar_pesos_cnae(PESOS_CNAE_PATH) is not None:
+        modos.append("personalizado")
+    modo = st.radio(
+        "Alocação NCM → CNAE",
+        modos,
+        format_func=MODOS_ALOCACAO_ROTULOS.get,
+        horizontal=True,
+        key="cnae_modo",
+        help=(
+            "Um NCM pode corresponder a várias CNAEs; o valor exportado de cada HS4 é "
+            "dividido entre os seus NCMs e, de cada NCM, entre as suas CNAEs."
+        ),
+    )
+    df_setores = _vcr_setorial(comexstat_df, versao, modo)
+    if df_setores is None:
+        st.info(f"Tabela NCM x CNAE não encontrada em `{NCM_CNAE_PATH}`.")
+        return
+
+    col_estado, col_ano = st.columns(2)
+    estados = sorted(df_setores["state"].unique())
+    estado = col_estado.selectbox(
+        "Estado",
+        estados,
+        index=estados.index(TARGET_STATE_NAME) if TARGET_STATE_NAME in estados else 0,
+        key="cnae_estado",
+    )
+    ano = col_ano.selectbox(
+        "Ano", sorted(df_setores["year"].unique(), reverse=True), key="cnae_ano"
+    )
+
+    df_estado = df_setores[(df_setores["year"] == ano) & (df_setores["state"] == estado)]
+    nao_mapeado = df_estado.loc[df_estado["cnae7"] == CNAE_NAO_MAPEADA, "FOB"].sum()
+    total = df_estado["FOB"].sum()
+    df_view = df_estado[df_estado["cnae7"] != CNAE_NAO_MAPEADA]
+
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Valor FOB alocado", format_fob_metric(total - nao_mapeado))
+    c2.metric("Cobertura da tabela NCM x CNAE", f"{1 - nao_mapeado / total:.1%}" if total else "–")
+    c3.metric("Setores com VCR ≥ 1", int((df_view["VCR"] >= 1).sum()))
+
+    st.dataframe(
+        df_view[["Ranking", "cnae7", "FOB", "VCR", "Participacao_Setor"]],
+        width="stretch",
+        hide_index=True,
+        column_config={
+            "cnae7": st.column_config.TextColumn("CNAE", width="small"),
+            "FOB": st.column_config.NumberColumn("Valor FOB (US$)", format="compact"),
+            "VCR": st.column_config.NumberColumn("VCR vs. Brasil", format="%.3f"),
+            "Participacao_Setor": st.column_config.NumberColumn(
+                "Fatia do estado no setor", format="percent"
+            ),
+        },
+    )
+
+
+# --- MODO MENSAL (ROLL-UPS PRÉ-CALCULADOS) ---
+
+NOMES_MESES = [
+    "jan", "fev", "mar", "abr", "mai", "jun", "jul", "ago", "set", "out", "nov", "dez"
+]
+
+
+@rastrear_cache(st.cache_data(show_spinner=False), etapa="carga")
+def _rollup(tipo, estado, anos, periodos, versao):
+    """Leitura filtrada de um roll-up mensal (só as partições pedidas)."""
+    return ler_rollup(tipo, estado, anos, periodos)
+
+
+@rastrear("render")
+def render_tab_mensal():
+    """
+    Renderiza a aba Mensal: acumulado no ano (YTD), 12 meses móveis e sazonalidade,
+    lidos dos roll-ups gerados por src/mensal_cli.py (nenhuma linha bruta é lida aqui).
+    """
+    st.header("Exportações Mensais e Sazonalidade")
+
+    meses = meses_disponiveis()
+    if not meses:
+        st.info(
+            "Roll-ups mensais ainda não gerados. Alimente o store com "
+            "`python src/mensal_cli.py importar <parquet>` (ou `baixar AAAA-MM AAAA-MM`)."
+        )
+        return
+    _fragmento_mensal(meses, versao_rollups())
+
+
+@fragmento
+def _fragmento_mensal(meses, versao):
+    """Estado e mês de referência, métricas YTD/T12M, sazonalidade e VCR acumulada."""
+    col_estado, col_mes = st.columns(2)
+    ano, mes = col_mes.selectbox(
+        "Mês de referência",
+        meses[::-1],
+        format_func=lambda am: f"{NOMES_MESES[am[1] - 1]}/{am[0]}",
+        key="mensal_mes",
+    )
+    df_ytd_todos = _rollup("acumulado", None, (ano,), (mes,), versao)
+    estados = sorted(df_ytd_todos["state"].unique())
+    estado = col_estado.selectbox(
+        "Estado",
+        estados,
+        index=estados.index(TARGET_STATE_NAME) if TARGET_STATE_NAME in estados else 0,
+        key="mensal_estado",
+    )
+
+    df_ytd = df_ytd_todos[df_ytd_todos["state"] == estado]
+    df_ytd_anterior = _rollup("acumulado", estado, (ano - 1,), (mes,), versao)
+    df_t12m = _rollup("t12m", estado, (ano,), (mes,), versao)
+    df_t12m_anterior = _rollup("t12m", estado, (ano - 1,), (mes,), versao)
+
+    # --- MÉTRICAS: ACUMULADO NO ANO E 12 MESES MÓVEIS ---
+    def variacao(atual, anterior):
+        total = anterior["FOB"].sum()
+        if anterior.empty or total == 0:
+            return None
+        return f"{atual['FOB'].sum() / total - 1:+.1%}"
+
+    c1, c2 = st.columns(2)
+    c1.metric(
+        f"Acumulado jan–{NOMES_MESES[mes - 1]}/{ano}",
+        format_fob_metric(df_ytd["FOB"].sum()),
+        delta=variacao(df_ytd, df_ytd_anterior),
+    )
+    c2.metric(
+        f"12 meses até {NOMES_MESES[mes - 1]}/{ano}",
+        format_fob_metric(df_t12m["FOB"].sum()),
+        delta=variacao(df_t12m, df_t12m_anterior),
+    )
+
+    # --- SAZONALIDADE ---
+    st.subheader("Sazonalidade")
+    df_mensal = _rollup("mensal", estado, None, None, versao)
+    principais = df_ytd.nlargest(50, "FOB")
+    rotulos = dict(
+        zip(
+            principais["headingCode"],
+            principais["headingCode"] + " - " + principais["heading"].str[:50],
+        )
+    )
+    produtos = st.multiselect(
+        "Produtos (vazio: todas as exportações do estado)",
+        list(rotulos),
+        format_func=rotulos.get,
+        key="mensal_produtos",
+    )
+    if produtos:
+        df_mensal = df_mensal[df_mensal["headingCode"].isin(produtos)]
+    df_sazonal = indice_sazonal(df_mensal)
+    fig = px.bar(
+        df_sazonal.assign(Mês=[NOMES_MESES[m - 1] for m in df_sazonal["monthNumber"]]),
+        x="Mês",
+        y="Indice",
+        hover_data={"FOB_Medio": ":,.0f", "Anos": True},
+        labels={"Indice": "Índice sazonal (1 = mês médio)"},
+    )
+    fig.add_hline(y=1, line_dash="dot")
+    with span("plotly_chart", "render"):
+        st.plotly_chart(fig, width="stretch")
+
+    # --- VCR ACUMULADA NO ANO ---
+    st.subheader(f"VCR acumulada no ano (jan–{NOMES_MESES[mes - 1]}/{ano})")
+    df_view = (
+        df_ytd[["headingCode", "heading", "FOB", "VCR"]]
+        .merge(
+            df_ytd_anterior[["headingCode", "VCR"]].rename(columns={"VCR": "VCR_Anterior"}),
+            on="headingCode",
+            how="left",
+        )
+        .merge(
+            df_t12m[["headingCode", "VCR"]].rename(columns={"VCR": "VCR_T12M"}),
+            on="headingCode",
+            how="left",
+        )
+        .sort_values("VCR", ascending=False)
+    )
+    df_view["Variacao_VCR"] = df_view["VCR"] - df_view["VCR_Anterior"]
+    st.dataframe(
+        df_view,
+        width="stretch",
+        hide_index=True,
+        column_config={
+            "headingCode": "HS4",
+            "heading": "Produto",
+            "FOB": st.column_config.NumberColumn("FOB acumulado (US$)", format="compact"),
+            "VCR": st.column_config.NumberColumn("VCR acumulada", format="%.3f"),
+            "VCR_Anterior": st.column_config.NumberColumn(
+                f"VCR acumulada {ano - 1}", format="%.3f"
+            ),
+            "VCR_T12M": st.column_config.NumberColumn("VCR 12 meses", format="%.3f"),
+            "Variacao_VCR": st.column_config.NumberColumn("Variação", format="%+.3f"),
+        },
+    )
@@ -0,0 +1,164 @@
+import functools
+import json
+import os
+import time
+
+import plotly.graph_objects as go
+import streamlit as st
+
+from core import tracing
+from core.config import CACHE_DIR
+
+# Painel escondido: só aparece com ?debug=1 (ou ?debug=perf) na URL
+PARAMETRO_DEBUG = "debug"
+VALORES_ATIVOS = ("1", "perf", "true")
+TRACE_DIR = os.path.join(CACHE_DIR, "traces")
+
+_CHAVE_RASTREADOR = "_perf_rastreador"
+_CHAVE_ALOCACOES = "perf_alocacoes"
+
+CORES_ETAPAS = {"carga": "#636EFA", "analise": "#00CC96", "render": "#EF553B"}
+
+
+def painel_ativo():
+    return st.query_params.get(PARAMETRO_DEBUG, "").lower() in VALORES_ATIVOS
+
+
+def _rastreador():
+    """Rastreador da sessão (últimos reruns), criado sob demanda."""
+    if _CHAVE_RASTREADOR not in st.session_state:
+        st.session_state[_CHAVE_RASTREADOR] = tracing.Rastreador()
+    rastreador = st.session_state[_CHAVE_RASTREADOR]
+    rastreador.alocacoes = st.session_state.get(_CHAVE_ALOCACOES, False)
+    return rastreador
+
+
+# --- 1. INÍCIO DO RASTREIO (SCRIPT E FRAGMENTOS) ---
+
+
+def iniciar_rastreio(rotulo="app"):
+    """
+    Começa a rastrear o rerun do script, se o painel estiver ligado na URL.
+    Devolve o rerun (a ser passado a render_painel) ou None.
+    """
+    if not painel_ativo():
+        return None
+    return _rastreador().iniciar(rotulo)
+
+
+def fragmento(func):
+    """
+    st.fragment com rastreio: dentro de um rerun completo vira um span; quando só o
+    fragmento reexecuta (mexer num controle), abre um rerun próprio no rastreador.
+    """
+
+    @functools.wraps(func)
+    def executar(*args, **kwargs):
+        if tracing.rastreando():
+            with tracing.span(func.__name__, "render"):
+                return func(*args, **kwargs)
+        if not painel_ativo():
+            return func(*args, **kwargs)
+        with _rastreador().rerun(f"fragmento {func.__name__}"):
+            return func(*args, **kwargs)
+
+    return st.fragment(executar)
+
+
+# --- 2. PAINEL ---
+
+
+def _rotulo_rerun(rerun):
+    duracao = "em andamento" if rerun.duracao is None else f"{rerun.duracao * 1000:.0f} ms"
+    return (
+        f"{time.strftime('%H:%M:%S', time.localtime(rerun.quando))} · {rerun.rotulo} · "
+        f"{duracao} · {len(rerun.spans)} spans"
+    )
+
+
+def _figura_chama(rerun):
+    """Gráfico de chama: um retângulo por span, na linha da sua profundidade."""
+    fig = go.Figure()
+    for etapa in tracing.ETAPAS:
+        spans = [s for s in rerun.spans if s.etapa == etapa]
+        if not spans:
+            continue
+        fig.add_trace(
+            go.Bar(
+                name=etapa,
+                orientation="h",
+                y=[s.profundidade for s in spans],
+                x=[s.duracao * 1000 for s in spans],
+                base=[s.inicio * 1000 for s in spans],
+                text=[s.nome for s in spans],
+                textposition="inside",
+                insidetextanchor="start",
+                marker_color=CORES_ETAPAS[etapa],
+                marker_line={"color": "white", "width": 1},
+                customdata=[
+                    [
+                        s.linhas_entrada,
+                        s.linhas_saida,
+                        s.cache or "-",
+                        "-" if s.bytes_alocados is None else f"{s.bytes_alocados / 2**20:.1f}",
+                    ]
+                    for s in spans
+                ],
+                hovertemplate=(
+                    "<b>%{text}</b><br>%{x:.1f} ms (início %{base:.1f} ms)"
+                    "<br>linhas: %{customdata[0]} → %{customdata[1]}"
+                    "<br>cache: %{customdata[2]} · alocado: %{customdata[3]} MB<extra></extra>"
+                ),
+            )
+        )
+    profundidade = max((s.profundidade for s in rerun.spans), default=0)
+    fig.update_layout(
+        barmode="overlay",
+        height=120 + 32 * (profundidade + 1),
+        margin={"l": 10, "r": 10, "t": 30, "b": 10},
+        xaxis_title="ms desde o início do rerun",
+        yaxis={"autorange": "reversed", "dtick": 1, "title": "profundidade"},
+        legend={"orientation": "h", "y": 1.1},
+    )
+    return fig
+
+
+def render_painel(rerun):
+    """
+    Fecha o rerun rastreado e mostra o painel: gráfico de chama do rerun escolhido,
+    resumo por span e exportação em Chrome trace (chrome://tracing, Perfetto).
+    """
+    if rerun is None:
+        return
+    rastreador = _rastreador()
+    rastreador.finalizar(rerun)
+
+    with st.expander("🔧 Desempenho (depuração)", expanded=True):
+        st.checkbox(
+            "Medir alocações (tracemalloc; deixa o app mais lento)", key=_CHAVE_ALOCACOES
+        )
+        reruns = list(rastreador.reruns)[::-1]
+        indice = st.selectbox(
+            "Rerun",
+            range(len(reruns)),
+            format_func=lambda i: _rotulo_rerun(reruns[i]),
+            key="perf_rerun",
+        )
+        escolhido = reruns[indice or 0]
+        st.plotly_chart(_figura_chama(escolhido), use_container_width=True)
+        st.dataframe(
+            tracing.resumo_spans(escolhido), hide_index=True, use_container_width=True
+        )
+
+        col_baixar, col_salvar = st.columns(2)
+        col_baixar.download_button(
+            "Baixar rastro (Chrome trace)",
+            data=json.dumps(tracing.chrome_trace(reruns[::-1]), ensure_ascii=False),
+            file_name="rastro.json",
+            mime="application/json",
+            key="perf_baixar",
+        )
+        if col_salvar.button(f"Salvar em {TRACE_DIR}", key="perf_salvar"):
+            caminho = os.path.join(TRACE_DIR, time.strftime("rastro-%Y%m%d-%H%M%S.json"))
+            tracing.exportar_chrome_trace(reruns[::-1], caminho)
+            st.success(f"Rastro gravado em {caminho}")
@@ -0,0 +1,58 @@
+import tempfile
+
+import streamlit as st
+
+from core.export import FORMATOS_EXPORTACAO, exportar_para_arquivo
+
+# Acima disso o arquivo gerado vai do buffer em memória para um temporário em disco
+LIMITE_MEMORIA_EXPORTACAO = 32 * 1024 * 1024
+
+
+def render_exportacao(fonte, nome_base, key, assinatura, colunas=None):
+    """
+    Ações de exportação (CSV, Parquet ou XLSX) do resultado atual de uma tabela.
+
+    O arquivo só é gerado quando o usuário pede, em lotes (core.export), para um
+    temporário que passa ao disco quando cresce; fica guardado na sessão enquanto a
+    `assinatura` (versão dos dados + filtros) e o formato forem os mesmos.
+
+    fonte: DataFrame (pandas/polars) ou tabela Arrow com o resultado, sem formatação.
+    colunas: dict opcional {coluna da fonte: nome no arquivo}.
+    """
+    c1, c2 = st.columns([1, 3])
+    formato = c1.selectbox(
+        "Formato",
+        list(FORMATOS_EXPORTACAO),
+        format_func=str.upper,
+        key=f"{key}_formato",
+        label_visibility="collapsed",
+    )
+    mime, extensao = FORMATOS_EXPORTACAO[formato]
+
+    chave_arquivo = f"{key}_arquivo"
+    gerado = st.session_state.get(chave_arquivo)
+    if gerado is not None and gerado[0] != (assinatura, formato):
+        gerado[1].close()
+        del st.session_state[chave_arquivo]
+        gerado = None
+
+    if gerado is None:
+        if not c2.button("📦 Preparar exportação", key=f"{key}_preparar"):
+            return
+        arquivo = tempfile.SpooledTemporaryFile(max_size=LIMITE_MEMORIA_EXPORTACAO)
+        with st.spinner("Gerando arquivo..."):
+            exportar_para_arquivo(fonte, formato, arquivo, colunas=colunas)
+        gerado = ((assinatura, formato), arquivo)
+        st.session_state[chave_arquivo] = gerado
+
+    # O download_button entrega bytes ao navegador; o temporário é a cópia estável
+    arquivo = gerado[1]
+    arquivo.seek(0)
+    c2.download_button(
+        f"⬇️ Baixar {formato.upper()}",
+        data=arquivo.read(),
+        file_name=f"{nome_base}{extensao}",
+        mime=mime,
+        key=f"{key}_baixar",
+        on_click="ignore",
+    )
@@ -0,0 +1,108 @@
+import numpy as np
+import streamlit as st
+
+from core.filters import materializar
+from core.tracing import rastrear_cache
+
+TAMANHOS_PAGINA = [25, 50, 100, 250]
+SEM_ORDENACAO = "(ordem original)"
+SEM_FILTRO = "(sem filtro)"
+
+
+@rastrear_cache(
+    st.cache_resource(show_spinner=False, max_entries=32), etapa="render"
+)
+def _posicoes_ordenadas(_df, _posicoes, chave, coluna_ordem, crescente, coluna_filtro, termo):
+    """
+    Posições (no DataFrame base) das linhas da tabela depois do filtro de texto e da
+    ordenação. Fica em cache por (chave dos dados, ordenação, filtro): trocar de
+    página não refaz nada, e o resultado é compartilhado sem cópia.
+    """
+    posicoes = _posicoes
+    if coluna_filtro != SEM_FILTRO and termo:
+        valores = _df[coluna_filtro].iloc[posicoes].astype(str)
+        contem = valores.str.contains(termo, case=False, regex=False).to_numpy()
+        posicoes = posicoes[contem]
+
+    if coluna_ordem != SEM_ORDENACAO:
+        serie = _df[coluna_ordem].iloc[posicoes].reset_index(drop=True)
+        ordem = serie.sort_values(
+            ascending=crescente, kind="stable", na_position="last"
+        ).index.to_numpy()
+        posicoes = posicoes[ordem]
+
+    return posicoes
+
+
+def render_tabela_paginada(df, chave_dados, key, selecao=None, colunas=None):
+    """
+    Tabela paginada no servidor: filtro, ordenação e paginação são resolvidos aqui
+    sobre o DataFrame em cache, e só as linhas da página atual (nas colunas
+    escolhidas) são enviadas ao navegador.
+
+    df: DataFrame base (não é copiado).
+    chave_dados: identifica o conteúdo de df + selecao (versão e filtros aplicados).
+    key: prefixo das chaves dos widgets.
+    selecao: posições ou máscara booleana das linhas já filtradas (None = todas).
+    colunas: colunas exibidas por padrão (None = todas).
+    """
+    if selecao is None:
+        posicoes = np.arange(len(df))
+    elif selecao.dtype == bool:
+        posicoes = np.flatnonzero(selecao)
+    else:
+        posicoes = selecao
+
+    todas_colunas = list(df.columns)
+    c_colunas, c_ordem, c_sentido = st.columns([3, 2, 1])
+    colunas_exibidas = c_colunas.multiselect(
+        "Colunas",
+        todas_colunas,
+        default=list(colunas) if colunas else todas_colunas,
+        key=f"{key}_colunas",
+    )
+    coluna_ordem = c_ordem.selectbox(
+        "Ordenar por", [SEM_ORDENACAO] + todas_colunas, key=f"{key}_ordem"
+    )
+    crescente = (
+        c_sentido.radio(
+            "Sentido", ["↑", "↓"], horizontal=True, key=f"{key}_sentido"
+        )
+        == "↑"
+    )
+
+    c_filtro, c_termo, c_tamanho = st.columns([2, 3, 1])
+    coluna_filtro = c_filtro.selectbox(
+        "Filtrar coluna", [SEM_FILTRO] + todas_colunas, key=f"{key}_filtro"
+    )
+    termo = c_termo.text_input(
+        "Contém", key=f"{key}_termo", disabled=coluna_filtro == SEM_FILTRO
+    )
+    tamanho = c_tamanho.selectbox(
+        "Linhas/página", TAMANHOS_PAGINA, index=1, key=f"{key}_tamanho"
+    )
+
+    if coluna_ordem != SEM_ORDENACAO or (coluna_filtro != SEM_FILTRO and termo):
+        posicoes = _posicoes_ordenadas(
+            df, posicoes, chave_dados, coluna_ordem, crescente, coluna_filtro, termo
+        )
+
+    total = len(posicoes)
+    n_paginas = max(1, -(-total // tamanho))
+    pagina = st.number_input(
+        f"Página (de {n_paginas})",
+        min_value=1,
+        max_value=n_paginas,
+        value=1,
+        step=1,
+        key=f"{key}_pagina",
+    )
+    pagina = min(int(pagina), n_paginas)
+    inicio = (pagina - 1) * tamanho
+    fim = min(inicio + tamanho, total)
+
+    st.dataframe(
+        materializar(df, posicoes[inicio:fim], colunas_exibidas or todas_colunas),
+        width="stretch",
+    )
+    st.caption(f"Linhas {inicio + 1 if total else 0}–{fim} de {total:,}".replace(",", "."))
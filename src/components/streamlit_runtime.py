@@ -0,0 +1,31 @@
+import streamlit as st
+
+from core import runtime
+
+
+class CacheStreamlit:
+    """Backend de cache do núcleo sobre st.cache_data / st.cache_resource."""
+
+    def envolver(self, func, tipo, **opcoes):
+        decorador = st.cache_resource if tipo == "recurso" else st.cache_data
+        return decorador(func, **opcoes)
+
+
+_BACKEND = CacheStreamlit()
+
+
+def instalar():
+    """
+    Liga o núcleo (core) ao Streamlit: caches compartilhados entre sessões do app
+    e erros não fatais exibidos com st.error.
+    """
+    runtime.configurar(backend=_BACKEND, relator_erros=st.error)
+
+
+def carregar_ou_parar(carregar, *args):
+    """Executa uma carga do núcleo; em ErroDados, mostra a mensagem e encerra o script."""
+    try:
+        return carregar(*args)
+    except runtime.ErroDados as erro:
+        st.error(str(erro))
+        st.stop()
@@ -1,22 +1,14 @@
 # Arquivo: analytics.py
 import pandas as pd
 import numpy as np
-import streamlit as st
 
-
-def format_fob_metric(value):
-    if value >= 1e12:
-        display = f"${value / 1e12:,.2f} Tri"
-    elif value >= 1e9:
-        display = f"${value / 1e9:,.2f} Bi"
-    elif value >= 1e6:
-        display = f"${value / 1e6:,.2f} Mi"
-    else:
-        display = f"${value:,.2f}"
-    return display.replace(",", "_TEMP_").replace(".", ",").replace("_TEMP_", ".")
+from .formatting import format_fob_metric
+from .hs_hierarchy import normalizar_codigo_hs
+from .runtime import cache_dados, relatar_erro
+from .tracing import rastrear
 
 
-@st.cache_data
+@cache_dados
 def calcular_vcr_ceara_brasil(df_comexstat):
     df_comexstat_valid = df_comexstat[df_comexstat["metricFOB"] > 0].copy()
     df_comexstat_valid["headingCode"] = df_comexstat_valid["headingCode"].astype(str)
@@ -46,16 +38,16 @@ def calcular_vcr_ceara_brasil(df_comexstat):
     return df_vcr[["headingCode", "VCR_Ceara_Brasil"]]
 
 
-@st.cache_data
+@cache_dados
 def obter_vcr_brasil_mundo(df_harvard):
     df_vcr = df_harvard.rename(
         columns={"product_hs92_code": "headingCode", "export_rca": "VCR_Brasil_Mundo"}
     ).copy()
-    df_vcr["headingCode"] = df_vcr["headingCode"].astype(str).str.zfill(4)
+    df_vcr["headingCode"] = normalizar_codigo_hs(df_vcr["headingCode"], 4)
     return df_vcr.groupby("headingCode")["VCR_Brasil_Mundo"].mean().reset_index()
 
 
-@st.cache_data
+@cache_dados
 def obter_pci_e_distancia(df_harvard):
     df_metrics = df_harvard.rename(
         columns={
@@ -64,7 +56,7 @@ def obter_pci_e_distancia(df_harvard):
             "distance": "Distancia_Parceiros",
         }
     ).copy()
-    df_metrics["headingCode"] = df_metrics["headingCode"].astype(str).str.zfill(4)
+    df_metrics["headingCode"] = normalizar_codigo_hs(df_metrics["headingCode"], 4)
     return (
         df_metrics.groupby("headingCode")
         .agg({"PCI": "mean", "Distancia_Parceiros": "mean"})
@@ -130,7 +122,24 @@ def calcular_indice_prioridade_ajustado(df, pesos):
     return df_calc
 
 
-@st.cache_data
+def explodir_cnae(df_map, coluna="cnae_raw"):
+    """
+    Uma linha por par NCM x CNAE: remove pontos da CNAE e separa múltiplos
+    códigos (ex: "0151.2; 0152.1" vira duas linhas). A coluna `ordem_cnae` guarda
+    a posição do código na lista original (0 = CNAE principal).
+    """
+    df_map = df_map.assign(cnae_list=df_map[coluna].astype(str).str.split(";"))
+    df_map = df_map.explode("cnae_list")
+    df_map["ordem_cnae"] = df_map.groupby(level=0).cumcount()
+    df_map["cnae7"] = (
+        df_map["cnae_list"].str.replace(r"[\. -]", "", regex=True).str.strip()
+    )
+
+    # Remove códigos inválidos (como XXXX ou SEM TEC)
+    return df_map[df_map["cnae7"].str.isnumeric()].drop(columns="cnae_list")
+
+
+@cache_dados(etapa="carga")
 def carregar_mapeamento_ncm_cnae(file_path: str):
     """
     Carrega e limpa a tabela de correspondência NCM x CNAE.
@@ -144,33 +153,61 @@ def carregar_mapeamento_ncm_cnae(file_path: str):
         df_map.columns = ["ncm8_raw", "ncm_descricao", "cnae_raw"]
 
         # 1. Limpeza do NCM: remove .0, preenche com zeros à esquerda (8 dígitos)
-        df_map["ncm8"] = (
-            df_map["ncm8_raw"]
-            .astype(str)
-            .str.replace(r"\.0$", "", regex=True)
-            .str.zfill(8)
-        )
+        df_map["ncm8"] = normalizar_codigo_hs(df_map["ncm8_raw"], 8)
 
         # 2. Extração do SH4 (Prefixos)
-        df_map["sh4"] = df_map["ncm8"].str[:4]
-
-        # 3. Limpeza da CNAE: Remove pontos e lida com múltiplos códigos (explode)
-        # Ex: "0151.2; 0152.1" vira duas linhas
-        df_map["cnae_list"] = df_map["cnae_raw"].astype(str).str.split(";")
-        df_map = df_map.explode("cnae_list")
-        df_map["cnae7"] = (
-            df_map["cnae_list"].str.replace(r"[\. -]", "", regex=True).str.strip()
-        )
+        df_map["sh4"] = normalizar_codigo_hs(df_map["ncm8"], 4)
 
-        # Remove códigos inválidos (como XXXX ou SEM TEC)
-        df_map = df_map[df_map["cnae7"].str.isnumeric()]
+        # 3. Limpeza da CNAE: uma linha por código (ver explodir_cnae)
+        df_map = explodir_cnae(df_map)
 
         return df_map[["ncm8", "sh4", "ncm_descricao", "cnae7"]]
     except Exception as e:
-        st.error(f"Erro ao carregar mapeamento NCM/CNAE: {e}")
+        relatar_erro(f"Erro ao carregar mapeamento NCM/CNAE: {e}")
         return pd.DataFrame()
 
 
+@cache_dados(etapa="carga")
+def carregar_tabela_ncm_xls(file_path: str):
+    """
+    Lê a tabela NCM x CNAE (.xls) com NCM8 e HS4 normalizados, descrição da NCM
+    e o texto bruto da CNAE. Retorna None se o arquivo não puder ser lido.
+    """
+    try:
+        df_map_raw = pd.read_excel(file_path, skiprows=1, engine="xlrd").iloc[:, :3]
+    except Exception:
+        return None
+
+    df_map_raw.columns = ["ncm_raw", "desc_ncm", "cnae_raw"]
+    df_map_raw["ncm8"] = normalizar_codigo_hs(df_map_raw["ncm_raw"], 8)
+    df_map_raw["headingCode"] = normalizar_codigo_hs(df_map_raw["ncm8"], 4)
+    return df_map_raw
+
+
+@cache_dados(etapa="carga")
+def carregar_ponte_ncm_hs4(file_path: str):
+    """
+    Agrupa a tabela NCM x CNAE (.xls) por HS4, juntando os NCMs e as CNAEs
+    de cada posição em uma única linha. Retorna None se o arquivo não puder ser lido.
+    """
+    df_map_raw = carregar_tabela_ncm_xls(file_path)
+    if df_map_raw is None:
+        return None
+
+    return (
+        df_map_raw.groupby("headingCode")
+        .agg(
+            {
+                "ncm8": lambda x: ", ".join(sorted(set(x.astype(str)))),
+                "cnae_raw": lambda x: ", ".join(
+                    sorted(set(str(val) for val in x if str(val).lower() != "nan"))
+                ),
+            }
+        )
+        .reset_index()
+    )
+
+
 def filtrar_mapeamento_por_cliente(
     df_map, ncm_exportados_cliente: list, cnaes_cliente: list = None
 ):
@@ -188,6 +225,7 @@ def filtrar_mapeamento_por_cliente(
     return df_filtered
 
 
+@rastrear("analise")
 def classificar_cenarios_vcr(df):
     """
     Classifica os produtos em IDs de Cenário (1 a 7).
@@ -204,29 +242,29 @@ def classificar_cenarios_vcr(df):
         "Cenário 7": "Setores sem Vantagem Comparativa ou Potencial de Vantagem",
     }
 
-    def definir_id(row):
-        vce = row.get("VCR_Ceara_Brasil", 0)
-        vbr = row.get("VCR_Brasil_Mundo", 0)
+    def _coluna(nome):
+        if nome in df.columns:
+            return pd.to_numeric(df[nome], errors="coerce").to_numpy(dtype=float)
+        return np.zeros(len(df))
 
-        # Lógica de Quadrantes VCR >= 1.0
-        if vce >= 1 and vbr >= 1:
-            return "Cenário 1"
-        if vce >= 1 and vbr < 1:
-            return "Cenário 2"
-        if vce < 1 and vbr >= 1:
-            return "Cenário 3"
+    vce = _coluna("VCR_Ceara_Brasil")
+    vbr = _coluna("VCR_Brasil_Mundo")
 
+    # Condições avaliadas na ordem (a primeira verdadeira define o cenário);
+    # comparações com NaN são falsas e caem no Cenário 7, como na versão por linha
+    condicoes = [
+        # Lógica de Quadrantes VCR >= 1.0
+        (vce >= 1) & (vbr >= 1),
+        (vce >= 1) & (vbr < 1),
+        (vce < 1) & (vbr >= 1),
         # Lógica de Potencial 0.5 <= VCR < 1.0
-        if 0.5 <= vce < 1 and 0.5 <= vbr < 1:
-            return "Cenário 4"
-        if 0.5 <= vce < 1 and vbr < 0.5:
-            return "Cenário 5"
-        if vce < 0.5 and 0 < vbr:
-            return "Cenário 6"
-
-        return "Cenário 7"
+        (0.5 <= vce) & (vce < 1) & (0.5 <= vbr) & (vbr < 1),
+        (0.5 <= vce) & (vce < 1) & (vbr < 0.5),
+        (vce < 0.5) & (0 < vbr),
+    ]
+    cenarios = [f"Cenário {i}" for i in range(1, 7)]
 
-    df["Cenário ID"] = df.apply(definir_id, axis=1)
+    df["Cenário ID"] = np.select(condicoes, cenarios, default="Cenário 7")
     # Criamos esta coluna apenas para consulta se necessário,
     # a visualização usará o 'Cenário ID'
     df["Cenário Descrição"] = df["Cenário ID"].map(descricoes_oficiais)
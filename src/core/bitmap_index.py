@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+
+
+class IndiceBitmap:
+    """
+    Índice bitmap por dimensão de filtro, construído uma vez por versão dos dados.
+
+    Para cada valor distinto de cada dimensão guarda o conjunto de linhas em que ele
+    aparece, em um de dois formatos (mesma ideia dos "containers" do Roaring Bitmap):
+      - posições (uint32 ordenadas) quando o valor é raro;
+      - bitmap compactado (np.packbits, 1 bit por linha) quando o valor é frequente.
+
+    Uma combinação de filtros é avaliada como OR entre os valores de uma dimensão e
+    AND entre dimensões, sem varrer as colunas do DataFrame.
+    """
+
+    # Um valor vira lista de posições quando 4 bytes * ocorrências < n_linhas / 8
+    FATOR_ESPARSO = 32
+
+    def __init__(self, colunas: dict):
+        self.n_linhas = len(next(iter(colunas.values()))) if colunas else 0
+        self._n_bytes = (self.n_linhas + 7) // 8
+        self.opcoes = {}  # dimensão -> lista ordenada de valores distintos
+        self._codigo_valor = {}  # dimensão -> {valor: código}
+        self._codigos = {}  # dimensão -> código por linha (-1 para nulos)
+        self._containers = {}  # dimensão -> lista de ("pos" | "bits", array)
+
+        for dimensao, serie in colunas.items():
+            self._indexar(dimensao, serie)
+
+    @classmethod
+    def de_dataframe(cls, df: pd.DataFrame, dimensoes) -> "IndiceBitmap":
+        return cls({dimensao: df[dimensao] for dimensao in dimensoes})
+
+    def _indexar(self, dimensao, serie: pd.Series):
+        # Anos lidos como float (por causa de nulos) voltam a ser inteiros
+        if pd.api.types.is_float_dtype(serie) and (serie.dropna() % 1 == 0).all():
+            serie = serie.astype("Int64")
+
+        codigos, valores = pd.factorize(serie, sort=True, use_na_sentinel=True)
+        codigos = codigos.astype(np.int32)
+        valores = list(valores.tolist())
+
+        # Ordenação estável por código: as linhas de cada valor ficam contíguas e crescentes
+        ordem = np.argsort(codigos, kind="stable").astype(np.uint32)
+        limites = np.searchsorted(codigos[ordem], np.arange(len(valores) + 1))
+
+        containers = []
+        for k in range(len(valores)):
+            posicoes = ordem[limites[k] : limites[k + 1]]
+            if len(posicoes) * self.FATOR_ESPARSO < self.n_linhas:
+                containers.append(("pos", posicoes))
+            else:
+                bits = np.zeros(self.n_linhas, dtype=bool)
+                bits[posicoes] = True
+                containers.append(("bits", np.packbits(bits)))
+
+        self.opcoes[dimensao] = valores
+        self._codigo_valor[dimensao] = {valor: k for k, valor in enumerate(valores)}
+        self._codigos[dimensao] = codigos
+        self._containers[dimensao] = containers
+
+    # --- OPERAÇÕES DE CONJUNTO ---
+
+    def _marcar_posicoes(self, bits: np.ndarray, posicoes: np.ndarray):
+        deslocamentos = (np.uint8(0x80) >> (posicoes & 7).astype(np.uint8)).astype(
+            np.uint8
+        )
+        np.bitwise_or.at(bits, posicoes >> 3, deslocamentos)
+
+    @staticmethod
+    def _testar_bits(bits: np.ndarray, posicoes: np.ndarray) -> np.ndarray:
+        return ((bits[posicoes >> 3] >> (7 - (posicoes & 7))) & 1).astype(bool)
+
+    def _uniao(self, dimensao, valores):
+        """OR dos conjuntos de linhas dos valores selecionados em uma dimensão."""
+        mapa = self._codigo_valor[dimensao]
+        containers = [
+            self._containers[dimensao][mapa[v]] for v in valores if v in mapa
+        ]
+        if not containers:
+            return ("pos", np.empty(0, dtype=np.uint32))
+
+        total = sum(len(dados) for tipo, dados in containers if tipo == "pos")
+        so_posicoes = all(tipo == "pos" for tipo, _ in containers)
+        if so_posicoes and total * self.FATOR_ESPARSO < self.n_linhas:
+            if len(containers) == 1:
+                return containers[0]
+            return ("pos", np.sort(np.concatenate([d for _, d in containers])))
+
+        bits = np.zeros(self._n_bytes, dtype=np.uint8)
+        for tipo, dados in containers:
+            if tipo == "bits":
+                np.bitwise_or(bits, dados, out=bits)
+            else:
+                self._marcar_posicoes(bits, dados)
+        return ("bits", bits)
+
+    def selecionar(self, filtros) -> np.ndarray:
+        """
+        Retorna as posições (ordenadas) das linhas que atendem a todos os filtros,
+        dados como pares (dimensão, valores). Listas vazias são ignoradas.
+        """
+        conjuntos = [self._uniao(d, v) for d, v in filtros if v]
+        if not conjuntos:
+            return np.arange(self.n_linhas)
+
+        listas = sorted(
+            (dados for tipo, dados in conjuntos if tipo == "pos"), key=len
+        )
+        bitmaps = [dados for tipo, dados in conjuntos if tipo == "bits"]
+
+        if listas:
+            # Parte do menor conjunto e só testa as posições restantes
+            posicoes = listas[0]
+            for outra in listas[1:]:
+                posicoes = np.intersect1d(posicoes, outra, assume_unique=True)
+            for bits in bitmaps:
+                posicoes = posicoes[self._testar_bits(bits, posicoes)]
+            return posicoes.astype(np.int64)
+
+        acumulado = bitmaps[0].copy()
+        for bits in bitmaps[1:]:
+            np.bitwise_and(acumulado, bits, out=acumulado)
+        return np.flatnonzero(np.unpackbits(acumulado, count=self.n_linhas))
+
+    def opcoes_disponiveis(self, dimensao, filtros=()) -> list:
+        """Valores de `dimensao` presentes nas linhas que atendem aos filtros."""
+        if not any(v for _, v in filtros):
+            return self.opcoes[dimensao]
+        codigos = self._codigos[dimensao][self.selecionar(filtros)]
+        presentes = np.unique(codigos[codigos >= 0])
+        valores = self.opcoes[dimensao]
+        return [valores[k] for k in presentes]
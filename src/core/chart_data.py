@@ -0,0 +1,67 @@
+import pandas as pd
+import polars as pl
+
+# Rótulos da linha que reúne as categorias pequenas
+ROTULO_OUTROS = "Outros"
+ROTULO_AGREGADO = "Agregado"
+
+# Quantidade padrão de categorias mantidas em gráficos de pizza/barra
+TOP_N_PADRAO = 10
+
+
+def agregar_top_n(
+    df: pd.DataFrame,
+    chaves,
+    valor: str,
+    n: int | None = TOP_N_PADRAO,
+    limiar: float | None = None,
+    rotulo_outros: str | None = ROTULO_OUTROS,
+    agregacoes=(),
+) -> pd.DataFrame:
+    """
+    Pré-agrega os dados de um gráfico no polars: soma `valor` por `chaves`, calcula a
+    participação de cada grupo ('percentage') e mantém só as maiores categorias.
+
+    - n: mantém os n maiores grupos (None = sem limite);
+    - limiar: mantém apenas grupos com participação >= limiar (ex.: 0.02);
+    - rotulo_outros: o restante vira uma única linha com esse rótulo na primeira
+      chave (e "Agregado" nas demais); None descarta o restante;
+    - agregacoes: expressões polars extras (ex.: pl.col("pci").mean().alias(...)).
+
+    O resultado (pandas, já ordenado por valor) tem no máximo n + 1 linhas, o que
+    mantém pequeno o JSON da figura independentemente do volume filtrado.
+    """
+    chaves = list(chaves)
+    agregado = (
+        pl.from_pandas(df)
+        .lazy()
+        .group_by(chaves)
+        .agg(pl.col(valor).sum(), *agregacoes)
+        .with_columns((pl.col(valor) / pl.col(valor).sum()).alias("percentage"))
+        .sort([valor, *chaves], descending=[True] + [False] * len(chaves))
+        .with_row_index("_posicao")
+        .collect()
+    )
+
+    manter = pl.lit(True)
+    if n is not None:
+        manter = manter & (pl.col("_posicao") < n)
+    if limiar is not None:
+        manter = manter & (pl.col("percentage") >= limiar)
+
+    principais = agregado.filter(manter)
+    resto = agregado.filter(~manter)
+    if rotulo_outros is not None and resto.height:
+        linha_outros = resto.select(
+            pl.lit(rotulo_outros).alias(chaves[0]),
+            *[pl.lit(ROTULO_AGREGADO).alias(c) for c in chaves[1:]],
+            pl.col(valor).sum(),
+            pl.col("percentage").sum(),
+        )
+        principais = pl.concat(
+            [principais.drop("_posicao"), linha_outros], how="diagonal_relaxed"
+        ).sort(valor, descending=True, maintain_order=True)
+    else:
+        principais = principais.drop("_posicao")
+
+    return principais.to_pandas()
@@ -0,0 +1,248 @@
+import numpy as np
+import pandas as pd
+
+from .analytics import explodir_cnae
+from .hs_hierarchy import normalizar_codigo_hs
+from .runtime import cache_dados
+
+# Como repartir o valor de um NCM entre as suas CNAEs:
+# - "uniforme": partes iguais entre as CNAEs listadas;
+# - "principal": tudo para a primeira CNAE da lista;
+# - "personalizado": pesos informados por par NCM x CNAE (NCMs sem peso: uniforme).
+MODOS_ALOCACAO = ("uniforme", "principal", "personalizado")
+
+# Rótulo das exportações sem correspondência NCM x CNAE (mantidas no total)
+CNAE_NAO_MAPEADA = "Não mapeada"
+
+
+# --- 1. MATRIZ DE ALOCAÇÃO PRODUTO x CNAE (ESPARSA) ---
+
+
+def pares_ncm_cnae(df_ncm):
+    """Pares NCM-8 x CNAE (com HS4 e ordem da CNAE) da tabela NCM x CNAE (.xls)."""
+    df = explodir_cnae(df_ncm[["ncm8", "cnae_raw"]])
+    df["headingCode"] = normalizar_codigo_hs(df["ncm8"], 4)
+    return df.drop_duplicates(["ncm8", "cnae7"])[["ncm8", "headingCode", "cnae7", "ordem_cnae"]]
+
+
+@cache_dados(etapa="carga")
+def carregar_pesos_cnae(file_path: str):
+    """
+    Lê os pesos personalizados da alocação (CSV com ncm8, cnae7 e peso), com os
+    códigos no formato de pares_ncm_cnae. Retorna None se o arquivo não existir.
+    """
+    try:
+        df = pd.read_csv(file_path, dtype={"ncm8": str, "cnae7": str}, sep=None, engine="python")
+    except FileNotFoundError:
+        return None
+    df["ncm8"] = normalizar_codigo_hs(df["ncm8"], 8)
+    df["cnae7"] = df["cnae7"].str.replace(r"[\. -]", "", regex=True).str.strip()
+    df["peso"] = pd.to_numeric(df["peso"], errors="coerce")
+    return df.dropna(subset=["peso"])[["ncm8", "cnae7", "peso"]]
+
+
+def _pesos_ncm(pares, modo, pesos=None):
+    """Peso de cada par NCM x CNAE segundo o modo; os pesos de um NCM somam 1."""
+    if modo not in MODOS_ALOCACAO:
+        raise ValueError(f"modo deve ser um de {MODOS_ALOCACAO}, não {modo!r}")
+
+    n_cnaes = pares.groupby("ncm8")["cnae7"].transform("size")
+    if modo == "principal":
+        peso = (pares["ordem_cnae"] == pares.groupby("ncm8")["ordem_cnae"].transform("min"))
+        return peso.astype(float).to_numpy()
+    uniforme = (1.0 / n_cnaes).to_numpy()
+    if modo == "uniforme" or pesos is None or pesos.empty:
+        return uniforme
+
+    informados = pares.merge(
+        pesos[["ncm8", "cnae7", "peso"]], on=["ncm8", "cnae7"], how="left"
+    )["peso"].fillna(0.0).clip(lower=0.0)
+    soma = informados.groupby(pares["ncm8"].to_numpy()).transform("sum").to_numpy()
+    return np.where(soma > 0, informados.to_numpy() / np.where(soma > 0, soma, 1), uniforme)
+
+
+@cache_dados
+def matriz_alocacao(df_ncm, nivel="headingCode", modo="uniforme", pesos=None, fob_ncm=None):
+    """
+    Matriz esparsa A (produto x CNAE) em formato CSR: A[p, c] é a fração do valor
+    do produto p atribuída à CNAE c (cada linha soma 1).
+
+    No nível "ncm8" as frações vêm direto dos pares NCM x CNAE e do modo. No nível
+    "headingCode" a linha de um HS4 é a média das linhas dos seus NCMs, ponderada
+    por `fob_ncm` (Series FOB por ncm8, ex: o total nacional) ou, sem ela, simples.
+
+    Retorna um dicionário com produtos e cnaes (rótulos), inicio (ponteiros CSR
+    por produto, len = produtos + 1), colunas e pesos (entradas não nulas).
+    """
+    pares = pares_ncm_cnae(df_ncm).reset_index(drop=True)
+    pares["peso"] = _pesos_ncm(pares, modo, pesos)
+    pares = pares[pares["peso"] > 0]
+
+    if nivel == "headingCode":
+        ncms = pares.drop_duplicates("ncm8")[["ncm8", "headingCode"]]
+        fob = (
+            ncms["ncm8"].map(fob_ncm).fillna(0.0)
+            if fob_ncm is not None
+            else pd.Series(0.0, index=ncms.index)
+        )
+        fob_hs4 = fob.groupby(ncms["headingCode"]).transform("sum")
+        n_ncms = ncms.groupby("headingCode")["ncm8"].transform("size")
+        participacao = (fob / fob_hs4).where(fob_hs4 > 0, 1.0 / n_ncms)
+        pares["peso"] *= pares["ncm8"].map(
+            pd.Series(participacao.to_numpy(), index=ncms["ncm8"].to_numpy())
+        )
+        pares = pares.groupby(["headingCode", "cnae7"], as_index=False)["peso"].sum()
+    elif nivel != "ncm8":
+        raise ValueError(f"nivel deve ser 'ncm8' ou 'headingCode', não {nivel!r}")
+
+    linhas, produtos = pd.factorize(pares[nivel], sort=True)
+    colunas, cnaes = pd.factorize(pares["cnae7"], sort=True)
+    ordem = np.lexsort((colunas, linhas))
+    return {
+        "produtos": np.asarray(produtos),
+        "cnaes": np.asarray(cnaes),
+        "inicio": np.concatenate(([0], np.cumsum(np.bincount(linhas, minlength=len(produtos))))),
+        "colunas": colunas[ordem],
+        "pesos": pares["peso"].to_numpy(dtype=float)[ordem],
+    }
+
+
+# --- 2. PRODUTO FATOS x ALOCAÇÃO ---
+
+
+def alocar(df, chaves, produto, valor, alocacao):
+    """
+    Aloca `valor` de cada linha de `df` (chaves x produto) às CNAEs: o produto
+    esparso F A, com F = fatos (linhas = combinações de `chaves`, colunas =
+    produtos) e A = matriz de alocação, numa única passada vetorizada. Cada
+    entrada de F é repetida pelo nº de CNAEs do seu produto e as contribuições
+    valor x peso são somadas com bincount em (linha, CNAE).
+
+    Produtos fora da matriz vão inteiros para CNAE_NAO_MAPEADA, então o total
+    alocado de cada linha é igual ao de origem. Retorna chaves + cnae7 + valor.
+    """
+    dados = df[chaves + [produto, valor]].dropna()
+    dados = dados[dados[valor] > 0]
+    codigos_linha, rotulos = pd.factorize(
+        pd.MultiIndex.from_frame(dados[chaves]), sort=True
+    )
+    x = dados[valor].to_numpy(dtype=float)
+
+    inicio = alocacao["inicio"]
+    linha_produto = pd.Index(alocacao["produtos"]).get_indexer(dados[produto].to_numpy())
+    mapeado = linha_produto >= 0
+    n_cnaes = len(alocacao["cnaes"]) + 1  # última coluna: não mapeada
+
+    # Entradas de F A: para a entrada k de F, as posições inicio[p_k] .. inicio[p_k + 1]
+    contagem = np.where(mapeado, inicio[linha_produto + 1] - inicio[linha_produto], 1)
+    origem = np.repeat(np.arange(len(x)), contagem)
+    deslocamento = np.arange(len(origem)) - np.repeat(np.cumsum(contagem) - contagem, contagem)
+    entrada = inicio[linha_produto[origem]] + deslocamento
+    mapeada = mapeado[origem]
+    coluna = np.where(mapeada, alocacao["colunas"][np.where(mapeada, entrada, 0)], n_cnaes - 1)
+    peso = np.where(mapeada, alocacao["pesos"][np.where(mapeada, entrada, 0)], 1.0)
+
+    celula = codigos_linha[origem] * n_cnaes + coluna
+    soma = np.bincount(celula, weights=x[origem] * peso, minlength=len(rotulos) * n_cnaes)
+    presentes = np.flatnonzero(soma)
+
+    resultado = rotulos.to_frame(index=False, name=chaves).iloc[presentes // n_cnaes]
+    resultado = resultado.reset_index(drop=True)
+    resultado["cnae7"] = np.append(alocacao["cnaes"], CNAE_NAO_MAPEADA)[presentes % n_cnaes]
+    resultado[valor] = soma[presentes]
+    return resultado
+
+
+# --- 3. VCR E RANKING SETORIAL DOS ESTADOS ---
+
+
+@cache_dados
+def vcr_setorial_estados(df_comexstat, df_ncm, modo="uniforme", pesos=None):
+    """
+    Exportações dos estados por CNAE (HS4 alocado pela matriz de alocação), com a
+    VCR de cada estado x CNAE contra o Brasil, a participação do estado no setor
+    e o ranking dos setores de cada estado por VCR, ano a ano.
+
+    O setor CNAE_NAO_MAPEADA entra nos totais (a VCR dos demais não muda com a
+    cobertura da tabela) e fica fora do ranking.
+    """
+    df = df_comexstat[["year", "state", "headingCode", "metricFOB"]].copy()
+    df["headingCode"] = normalizar_codigo_hs(df["headingCode"], 4)
+    alocacao = matriz_alocacao(df_ncm, "headingCode", modo, pesos)
+    setores = alocar(df, ["year", "state"], "headingCode", "metricFOB", alocacao)
+    setores = setores.rename(columns={"metricFOB": "FOB"})
+
+    total = setores.groupby("year")["FOB"].transform("sum")
+    total_estado = setores.groupby(["year", "state"])["FOB"].transform("sum")
+    total_setor = setores.groupby(["year", "cnae7"])["FOB"].transform("sum")
+    setores["VCR"] = (setores["FOB"] / total_estado) / (total_setor / total)
+    setores["Participacao_Setor"] = setores["FOB"] / total_setor
+
+    mapeado = setores["cnae7"] != CNAE_NAO_MAPEADA
+    setores["Ranking"] = (
+        setores["VCR"]
+        .where(mapeado)
+        .groupby([setores["year"], setores["state"]])
+        .rank(method="min", ascending=False)
+        .astype("Int64")
+    )
+    return setores.sort_values(["year", "state", "Ranking"], ignore_index=True)
+
+
+# --- 4. EMPREGO: QUOCIENTE LOCACIONAL PELA PONTE CNAE -> HS4 ---
+
+
+def quociente_locacional(df_emprego, estado, valor="Empregos"):
+    """
+    Quociente locacional de cada CNAE no estado (a "VCR do emprego"):
+    QL = (E_estado,c / E_estado) / (E_Brasil,c / E_Brasil), com df_emprego em
+    UF x CNAE (data.emprego.ler_emprego). Retorna cnae7 -> QL (Series).
+    """
+    por_cnae = df_emprego.groupby("cnae7")[valor].sum()
+    do_estado = (
+        df_emprego[df_emprego["state"] == estado].groupby("cnae7")[valor].sum()
+        .reindex(por_cnae.index, fill_value=0)
+    )
+    if do_estado.sum() == 0:
+        return pd.Series(dtype=float, name="QL")
+    return ((do_estado / do_estado.sum()) / (por_cnae / por_cnae.sum())).rename("QL")
+
+
+@cache_dados
+def ql_emprego_hs4(df_emprego, df_ncm, estado, modo="uniforme", pesos=None):
+    """
+    QL do emprego levado ao HS4 pela ponte NCM <-> CNAE: a média dos QLs das
+    CNAEs do HS4 ponderada pela matriz de alocação (A QL, com cada linha de A
+    somando 1 e só as CNAEs presentes na base de emprego). HS4 sem nenhuma CNAE
+    com emprego ficam de fora. Retorna headingCode e QL_Emprego.
+    """
+    alocacao = matriz_alocacao(df_ncm, "headingCode", modo, pesos)
+    return ql_emprego_alocado(df_emprego, estado, alocacao)
+
+
+def ql_emprego_alocado(df_emprego, estado, alocacao):
+    """
+    ql_emprego_hs4 com a matriz de alocação HS4 já montada (matriz_alocacao), para
+    calcular vários estados sobre a mesma matriz sem refazê-la nem re-hashear as bases.
+    """
+    ql = quociente_locacional(df_emprego, estado)
+    if ql.empty:
+        return pd.DataFrame(columns=["headingCode", "QL_Emprego"])
+
+    linhas = np.repeat(np.arange(len(alocacao["produtos"])), np.diff(alocacao["inicio"]))
+    cnaes = alocacao["cnaes"][alocacao["colunas"]]
+    presente = pd.Index(ql.index).get_indexer(cnaes) >= 0
+    pesos_presentes = np.where(presente, alocacao["pesos"], 0.0)
+
+    n = len(alocacao["produtos"])
+    soma_pesos = np.bincount(linhas, weights=pesos_presentes, minlength=n)
+    soma_ql = np.bincount(
+        linhas, weights=pesos_presentes * ql.reindex(cnaes).fillna(0).to_numpy(), minlength=n
+    )
+    coberto = soma_pesos > 0
+    return pd.DataFrame(
+        {
+            "headingCode": alocacao["produtos"][coberto],
+            "QL_Emprego": soma_ql[coberto] / soma_pesos[coberto],
+        }
+    )
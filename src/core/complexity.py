@@ -0,0 +1,216 @@
+import numpy as np
+import pandas as pd
+
+from .hs_hierarchy import normalizar_codigo_hs
+from .runtime import cache_dados
+
+# Vantagem comparativa revelada (Balassa) a partir da qual M[local, produto] = 1
+LIMIAR_RCA = 1.0
+
+# Iteração de potência: tolerância na variação do autovetor (norma por ano)
+TOLERANCIA = 1e-10
+MAX_ITERACOES = 2000
+
+
+# --- 1. MATRIZ RCA BINÁRIA (TODOS OS ANOS DE UMA VEZ) ---
+
+
+def matriz_rca(df, local, produto, valor, ano="year", limiar_rca=LIMIAR_RCA):
+    """
+    Monta a matriz local x produto de todos os anos como um único bloco esparso
+    (coordenadas): cada linha é um par (ano, local) e cada coluna um par
+    (ano, produto), de modo que os anos ficam em blocos diagonais independentes.
+
+    Retorna um dicionário com:
+    - linhas, colunas: coordenadas das entradas com RCA >= limiar (M = 1);
+    - rotulos_linhas, rotulos_colunas: DataFrames (ano, local) e (ano, produto);
+    - ano_linha, ano_coluna: índice do ano de cada linha/coluna.
+    """
+    dados = df[[ano, local, produto, valor]].dropna()
+    dados = dados[dados[valor] > 0]
+    dados = dados.groupby([ano, local, produto], as_index=False, sort=True)[valor].sum()
+
+    codigos_linha, rotulos_linhas = pd.factorize(
+        pd.MultiIndex.from_arrays([dados[ano], dados[local]]), sort=True
+    )
+    codigos_coluna, rotulos_colunas = pd.factorize(
+        pd.MultiIndex.from_arrays([dados[ano], dados[produto]]), sort=True
+    )
+    codigos_ano, anos = pd.factorize(dados[ano], sort=True)
+
+    x = dados[valor].to_numpy(dtype=float)
+    total_linha = np.bincount(codigos_linha, weights=x)
+    total_coluna = np.bincount(codigos_coluna, weights=x)
+    total_ano = np.bincount(codigos_ano, weights=x)
+
+    # RCA = (x_lp / x_l) / (x_p / x_ano), só nas entradas não nulas
+    rca = (x / total_linha[codigos_linha]) / (
+        total_coluna[codigos_coluna] / total_ano[codigos_ano]
+    )
+    presente = rca >= limiar_rca
+
+    rotulos_linhas = rotulos_linhas.to_frame(index=False, name=[ano, local])
+    rotulos_colunas = rotulos_colunas.to_frame(index=False, name=[ano, produto])
+    return {
+        "linhas": codigos_linha[presente],
+        "colunas": codigos_coluna[presente],
+        "rotulos_linhas": rotulos_linhas,
+        "rotulos_colunas": rotulos_colunas,
+        "ano_linha": anos.get_indexer(rotulos_linhas[ano]),
+        "ano_coluna": anos.get_indexer(rotulos_colunas[ano]),
+        "n_anos": len(anos),
+    }
+
+
+# --- 2. AUTOVETOR (ITERAÇÃO DE POTÊNCIA COM DEFLAÇÃO, EM LOTE) ---
+
+
+def _soma_por_ano(valores, ano, n_anos):
+    return np.bincount(ano, weights=valores, minlength=n_anos)
+
+
+def _segundo_autovetor(
+    linhas, colunas, diversidade, ubiquidade, ano, n_anos, tolerancia, max_iter
+):
+    """
+    Segundo autovetor de M~ = D^-1 M U^-1 M^T para cada ano, todos de uma vez.
+
+    Itera no operador simétrico S = D^-1/2 M U^-1 M^T D^-1/2 (mesmos autovalores
+    de M~, autovetor dominante sqrt(d) com autovalor 1), removendo a cada passo a
+    componente dominante de cada ano (deflação). Os anos são blocos diagonais de
+    S: a normalização e a deflação são feitas por ano com bincount, e um mesmo
+    produto esparso serve a todos. Retorna (autovetor de M~, iterações).
+    """
+    raiz_d = np.sqrt(diversidade)
+    dominante = raiz_d / np.sqrt(_soma_por_ano(diversidade, ano, n_anos))[ano]
+
+    def aplicar(v):
+        z = v / raiz_d
+        w = np.bincount(colunas, weights=z[linhas], minlength=len(ubiquidade))
+        w /= ubiquidade
+        y = np.bincount(linhas, weights=w[colunas], minlength=len(diversidade))
+        return y / raiz_d
+
+    def deflacionar_e_normalizar(v):
+        v = v - dominante * _soma_por_ano(dominante * v, ano, n_anos)[ano]
+        norma = np.sqrt(_soma_por_ano(v * v, ano, n_anos))
+        return v / np.where(norma > 0, norma, 1.0)[ano]
+
+    # Vetor inicial determinístico (ordem das linhas), sem componente dominante
+    v = deflacionar_e_normalizar(np.cos(np.arange(len(diversidade)) * 0.7) + 1.5)
+    iteracoes = 0
+    for iteracoes in range(1, max_iter + 1):
+        novo = deflacionar_e_normalizar(aplicar(v))
+        variacao = np.sqrt(_soma_por_ano((novo - v) ** 2, ano, n_anos))
+        v = novo
+        if variacao.max(initial=0.0) < tolerancia:
+            break
+    return v / raiz_d, iteracoes
+
+
+def _centrar_por_ano(valores, ano, n_anos):
+    contagem = np.bincount(ano, minlength=n_anos).clip(1)
+    return valores - (_soma_por_ano(valores, ano, n_anos) / contagem)[ano]
+
+
+def _padronizar_por_ano(valores, ano, n_anos):
+    contagem = np.bincount(ano, minlength=n_anos).clip(1)
+    centrado = _centrar_por_ano(valores, ano, n_anos)
+    desvio = np.sqrt(_soma_por_ano(centrado**2, ano, n_anos) / contagem)
+    return np.where(desvio[ano] > 0, centrado / np.where(desvio > 0, desvio, 1.0)[ano], np.nan)
+
+
+# --- 3. ECI / PCI ---
+
+
+def calcular_complexidade(
+    df,
+    local,
+    produto,
+    valor,
+    ano="year",
+    limiar_rca=LIMIAR_RCA,
+    tolerancia=TOLERANCIA,
+    max_iter=MAX_ITERACOES,
+):
+    """
+    Índices de complexidade (método dos reflexos / autovetor, Hidalgo-Hausmann)
+    de todos os anos numa passada: RCA binária, diversidade e ubiquidade, ECI dos
+    locais e PCI dos produtos, padronizados (média 0, desvio 1) em cada ano.
+    O sinal do ECI é o que correlaciona positivamente com a diversidade.
+
+    Retorna (df_locais, df_produtos):
+    - df_locais: [ano, local, diversidade, ECI];
+    - df_produtos: [ano, produto, ubiquidade, PCI].
+    Locais/produtos sem nenhuma vantagem (diversidade/ubiquidade zero) ou anos
+    com menos de dois locais ficam com índice NaN.
+    """
+    m = matriz_rca(df, local, produto, valor, ano, limiar_rca)
+    linhas, colunas, n_anos = m["linhas"], m["colunas"], m["n_anos"]
+    df_locais, df_produtos = m["rotulos_linhas"], m["rotulos_colunas"]
+
+    diversidade = np.bincount(linhas, minlength=len(df_locais)).astype(float)
+    ubiquidade = np.bincount(colunas, minlength=len(df_produtos)).astype(float)
+    df_locais["diversidade"] = diversidade.astype(int)
+    df_produtos["ubiquidade"] = ubiquidade.astype(int)
+    df_locais["ECI"] = np.nan
+    df_produtos["PCI"] = np.nan
+
+    # Só entram no autovetor linhas/colunas ativas de anos com ao menos dois locais
+    ativos_por_ano = np.bincount(m["ano_linha"][diversidade > 0], minlength=n_anos)
+    linha_ativa = (diversidade > 0) & (ativos_por_ano[m["ano_linha"]] >= 2)
+    if not linha_ativa.any():
+        return df_locais, df_produtos
+    entrada_ativa = linha_ativa[linhas]
+    linhas, colunas = linhas[entrada_ativa], colunas[entrada_ativa]
+    coluna_ativa = np.bincount(colunas, minlength=len(df_produtos)) > 0
+
+    # Reindexação compacta (só ativos)
+    nova_linha = np.cumsum(linha_ativa) - 1
+    nova_coluna = np.cumsum(coluna_ativa) - 1
+    linhas, colunas = nova_linha[linhas], nova_coluna[colunas]
+    ano_linha = m["ano_linha"][linha_ativa]
+    ano_coluna = m["ano_coluna"][coluna_ativa]
+    d, u = diversidade[linha_ativa], ubiquidade[coluna_ativa]
+
+    eci, _ = _segundo_autovetor(
+        linhas, colunas, d, u, ano_linha, n_anos, tolerancia, max_iter
+    )
+    # PCI pelo reflexo do ECI: média do ECI dos locais que exportam o produto
+    pci = np.bincount(colunas, weights=eci[linhas], minlength=len(u)) / u
+
+    # Sinal: ECI cresce com a diversidade em cada ano
+    covariancia = _soma_por_ano(
+        _centrar_por_ano(eci, ano_linha, n_anos) * _centrar_por_ano(d, ano_linha, n_anos),
+        ano_linha,
+        n_anos,
+    )
+    sinal = np.where(covariancia < 0, -1.0, 1.0)
+
+    df_locais.loc[linha_ativa, "ECI"] = _padronizar_por_ano(
+        eci * sinal[ano_linha], ano_linha, n_anos
+    )
+    df_produtos.loc[coluna_ativa, "PCI"] = _padronizar_por_ano(
+        pci * sinal[ano_coluna], ano_coluna, n_anos
+    )
+    return df_locais, df_produtos
+
+
+@cache_dados
+def complexidade_estados(df_comexstat):
+    """
+    ECI dos estados e PCI subnacional das posições HS4 (matriz estado x HS4 do
+    ComexStat), por ano.
+    """
+    df = df_comexstat[["year", "state", "headingCode", "metricFOB"]].copy()
+    df["headingCode"] = normalizar_codigo_hs(df["headingCode"], 4)
+    return calcular_complexidade(df, "state", "headingCode", "metricFOB")
+
+
+@cache_dados
+def complexidade_paises(df_harvard):
+    """ECI dos países e PCI das posições HS4 (matriz país x produto do Harvard), por ano."""
+    df = df_harvard[["year", "country_iso3_code", "product_hs92_code", "export_value"]]
+    df = df.rename(columns={"product_hs92_code": "headingCode"})
+    df["headingCode"] = normalizar_codigo_hs(df["headingCode"], 4)
+    return calcular_complexidade(df, "country_iso3_code", "headingCode", "export_value")
@@ -58,3 +58,30 @@ TARGET_STATE_CODE = 23
 
 # O código do parceiro alvo para filtros (e.g., China: 245)
 TARGET_PARTNER_CODE = 245
+
+# Presets de pesos do Índice de Prioridade Ajustado (parcelas X, Y, Z, AA do .ods).
+# "padrao" corresponde aos valores iniciais dos sliders da aba comparativa.
+PRESETS_PESOS = {
+    "padrao": {"vcr_ceara": 0.4, "vcr_brasil": 0.3, "pci": 0.3, "distancia": 0.4},
+    "equilibrado": {"vcr_ceara": 0.25, "vcr_brasil": 0.25, "pci": 0.25, "distancia": 0.25},
+    "especializacao": {"vcr_ceara": 0.6, "vcr_brasil": 0.2, "pci": 0.1, "distancia": 0.1},
+    "complexidade": {"vcr_ceara": 0.2, "vcr_brasil": 0.2, "pci": 0.5, "distancia": 0.1},
+}
+
+# Versão do Sistema Harmonizado de cada fonte (core.hs_concordance converte entre
+# elas): Harvard em HS92, Comtrade "H4" (HS2012) e NCM vigente do ComexStat (HS2022)
+VERSOES_HS_FONTES = {"harvard": "HS92", "comtrade": "HS12", "comexstat": "HS22"}
+
+# Estado de referência das análises (nome como aparece no ComexStat)
+TARGET_STATE_NAME = "Ceará"
+
+# Códigos IBGE das UFs (filtro "state" da API do ComexStat) e nomes como no ComexStat
+UFS_IBGE = {
+    11: "Rondônia", 12: "Acre", 13: "Amazonas", 14: "Roraima", 15: "Pará",
+    16: "Amapá", 17: "Tocantins", 21: "Maranhão", 22: "Piauí", 23: "Ceará",
+    24: "Rio Grande do Norte", 25: "Paraíba", 26: "Pernambuco", 27: "Alagoas",
+    28: "Sergipe", 29: "Bahia", 31: "Minas Gerais", 32: "Espírito Santo",
+    33: "Rio de Janeiro", 35: "São Paulo", 41: "Paraná", 42: "Santa Catarina",
+    43: "Rio Grande do Sul", 50: "Mato Grosso do Sul", 51: "Mato Grosso",
+    52: "Goiás", 53: "Distrito Federal",
+}
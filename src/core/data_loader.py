@@ -1,26 +1,39 @@
 import polars as pl
 from polars.datatypes.classes import Utf8
-import streamlit as st
+import pandas as pd
 import os
 
+from .analytics import carregar_tabela_ncm_xls
+from .bitmap_index import IndiceBitmap
+from .hs_hierarchy import normalizar_codigo_hs
+from .runtime import cache_dados, cache_recurso, falhar
+from .search_index import IndiceBusca
+
 # Definição das constantes de caminho (mover de app.py)
 COMEXSTAT_PATH = "resources/comexstat_data.csv"
 HARVARD_PATH = "resources/harvard_data.csv"
 COMTRADE_PATH = "resources/comtrade_data.csv"
+NCM_CNAE_PATH = "resources/NCM2012XCNAE20.xls"
+# Pesos opcionais da alocação NCM -> CNAE (colunas ncm8, cnae7, peso)
+PESOS_CNAE_PATH = "resources/pesos_ncm_cnae.csv"
+
+# Dimensões de filtro indexadas (IndiceBitmap) para cada base
+DIMENSOES_COMEXSTAT = ("state", "year", "headingCode")
+DIMENSOES_HARVARD = ("year", "country_iso3_code", "product_hs92_code")
+DIMENSOES_COMTRADE = ("refYear", "cmdCode")
 
 
 def check_data_files():
-    """Verifica a presença dos arquivos de dados e interrompe o app se não encontrados."""
+    """Verifica a presença dos arquivos de dados e interrompe (ErroDados) se não encontrados."""
     if not all(
         os.path.exists(path) for path in [COMEXSTAT_PATH, HARVARD_PATH, COMTRADE_PATH]
     ):
-        st.error(
+        falhar(
             "Arquivos de dados não encontrados. Por favor, execute o script 'main.py' primeiro para gerar os arquivos CSV."
         )
-        st.stop()
 
 
-@st.cache_data
+@cache_dados(etapa="carga")
 def load_data(path):
     """
     Carrega dados de um arquivo CSV usando Polars e converte para Pandas.
@@ -111,9 +124,85 @@ def load_data(path):
     # 2. Conversão para Pandas
     df_pd = df_pl.to_pandas()
 
+    # 3. Versão do arquivo (chave barata para os caches derivados nas abas)
+    df_pd.attrs["versao"] = f"{path}:{os.path.getmtime(path)}"
+
     return df_pd
 
 
+def versao_dataframe(df):
+    """
+    Retorna uma chave que identifica a versão dos dados de um DataFrame base.
+    Usa a versão registrada por load_data e, na ausência dela, um hash do conteúdo.
+    """
+    versao = df.attrs.get("versao")
+    if versao is None:
+        versao = str(pd.util.hash_pandas_object(df, index=False).sum())
+    return versao
+
+
+@cache_recurso(show_spinner=False, etapa="carga")
+def carregar_indice_filtros(_df, versao, dimensoes):
+    """
+    Constrói (uma vez por versão dos dados) o IndiceBitmap das dimensões de filtro.
+    Fica em cache_recurso: o índice é compartilhado, não copiado a cada rerun.
+    """
+    return IndiceBitmap.de_dataframe(_df, dimensoes)
+
+
+def versao_arquivos(*paths):
+    """Chave de versão de um conjunto de arquivos (caminho e data de modificação)."""
+    return "|".join(
+        f"{path}:{os.path.getmtime(path) if os.path.exists(path) else 'ausente'}"
+        for path in paths
+    )
+
+
+@cache_recurso(show_spinner=False, etapa="carga")
+def _construir_indice_busca(versao):
+    """
+    Monta o índice de busca de produtos: um documento por HS4 com a descrição do
+    ComexStat, o cmdDesc do Comtrade e as descrições das NCMs da posição.
+    """
+    textos = []
+    if os.path.exists(COMEXSTAT_PATH):
+        df_comex = load_data(COMEXSTAT_PATH)
+        textos.append(
+            pd.DataFrame(
+                {"headingCode": df_comex["headingCode"], "texto": df_comex["heading"]}
+            )
+        )
+    if os.path.exists(COMTRADE_PATH):
+        df_comtrade = load_data(COMTRADE_PATH)
+        textos.append(
+            pd.DataFrame(
+                {"headingCode": df_comtrade["cmdCode"], "texto": df_comtrade["cmdDesc"]}
+            )
+        )
+    df_ncm = carregar_tabela_ncm_xls(NCM_CNAE_PATH)
+    if df_ncm is not None:
+        textos.append(
+            pd.DataFrame(
+                {"headingCode": df_ncm["headingCode"], "texto": df_ncm["desc_ncm"]}
+            )
+        )
+
+    if not textos:
+        return IndiceBusca({})
+
+    df_textos = pd.concat(textos, ignore_index=True).dropna().drop_duplicates()
+    df_textos["headingCode"] = normalizar_codigo_hs(df_textos["headingCode"], 4)
+    documentos = df_textos.groupby("headingCode")["texto"].agg(" ".join).to_dict()
+    return IndiceBusca(documentos)
+
+
+def carregar_indice_busca():
+    """Índice de busca de produtos da versão atual dos arquivos de dados."""
+    return _construir_indice_busca(
+        versao_arquivos(COMEXSTAT_PATH, COMTRADE_PATH, NCM_CNAE_PATH)
+    )
+
+
 def get_all_data():
     """Função principal para carregar e retornar todos os DataFrames."""
     check_data_files()
@@ -0,0 +1,302 @@
+import io
+import math
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+# Linhas por lote convertido/escrito (limita a memória de trabalho da exportação)
+TAMANHO_LOTE = 50_000
+
+# Limite de linhas de uma planilha do Excel (incluindo o cabeçalho)
+LINHAS_POR_PLANILHA = 1_048_576
+
+# Formato -> (MIME, extensão)
+FORMATOS_EXPORTACAO = {
+    "csv": ("text/csv", ".csv"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+    "xlsx": (
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        ".xlsx",
+    ),
+}
+
+
+# --- 1. FONTES (sempre lidas em lotes de RecordBatch) ---
+
+
+def lotes_de(fonte, tamanho_lote=TAMANHO_LOTE, colunas=None):
+    """
+    Normaliza a fonte de uma exportação em (schema, iterador de RecordBatch).
+
+    Aceita DataFrame pandas (convertido fatia a fatia, nunca inteiro), DataFrame
+    polars, Table ou RecordBatchReader pyarrow e Scanner do pyarrow.dataset
+    (leitura incremental do disco, p.ex. o cubo de rankings).
+
+    colunas: dict opcional {coluna da fonte: nome no arquivo}; projeta e renomeia
+    cada lote, sem copiar a fonte.
+    """
+    nomes = list(colunas) if colunas else None
+    schema, lotes = _lotes_da_fonte(fonte, tamanho_lote, nomes)
+    if not colunas:
+        return schema, lotes
+    destino = list(colunas.values())
+    schema = pa.schema([campo.with_name(nome) for campo, nome in zip(schema, destino)])
+    return schema, (lote.rename_columns(destino) for lote in lotes)
+
+
+def _lotes_da_fonte(fonte, tamanho_lote, nomes):
+    """(schema, lotes) da fonte, já projetados em `nomes` (quando informados)."""
+    if isinstance(fonte, pd.DataFrame):
+        schema = pa.Schema.from_pandas(fonte, preserve_index=False)
+        if nomes:
+            # from_pandas com schema parcial converte só as colunas pedidas
+            schema = pa.schema([schema.field(n) for n in nomes])
+
+        def fatias():
+            for inicio in range(0, len(fonte), tamanho_lote):
+                yield pa.RecordBatch.from_pandas(
+                    fonte.iloc[inicio : inicio + tamanho_lote],
+                    schema=schema,
+                    preserve_index=False,
+                )
+
+        return schema, fatias()
+
+    if hasattr(fonte, "to_arrow") and not hasattr(fonte, "to_batches"):
+        fonte = fonte.to_arrow()  # polars: conversão sem cópia das colunas numéricas
+    if isinstance(fonte, pa.Table):
+        if nomes:
+            fonte = fonte.select(nomes)
+        return fonte.schema, iter(fonte.to_batches(max_chunksize=tamanho_lote))
+    if isinstance(fonte, pa.RecordBatchReader):
+        schema, lotes = fonte.schema, iter(fonte)
+    else:  # pyarrow.dataset.Scanner
+        schema, lotes = fonte.projected_schema, fonte.to_batches()
+    if nomes:
+        schema = pa.schema([schema.field(n) for n in nomes])
+        lotes = (lote.select(nomes) for lote in lotes)
+    return schema, _reagrupar(lotes, tamanho_lote)
+
+
+def _reagrupar(lotes, tamanho_lote):
+    """
+    Junta lotes pequenos (um dataset particionado entrega um por fragmento) em
+    lotes de ~tamanho_lote linhas: menos row groups no Parquet e menos blocos.
+    """
+    pendentes, linhas = [], 0
+    for lote in lotes:
+        if not lote.num_rows:
+            continue
+        pendentes.append(lote)
+        linhas += lote.num_rows
+        if linhas >= tamanho_lote:
+            yield pa.concat_batches(pendentes)
+            pendentes, linhas = [], 0
+    if pendentes:
+        yield pa.concat_batches(pendentes)
+
+
+class _SaidaDrenavel(io.RawIOBase):
+    """Destino só de escrita: acumula bytes até serem drenados pelo gerador."""
+
+    def __init__(self):
+        self._partes = []
+        self._posicao = 0
+
+    def writable(self):
+        return True
+
+    def write(self, dados):
+        dados = bytes(dados)
+        self._partes.append(dados)
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self):
+        return self._posicao
+
+    def drenar(self):
+        dados = b"".join(self._partes)
+        self._partes.clear()
+        return dados
+
+
+# --- 2. ESCRITORES (geradores de blocos de bytes) ---
+
+
+def gerar_csv(schema, lotes):
+    """CSV (UTF-8, com cabeçalho) escrito pelo pyarrow, um bloco por lote."""
+    saida = _SaidaDrenavel()
+    with pacsv.CSVWriter(saida, schema) as escritor:
+        for lote in lotes:
+            escritor.write_batch(lote)
+            yield saida.drenar()
+    yield saida.drenar()
+
+
+def gerar_parquet(schema, lotes):
+    """Parquet com um row group por lote; os bytes saem à medida que cada grupo fecha."""
+    saida = _SaidaDrenavel()
+    with pq.ParquetWriter(saida, schema, compression="zstd") as escritor:
+        for lote in lotes:
+            escritor.write_batch(lote)
+            yield saida.drenar()
+    yield saida.drenar()
+
+
+_CARACTERES_INVALIDOS_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def _celula_xlsx(valor):
+    if valor is None or (isinstance(valor, float) and not math.isfinite(valor)):
+        return "<c/>"
+    if isinstance(valor, bool):
+        return f'<c t="b"><v>{int(valor)}</v></c>'
+    if isinstance(valor, (int, float)):
+        return f"<c><v>{valor!r}</v></c>"
+    texto = _CARACTERES_INVALIDOS_XML.sub("", escape(str(valor)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def _linha_xlsx(valores):
+    return "<row>" + "".join(_celula_xlsx(v) for v in valores) + "</row>"
+
+
+_XLSX_INICIO_PLANILHA = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    "<sheetData>"
+)
+_XLSX_FIM_PLANILHA = "</sheetData></worksheet>"
+
+
+def _partes_fixas_xlsx(n_planilhas):
+    """Workbook, relações e content types (escritos por último, quando n é conhecido)."""
+    planilhas = "".join(
+        f'<sheet name="Dados{"" if i == 1 else i}" sheetId="{i}" r:id="rId{i}"/>'
+        for i in range(1, n_planilhas + 1)
+    )
+    relacoes = "".join(
+        f'<Relationship Id="rId{i}" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        f'Target="worksheets/sheet{i}.xml"/>'
+        for i in range(1, n_planilhas + 1)
+    )
+    overrides = "".join(
+        f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        for i in range(1, n_planilhas + 1)
+    )
+    return {
+        "xl/workbook.xml": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f"<sheets>{planilhas}</sheets></workbook>"
+        ),
+        "xl/_rels/workbook.xml.rels": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            f"{relacoes}</Relationships>"
+        ),
+        "_rels/.rels": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+            'Target="xl/workbook.xml"/></Relationships>'
+        ),
+        "[Content_Types].xml": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" '
+            'ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            f"{overrides}</Types>"
+        ),
+    }
+
+
+def gerar_xlsx(schema, lotes):
+    """
+    XLSX mínimo escrito à mão (zip em streaming, strings inline, sem estilos).
+    As planilhas são gravadas linha a linha; ao atingir o limite do Excel, os dados
+    continuam numa nova planilha com o mesmo cabeçalho.
+    """
+    saida = _SaidaDrenavel()
+    cabecalho = _linha_xlsx(schema.names).encode("utf-8")
+
+    with zipfile.ZipFile(saida, "w", compression=zipfile.ZIP_DEFLATED) as pacote:
+        n_planilhas = 0
+        planilha = None
+        linhas = 0
+
+        for lote in lotes:
+            colunas = [coluna.to_pylist() for coluna in lote.columns]
+            inicio = 0
+            while inicio < lote.num_rows:
+                if planilha is None or linhas >= LINHAS_POR_PLANILHA:
+                    if planilha is not None:
+                        planilha.write(_XLSX_FIM_PLANILHA.encode("utf-8"))
+                        planilha.close()
+                    n_planilhas += 1
+                    planilha = pacote.open(
+                        f"xl/worksheets/sheet{n_planilhas}.xml", "w", force_zip64=True
+                    )
+                    planilha.write(_XLSX_INICIO_PLANILHA.encode("utf-8") + cabecalho)
+                    linhas = 1
+
+                fim = min(lote.num_rows, inicio + LINHAS_POR_PLANILHA - linhas)
+                planilha.write(
+                    "".join(
+                        _linha_xlsx(valores)
+                        for valores in zip(*(c[inicio:fim] for c in colunas))
+                    ).encode("utf-8")
+                )
+                linhas += fim - inicio
+                inicio = fim
+            yield saida.drenar()
+
+        if planilha is None:
+            n_planilhas = 1
+            planilha = pacote.open("xl/worksheets/sheet1.xml", "w")
+            planilha.write(_XLSX_INICIO_PLANILHA.encode("utf-8") + cabecalho)
+        planilha.write(_XLSX_FIM_PLANILHA.encode("utf-8"))
+        planilha.close()
+
+        for nome, conteudo in _partes_fixas_xlsx(n_planilhas).items():
+            pacote.writestr(nome, conteudo)
+    yield saida.drenar()
+
+
+_GERADORES = {"csv": gerar_csv, "parquet": gerar_parquet, "xlsx": gerar_xlsx}
+
+
+def exportar(fonte, formato, tamanho_lote=TAMANHO_LOTE, colunas=None):
+    """
+    Gerador de blocos de bytes da fonte no formato pedido ('csv', 'parquet', 'xlsx').
+    Formato e colunas são validados já na chamada, antes do primeiro bloco.
+    """
+    if formato not in _GERADORES:
+        raise ValueError(f"formato de exportação deve ser um de {sorted(_GERADORES)}")
+    schema, lotes = lotes_de(fonte, tamanho_lote, colunas)
+    return _GERADORES[formato](schema, lotes)
+
+
+def exportar_para_arquivo(fonte, formato, destino, tamanho_lote=TAMANHO_LOTE, colunas=None):
+    """Escreve a exportação num arquivo aberto em modo binário (ou caminho)."""
+    if isinstance(destino, str):
+        with open(destino, "wb") as arquivo:
+            return exportar_para_arquivo(fonte, formato, arquivo, tamanho_lote, colunas)
+    total = 0
+    for bloco in exportar(fonte, formato, tamanho_lote, colunas):
+        destino.write(bloco)
+        total += len(bloco)
+    return total
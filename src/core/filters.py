@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+
+def mascara_filtros(df: pd.DataFrame, filtros) -> np.ndarray:
+    """
+    Compõe uma máscara booleana (numpy) a partir de pares (coluna, valores).
+    Filtros com lista vazia ou None são ignorados (equivalem a "todos").
+    Nenhuma cópia do DataFrame é feita: apenas um vetor de bool por linha.
+    """
+    mascara = np.ones(len(df), dtype=bool)
+    for coluna, valores in filtros:
+        if valores:
+            mascara &= df[coluna].isin(valores).to_numpy()
+    return mascara
+
+
+def mascara_intervalo(serie: pd.Series, inicio=None, fim=None) -> np.ndarray:
+    """Máscara para inicio <= valor <= fim (limites None são abertos)."""
+    mascara = np.ones(len(serie), dtype=bool)
+    if inicio is not None:
+        mascara &= (serie >= inicio).to_numpy()
+    if fim is not None:
+        mascara &= (serie <= fim).to_numpy()
+    return mascara
+
+
+def mascara_de_posicoes(n_linhas: int, posicoes: np.ndarray) -> np.ndarray:
+    """Converte um vetor de posições em máscara booleana de tamanho n_linhas."""
+    mascara = np.zeros(n_linhas, dtype=bool)
+    mascara[posicoes] = True
+    return mascara
+
+
+def materializar(df: pd.DataFrame, selecao: np.ndarray, colunas=None) -> pd.DataFrame:
+    """
+    Materializa apenas as linhas selecionadas e as colunas projetadas.
+    `selecao` pode ser uma máscara booleana ou um vetor de posições (IndiceBitmap).
+    É o único ponto em que os filtros geram um novo DataFrame.
+    """
+    if selecao.dtype != bool:
+        if colunas is None:
+            return df.iloc[selecao]
+        return df.iloc[selecao, [df.columns.get_loc(c) for c in colunas]]
+    if colunas is None:
+        return df.loc[selecao]
+    return df.loc[selecao, list(colunas)]
+
+
+def somar_filtrado(serie: pd.Series, selecao: np.ndarray):
+    """Soma de uma coluna restrita à seleção, sem materializar as linhas."""
+    return serie.to_numpy()[selecao].sum()
+
+
+def assinatura_filtros(versao, filtros) -> str:
+    """
+    Chave estável (texto) para uma seleção: versão dos dados + pares (coluna, valores).
+    Usada como chave de cache de resultados derivados da seleção.
+    """
+    partes = [str(versao)]
+    for coluna, valores in filtros:
+        partes.append(f"{coluna}={sorted(map(str, valores)) if valores else '*'}")
+    return "|".join(partes)
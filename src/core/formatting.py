@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+# Limiares e sufixos das abreviações (Tri, Bi, Mi)
+ESCALAS = (1e12, 1e9, 1e6)
+SUFIXOS_LONGOS = (" Tri", " Bi", " Mi")
+SUFIXOS_CURTOS = ("T", "B", "M")
+
+# Tabelas de consulta para grupos de milhar (0-999) e centavos (00-99):
+# evitam converter número a número para texto
+_GRUPOS = np.array([str(i) for i in range(1000)])
+_GRUPOS_3 = np.array([f"{i:03d}" for i in range(1000)])
+_CENTAVOS = np.array([f"{i:02d}" for i in range(100)])
+
+
+def _formatar_escalar(value, prefixo="$", sufixos=SUFIXOS_LONGOS):
+    """Versão valor a valor (referência); usada só nos casos de borda."""
+    if value >= ESCALAS[0]:
+        display = f"{prefixo}{value / ESCALAS[0]:,.2f}{sufixos[0]}"
+    elif value >= ESCALAS[1]:
+        display = f"{prefixo}{value / ESCALAS[1]:,.2f}{sufixos[1]}"
+    elif value >= ESCALAS[2]:
+        display = f"{prefixo}{value / ESCALAS[2]:,.2f}{sufixos[2]}"
+    else:
+        display = f"{prefixo}{value:,.2f}"
+    return display.replace(",", "_TEMP_").replace(".", ",").replace("_TEMP_", ".")
+
+
+def _agrupar_milhares(inteiros: np.ndarray) -> np.ndarray:
+    """Parte inteira com '.' como separador de milhar, coluna inteira de uma vez."""
+    maximo = int(inteiros.max()) if len(inteiros) else 0
+    largura = 4 * max(len(str(maximo)) // 3 + 1, 1)
+    texto = _GRUPOS[inteiros % 1000].astype(f"<U{largura}")
+
+    # Só as linhas com mais de um grupo passam pelo laço (poucas, após a abreviação)
+    resto = inteiros // 1000
+    ativos = np.flatnonzero(resto > 0)
+    texto[ativos] = _GRUPOS_3[inteiros[ativos] % 1000]
+    while ativos.size:
+        grupo = resto[ativos] % 1000
+        resto[ativos] //= 1000
+        acima = resto[ativos] > 0
+        rotulo = np.where(acima, _GRUPOS_3[grupo], _GRUPOS[grupo])
+        texto[ativos] = np.char.add(np.char.add(rotulo, "."), texto[ativos])
+        ativos = ativos[acima]
+    return texto
+
+
+def formatar_metrica_coluna(valores, prefixo="$", sufixos=SUFIXOS_LONGOS) -> pd.Series:
+    """
+    Formata uma coluna numérica inteira no padrão pt-BR com abreviação Mi/Bi/Tri
+    (ex.: 1234567 -> '$1,23 Mi'), em operações vetorizadas do numpy.
+    """
+    serie = pd.Series(valores)
+    numeros = serie.to_numpy(dtype=float, na_value=np.nan)
+
+    escala = np.select(
+        [numeros >= ESCALAS[0], numeros >= ESCALAS[1], numeros >= ESCALAS[2]],
+        list(ESCALAS),
+        1.0,
+    )
+    sufixo = np.select(
+        [numeros >= ESCALAS[0], numeros >= ESCALAS[1], numeros >= ESCALAS[2]],
+        list(sufixos),
+        "",
+    )
+
+    # Não finitos e valores fora do alcance do int64 ficam com a versão escalar
+    em_centavos = np.abs(numeros / escala) * 100
+    fora_do_alcance = ~np.isfinite(em_centavos) | (em_centavos >= 9e18)
+    em_centavos[fora_do_alcance] = 0.0
+    centavos = np.rint(em_centavos).astype(np.int64)
+    inteiros = _agrupar_milhares(centavos // 100)
+    decimais = _CENTAVOS[centavos % 100]
+
+    sinal = np.where(np.signbit(numeros), "-", "")
+    texto = np.char.add(np.char.add(prefixo, sinal), inteiros)
+    texto = np.char.add(np.char.add(np.char.add(texto, ","), decimais), sufixo)
+
+    resultado = pd.Series(texto, index=serie.index, dtype=object)
+
+    # Quase-empates de meio centavo (em que o arredondamento em ponto flutuante
+    # pode divergir do f-string) também ficam com a versão escalar
+    fracao = em_centavos - np.floor(em_centavos)
+    revisar = fora_do_alcance | (np.abs(fracao - 0.5) < 1e-6)
+    if revisar.any():
+        resultado[revisar] = [
+            _formatar_escalar(v, prefixo, sufixos) for v in numeros[revisar]
+        ]
+    return resultado
+
+
+def formatar_fob_coluna(valores, sufixos=SUFIXOS_LONGOS) -> pd.Series:
+    """Coluna monetária (US$) abreviada: '$1,23 Mi', '$45,60 Bi'..."""
+    return formatar_metrica_coluna(valores, prefixo="$", sufixos=sufixos)
+
+
+def abreviar_metrica_coluna(valores, sufixos=SUFIXOS_LONGOS) -> pd.Series:
+    """Coluna numérica abreviada, sem símbolo monetário."""
+    return formatar_metrica_coluna(valores, prefixo="", sufixos=sufixos)
+
+
+def format_fob_metric(value):
+    """
+    Formata um valor numérico para uma string no formato monetário (US$)
+    com sufixos Mi, Bi, ou Tri, utilizando vírgula como separador decimal.
+    """
+    return formatar_fob_coluna([value]).iloc[0]
+
+
+def abbreviate_metric(value):
+    """Abrevia um valor numérico com sufixos Mi, Bi ou Tri (sem símbolo monetário)."""
+    return abreviar_metrica_coluna([value]).iloc[0]
@@ -0,0 +1,220 @@
+import glob
+import os
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from .hs_hierarchy import normalizar_codigo_hs
+from .runtime import cache_dados, logger
+
+# Versões do Sistema Harmonizado, na ordem de publicação
+VERSOES_HS = ("HS92", "HS96", "HS02", "HS07", "HS12", "HS17", "HS22")
+
+# Tabelas de correspondência locais: <ORIGEM>_<DESTINO>.csv (ex: HS92_HS22.csv),
+# com o código de origem na 1ª coluna, o de destino na 2ª e, opcionalmente, a
+# coluna "peso" (fração do código de origem que vai para o destino). Sem peso,
+# um código de origem com n destinos é dividido em partes iguais (1:n).
+CONCORDANCIAS_DIR = "resources/concordancias"
+
+
+# --- 1. TABELAS DE CORRESPONDÊNCIA (PARES ORIGEM -> DESTINO) ---
+
+
+def _tabelas_disponiveis(diretorio):
+    """(origem, destino) -> caminho de cada tabela do diretório."""
+    tabelas = {}
+    for caminho in glob.glob(os.path.join(diretorio, "*_*.csv")):
+        origem, _, destino = os.path.basename(caminho)[:-4].upper().partition("_")
+        if origem in VERSOES_HS and destino in VERSOES_HS:
+            tabelas[origem, destino] = caminho
+    return tabelas
+
+
+def _ler_pares(caminho, nivel):
+    """
+    Pares (origem, destino, peso) de uma tabela, no nível de `nivel` dígitos.
+    Pesos de cada código de origem (no nível da tabela, ex: HS6) somam 1; no
+    nível agregado, o código é a média simples dos seus subcódigos.
+    """
+    df = pd.read_csv(caminho, dtype=str, sep=None, engine="python")
+    pares = pd.DataFrame(
+        {
+            "origem_fina": normalizar_codigo_hs(df.iloc[:, 0]),
+            "origem": normalizar_codigo_hs(df.iloc[:, 0], nivel),
+            "destino": normalizar_codigo_hs(df.iloc[:, 1], nivel),
+            "peso": pd.to_numeric(df["peso"], errors="coerce") if "peso" in df else 1.0,
+        }
+    ).dropna()
+    pares = pares[pares["peso"] > 0]
+    pares["peso"] /= pares.groupby("origem_fina")["peso"].transform("sum")
+    pares["peso"] /= pares.groupby("origem")["origem_fina"].transform("nunique")
+    return pares.groupby(["origem", "destino"], as_index=False)["peso"].sum()
+
+
+def _inverter(pares):
+    """Pares do sentido inverso: cada destino volta às suas origens, na proporção dos pesos."""
+    inverso = pares.rename(columns={"origem": "destino", "destino": "origem"})
+    inverso["peso"] /= inverso.groupby("origem")["peso"].transform("sum")
+    return inverso[["origem", "destino", "peso"]]
+
+
+def _compor(primeiro, segundo):
+    """Pares de A -> C a partir de A -> B e B -> C (produto das matrizes esparsas)."""
+    composto = primeiro.merge(
+        segundo.rename(columns={"origem": "destino", "destino": "final", "peso": "peso_final"}),
+        on="destino",
+        how="left",
+    )
+    # Código intermediário sem correspondência adiante: segue com o mesmo código
+    composto["final"] = composto["final"].fillna(composto["destino"])
+    composto["peso"] *= composto["peso_final"].fillna(1.0)
+    composto = composto.groupby(["origem", "final"], as_index=False)["peso"].sum()
+    return composto.rename(columns={"final": "destino"})
+
+
+def _caminho(origem, destino, tabelas):
+    """Menor sequência de tabelas (diretas ou invertidas) de `origem` até `destino`."""
+    vizinhos = {}
+    for a, b in tabelas:
+        vizinhos.setdefault(a, []).append((b, (a, b), False))
+        vizinhos.setdefault(b, []).append((a, (a, b), True))
+    anteriores = {origem: None}
+    fila = deque([origem])
+    while fila:
+        atual = fila.popleft()
+        if atual == destino:
+            passos = []
+            while anteriores[atual] is not None:
+                atual, passo = anteriores[atual]
+                passos.append(passo)
+            return passos[::-1]
+        for proximo, tabela, invertida in vizinhos.get(atual, []):
+            if proximo not in anteriores:
+                anteriores[proximo] = (atual, (tabela, invertida))
+                fila.append(proximo)
+    return None
+
+
+# --- 2. MATRIZ DE CONCORDÂNCIA POR PAR DE VERSÕES ---
+
+
+def versao_concordancias(diretorio=CONCORDANCIAS_DIR):
+    """Chave de versão das tabelas de correspondência (arquivos e datas de modificação)."""
+    return "|".join(
+        f"{caminho}:{os.path.getmtime(caminho)}"
+        for caminho in sorted(_tabelas_disponiveis(diretorio).values())
+    )
+
+
+@cache_dados(etapa="carga")
+def matriz_concordancia(origem, destino, nivel=4, diretorio=CONCORDANCIAS_DIR, versao=None):
+    """
+    Matriz esparsa C (códigos de origem x códigos de destino) em formato CSR:
+    C[a, b] é a fração do código `a` (versão `origem`) que corresponde a `b`
+    (versão `destino`); cada linha soma 1. Sem tabela direta, usa a menor cadeia
+    de tabelas disponíveis (invertendo as que estiverem no sentido contrário) e
+    compõe as matrizes. Calculada uma vez por par de versões (`versao`, de
+    versao_concordancias, renova o cache quando as tabelas mudam).
+
+    Retorna None se as versões forem iguais ou não houver tabelas que as liguem.
+    """
+    if origem == destino:
+        return None
+    tabelas = _tabelas_disponiveis(diretorio)
+    passos = _caminho(origem, destino, tabelas)
+    if passos is None:
+        logger.warning(
+            "Sem tabela de correspondência %s -> %s em '%s'; códigos usados sem conversão.",
+            origem,
+            destino,
+            diretorio,
+        )
+        return None
+
+    pares = None
+    for tabela, invertida in passos:
+        etapa = _ler_pares(tabelas[tabela], nivel)
+        etapa = _inverter(etapa) if invertida else etapa
+        pares = etapa if pares is None else _compor(pares, etapa)
+    if pares.empty:
+        logger.warning("Tabela(s) de correspondência %s -> %s vazia(s).", origem, destino)
+        return None
+
+    linhas, origens = pd.factorize(pares["origem"], sort=True)
+    colunas, destinos = pd.factorize(pares["destino"], sort=True)
+    ordem = np.lexsort((colunas, linhas))
+    return {
+        "origens": np.asarray(origens),
+        "destinos": np.asarray(destinos),
+        "inicio": np.concatenate(([0], np.cumsum(np.bincount(linhas, minlength=len(origens))))),
+        "colunas": colunas[ordem],
+        "pesos": pares["peso"].to_numpy(dtype=float)[ordem],
+    }
+
+
+# --- 3. CONVERSÃO DE DATAFRAMES ENTRE VERSÕES ---
+
+
+def converter(
+    df,
+    origem,
+    destino,
+    coluna="headingCode",
+    somar=(),
+    media=(),
+    nivel=4,
+    diretorio=CONCORDANCIAS_DIR,
+):
+    """
+    Converte os códigos de `coluna` da versão `origem` para `destino`.
+
+    Cada linha é repartida entre os códigos de destino pela matriz de
+    concordância (1:n) numa única passada vetorizada: as colunas em `somar`
+    (valores, ex: FOB) são multiplicadas pelo peso e somadas no destino; as em
+    `media` (índices, ex: PCI, RCA) viram médias ponderadas pelos pesos. As
+    demais colunas são chaves do agrupamento (ex: year, state).
+    Códigos fora da tabela passam inalterados. Sem concordância, devolve `df`
+    só com os códigos normalizados em `nivel` dígitos.
+    """
+    somar, media = list(somar), list(media)
+    chaves = [c for c in df.columns if c not in somar + media + [coluna]]
+    codigos = normalizar_codigo_hs(df[coluna], nivel)
+    matriz = matriz_concordancia(
+        origem, destino, nivel, diretorio, versao_concordancias(diretorio)
+    )
+    if matriz is None:
+        return df.assign(**{coluna: codigos})
+
+    inicio = matriz["inicio"]
+    linha = pd.Index(matriz["origens"]).get_indexer(codigos.to_numpy())
+    mapeado = linha >= 0
+    contagem = np.where(mapeado, inicio[linha + 1] - inicio[linha], 1)
+    origem_linha = np.repeat(np.arange(len(df)), contagem)
+    deslocamento = np.arange(len(origem_linha)) - np.repeat(
+        np.cumsum(contagem) - contagem, contagem
+    )
+    entrada = np.where(mapeado[origem_linha], inicio[linha[origem_linha]] + deslocamento, -1)
+    peso = np.where(entrada >= 0, matriz["pesos"][entrada], 1.0)
+
+    expandido = df[chaves].iloc[origem_linha].reset_index(drop=True)
+    expandido[coluna] = np.where(
+        entrada >= 0,
+        matriz["destinos"][matriz["colunas"][entrada]],
+        codigos.to_numpy()[origem_linha],
+    )
+    for nome in somar:
+        expandido[nome] = df[nome].to_numpy(dtype=float)[origem_linha] * peso
+    for nome in media:
+        valores = df[nome].to_numpy(dtype=float)[origem_linha]
+        presente = ~np.isnan(valores)
+        expandido[nome] = np.where(presente, valores * peso, 0.0)
+        expandido[f"_peso_{nome}"] = np.where(presente, peso, 0.0)
+
+    convertido = expandido.groupby(
+        chaves + [coluna], as_index=False, sort=False, dropna=False
+    ).sum()
+    for nome in media:
+        pesos_media = convertido.pop(f"_peso_{nome}")
+        convertido[nome] = convertido[nome].where(pesos_media > 0) / pesos_media
+    return convertido[chaves + [coluna] + somar + media]
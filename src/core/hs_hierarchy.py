@@ -0,0 +1,170 @@
+import numpy as np
+import pandas as pd
+
+# Largura do código folha mais detalhado (NCM 8 dígitos)
+LARGURA_NCM = 8
+
+# Níveis da hierarquia (nome -> número de dígitos)
+NIVEIS_HS = {"hs2": 2, "hs4": 4, "hs6": 6, "ncm8": 8}
+
+# Seções do Sistema Harmonizado (capítulo inicial, capítulo final)
+SECOES_HS = {
+    "I": (1, 5),
+    "II": (6, 14),
+    "III": (15, 15),
+    "IV": (16, 24),
+    "V": (25, 27),
+    "VI": (28, 38),
+    "VII": (39, 40),
+    "VIII": (41, 43),
+    "IX": (44, 46),
+    "X": (47, 49),
+    "XI": (50, 63),
+    "XII": (64, 67),
+    "XIII": (68, 70),
+    "XIV": (71, 71),
+    "XV": (72, 83),
+    "XVI": (84, 85),
+    "XVII": (86, 89),
+    "XVIII": (90, 92),
+    "XIX": (93, 93),
+    "XX": (94, 96),
+    "XXI": (97, 97),
+}
+SECAO_ESPECIAL = "Especiais"  # capítulos 98/99 e códigos fora do SH
+
+
+def normalizar_codigo_hs(serie: pd.Series, digitos: int | None = None) -> pd.Series:
+    """
+    Forma canônica dos códigos HS/NCM como texto só com dígitos.
+    - remove o ".0" de códigos lidos como float e qualquer caractere não numérico;
+    - repõe o zero à esquerda perdido (comprimento ímpar -> par, mínimo 2 dígitos);
+    - com `digitos`, completa até esse nível e trunca nele (ex.: NCM8 -> HS4).
+    """
+    codigos = (
+        serie.astype(str)
+        .str.replace(r"\.0$", "", regex=True)
+        .str.replace(r"\D", "", regex=True)
+    )
+    comprimento = codigos.str.len()
+    codigos = codigos.where(comprimento % 2 == 0, "0" + codigos).str.zfill(2)
+    if digitos is not None:
+        codigos = codigos.str.zfill(digitos).str[:digitos]
+    return codigos
+
+
+def secao_do_capitulo(capitulo: int) -> str:
+    """Seção (algarismo romano) à qual pertence um capítulo HS2."""
+    for secao, (inicio, fim) in SECOES_HS.items():
+        if inicio <= capitulo <= fim:
+            return secao
+    return SECAO_ESPECIAL
+
+
+class HierarquiaHS:
+    """
+    Hierarquia Seção -> HS2 -> HS4 -> HS6 -> NCM8 sobre um conjunto de códigos folha.
+
+    Os códigos são codificados como inteiros de 8 dígitos (completados à direita)
+    e mantidos ordenados; cada prefixo HS corresponde a uma faixa contígua, então
+    consultas por prefixo ou intervalo custam duas buscas binárias (O(log n)).
+    Somas acumuladas e agregados por nível são pré-calculados na construção, de
+    modo que visões por capítulo/seção não voltam a varrer as folhas.
+    """
+
+    def __init__(self, codigos: pd.Series, valores: pd.DataFrame | None = None):
+        codigos = normalizar_codigo_hs(codigos.reset_index(drop=True))
+        self.largura_folha = int(codigos.str.len().max()) if len(codigos) else 4
+
+        chaves = codigos.str.ljust(LARGURA_NCM, "0").astype(np.int64).to_numpy()
+        self._ordem = np.argsort(chaves, kind="stable")
+        self._chaves = chaves[self._ordem]
+
+        # Códigos folha distintos, já ordenados (opções de filtro)
+        self.codigos = sorted(codigos.unique().tolist())
+
+        # Somas acumuladas das colunas de valor na ordem da hierarquia
+        self.colunas_valor = [] if valores is None else list(valores.columns)
+        self._acumulados = {}
+        for coluna in self.colunas_valor:
+            em_ordem = valores[coluna].to_numpy(dtype=float)[self._ordem]
+            self._acumulados[coluna] = np.concatenate(([0.0], np.cumsum(em_ordem)))
+
+        # Offsets de prefixo e agregados de cada nível
+        self._niveis = {}
+        for nivel, digitos in NIVEIS_HS.items():
+            if digitos <= self.largura_folha:
+                self._niveis[nivel] = self._agregar_nivel(digitos)
+        self._niveis["secao"] = self._agregar_secoes()
+
+    # --- CONSTRUÇÃO ---
+
+    def _agregar_nivel(self, digitos: int) -> pd.DataFrame:
+        prefixos = self._chaves // 10 ** (LARGURA_NCM - digitos)
+        unicos, inicio = np.unique(prefixos, return_index=True)
+        fim = np.append(inicio[1:], len(prefixos))
+
+        df_nivel = pd.DataFrame(
+            {
+                "codigo": pd.Series(unicos, dtype=str).str.zfill(digitos),
+                "inicio": inicio,
+                "fim": fim,
+                "n_folhas": fim - inicio,
+            }
+        )
+        for coluna, acumulado in self._acumulados.items():
+            df_nivel[coluna] = acumulado[fim] - acumulado[inicio]
+        return df_nivel
+
+    def _agregar_secoes(self) -> pd.DataFrame:
+        df_hs2 = self._niveis["hs2"] if "hs2" in self._niveis else self._agregar_nivel(2)
+        df_hs2 = df_hs2.assign(
+            secao=df_hs2["codigo"].astype(int).map(secao_do_capitulo)
+        )
+        agregacoes = {"n_folhas": "sum", **{c: "sum" for c in self.colunas_valor}}
+        df_secoes = df_hs2.groupby("secao", sort=False).agg(agregacoes).reset_index()
+        return df_secoes.rename(columns={"secao": "codigo"})
+
+    # --- CONSULTAS ---
+
+    def _faixa_prefixo(self, codigo: str) -> tuple[int, int]:
+        """Faixa [lo, hi) de chaves inteiras coberta por um prefixo HS/NCM."""
+        codigo = normalizar_codigo_hs(pd.Series([codigo])).iloc[0]
+        escala = 10 ** (LARGURA_NCM - len(codigo))
+        return int(codigo) * escala, (int(codigo) + 1) * escala
+
+    def intervalo(self, inicio: str | None = None, fim: str | None = None):
+        """
+        Faixa de posições (na ordem da hierarquia) dos códigos entre `inicio` e `fim`,
+        inclusive (um prefixo em `fim` inclui todos os seus descendentes).
+        """
+        i = 0
+        j = len(self._chaves)
+        if inicio is not None:
+            i = int(np.searchsorted(self._chaves, self._faixa_prefixo(inicio)[0]))
+        if fim is not None:
+            j = int(np.searchsorted(self._chaves, self._faixa_prefixo(fim)[1]))
+        return i, max(i, j)
+
+    def prefixo(self, codigo: str):
+        """Faixa de posições de todos os descendentes de um código (ex.: capítulo '84')."""
+        lo, hi = self._faixa_prefixo(codigo)
+        return (
+            int(np.searchsorted(self._chaves, lo)),
+            int(np.searchsorted(self._chaves, hi)),
+        )
+
+    def posicoes(self, inicio: str | None = None, fim: str | None = None) -> np.ndarray:
+        """Posições (na ordem original das linhas) dos códigos dentro do intervalo."""
+        i, j = self.intervalo(inicio, fim)
+        return np.sort(self._ordem[i:j])
+
+    def soma(self, coluna: str, inicio: str | None = None, fim: str | None = None):
+        """Soma de uma coluna de valor no intervalo, via somas acumuladas."""
+        i, j = self.intervalo(inicio, fim)
+        acumulado = self._acumulados[coluna]
+        return acumulado[j] - acumulado[i]
+
+    def agregado(self, nivel: str) -> pd.DataFrame:
+        """Agregados pré-calculados de um nível ('secao', 'hs2', 'hs4', 'hs6', 'ncm8')."""
+        return self._niveis[nivel].drop(columns=["inicio", "fim"], errors="ignore")
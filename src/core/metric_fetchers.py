@@ -1,24 +1,36 @@
 import pandas as pd
-import streamlit as st
 
+from .config import VERSOES_HS_FONTES
+from .hs_concordance import converter
+from .hs_hierarchy import normalizar_codigo_hs
+from .runtime import cache_dados
 
-@st.cache_data
-def obter_vcr_brasil_mundo(df_harvard):
-    """Processa o DataFrame de Harvard para obter o VCR Brasil vs. Mundo por HS4."""
+
+@cache_dados
+def obter_vcr_brasil_mundo(df_harvard, versao_hs=None):
+    """
+    Processa o DataFrame de Harvard para obter o VCR Brasil vs. Mundo por HS4.
+    Com `versao_hs` (ex: a do ComexStat), os códigos HS92 são convertidos para
+    essa versão pela concordância (médias ponderadas pelos pesos 1:n).
+    """
     df_vcr = df_harvard.rename(
         columns={"product_hs92_code": "headingCode", "export_rca": "VCR_Brasil_Mundo"}
     ).copy()
 
-    df_vcr["headingCode"] = df_vcr["headingCode"].astype(str).str[:4]
+    df_vcr["headingCode"] = normalizar_codigo_hs(df_vcr["headingCode"], 4)
 
     df_vcr = df_vcr.groupby("headingCode")["VCR_Brasil_Mundo"].mean().reset_index()
+    if versao_hs is not None:
+        df_vcr = converter(
+            df_vcr, VERSOES_HS_FONTES["harvard"], versao_hs, media=["VCR_Brasil_Mundo"]
+        )
 
     return df_vcr
 
 
-@st.cache_data
-def obter_pci_e_distancia(df_harvard):
-    """Processa o DataFrame de Harvard para obter PCI e Distância por HS4."""
+@cache_dados
+def obter_pci_e_distancia(df_harvard, versao_hs=None):
+    """Processa o DataFrame de Harvard para obter PCI e Distância por HS4 (ver versao_hs acima)."""
     df_metrics = df_harvard.rename(
         columns={
             "product_hs92_code": "headingCode",
@@ -27,12 +39,19 @@ def obter_pci_e_distancia(df_harvard):
         }
     ).copy()
 
-    df_metrics["headingCode"] = df_metrics["headingCode"].astype(str).str[:4]
+    df_metrics["headingCode"] = normalizar_codigo_hs(df_metrics["headingCode"], 4)
 
     df_metrics = (
         df_metrics.groupby("headingCode")
         .agg({"PCI": "mean", "Distancia_Parceiros": "mean"})
         .reset_index()
     )
+    if versao_hs is not None:
+        df_metrics = converter(
+            df_metrics,
+            VERSOES_HS_FONTES["harvard"],
+            versao_hs,
+            media=["PCI", "Distancia_Parceiros"],
+        )
 
     return df_metrics
@@ -1,13 +1,15 @@
 import pandas as pd
-import streamlit as st
 
+from .runtime import cache_dados
 
-@st.cache_data
+
+@cache_dados
 def normalizar_vcr(df: pd.DataFrame, coluna_vcr: str) -> pd.DataFrame:
     """
-    Normaliza uma coluna específica e cria uma nova com o sufixo _NORM.
+    Normaliza uma coluna específica e cria uma nova com o sufixo _norm
+    (mesmo sufixo lido pelo índice de prioridade).
     """
-    coluna_norm = coluna_vcr + "_NORM"
+    coluna_norm = coluna_vcr + "_norm"
 
     # Garante que os dados sejam numéricos para o cálculo
     vcr_numeric = pd.to_numeric(df[coluna_vcr], errors="coerce")
@@ -3,10 +3,23 @@ import numpy as np
 
 # Importação relativa para usar 'normalizar_vcr' de outro módulo 'core'
 from .normalization import normalizar_vcr
+from .tracing import rastrear
 
 
-def calcular_vcr_ajustado(df_metrics: pd.DataFrame) -> pd.DataFrame:
-    """Calcula o VCR Ajustado, ponderando VCR Ceará/Brasil com PCI para produtos complexos."""
+@rastrear("analise")
+def calcular_vcr_ajustado(
+    df_metrics: pd.DataFrame, df_ql_emprego: pd.DataFrame | None = None
+) -> pd.DataFrame:
+    """
+    Calcula o VCR Ajustado. Com o quociente locacional do emprego por HS4
+    (core.cnae_allocation.ql_emprego_hs4), é a média geométrica
+    sqrt(VCR Ceará/Brasil x QL): passa de 1 só quando a vantagem aparece nas
+    exportações e no emprego formal do estado. HS4 sem QL (sem CNAE com emprego
+    correspondente) ficam NaN: as duas regras têm escalas diferentes e não se
+    misturam numa mesma coluna normalizada. Sem dados de emprego, vale para todos
+    o placeholder original, que pondera a VCR com o PCI. A coluna
+    Fonte_VCR_Ajustado indica qual regra valeu ("sem QL" nos NaN).
+    """
     df = df_metrics.copy()
     vcr_ce_br = pd.to_numeric(df["VCR_Ceara_Brasil"], errors="coerce").fillna(0)
     pci = pd.to_numeric(df["PCI"], errors="coerce").fillna(0)
@@ -17,10 +30,46 @@ def calcular_vcr_ajustado(df_metrics: pd.DataFrame) -> pd.DataFrame:
         (vcr_ce_br + pci) / 2,
         vcr_ce_br,
     )
+    df["Fonte_VCR_Ajustado"] = "placeholder"
+
+    if df_ql_emprego is not None and not df_ql_emprego.empty:
+        ql = df["headingCode"].map(df_ql_emprego.set_index("headingCode")["QL_Emprego"])
+        df["VCR_AJUSTADO"] = np.sqrt(vcr_ce_br * ql)
+        df["Fonte_VCR_Ajustado"] = np.where(ql.notna(), "emprego", "sem QL")
+        df["QL_Emprego"] = ql
+
     df = normalizar_vcr(df, "VCR_AJUSTADO")
     return df
 
 
+def _parcelas_indice_prioridade(df, pesos):
+    """
+    Parcelas X, Y, Z, AA do .ods: valores normalizados (Min-Max) vezes os pesos.
+    Colunas normalizadas ausentes contam como zero.
+    """
+
+    def _norm(coluna):
+        return df[coluna] if coluna in df.columns else 0
+
+    return {
+        "X": _norm("VCR_Ceara_Brasil_norm") * pesos.get("vcr_ceara", 0),
+        "Y": _norm("VCR_Brasil_Mundo_norm") * pesos.get("vcr_brasil", 0),
+        "Z": _norm("PCI_norm") * pesos.get("pci", 0),
+        "AA": _norm("Distancia_Parceiros_norm") * pesos.get("distancia", 0),
+    }
+
+
+@rastrear("analise")
+def calcular_serie_indice_prioridade(df, pesos):
+    """
+    Retorna apenas a série do Índice de Prioridade Ajustado (Coluna AC do .ods),
+    sem copiar o DataFrame de entrada.
+    """
+    parcelas = _parcelas_indice_prioridade(df, pesos)
+    return parcelas["X"] + parcelas["Y"] + parcelas["Z"] + parcelas["AA"]
+
+
+@rastrear("analise")
 def calcular_indice_prioridade_ajustado(df, pesos):
     """
     Calcula o índice final seguindo a lógica das colunas X, Y, Z, AA do .ods.
@@ -29,30 +78,9 @@ def calcular_indice_prioridade_ajustado(df, pesos):
     # Criamos uma cópia para não gerar avisos de SettingWithCopy
     df_calc = df.copy()
 
-    # Mapeamento das colunas normalizadas (garantindo que existam)
-    # Se a coluna não existir, cria-se uma série de zeros com o mesmo index do DF
-    vcr_ce_norm = (
-        df_calc["VCR_Ceara_Brasil_norm"]
-        if "VCR_Ceara_Brasil_norm" in df_calc.columns
-        else 0
-    )
-    vcr_br_norm = (
-        df_calc["VCR_Brasil_Mundo_norm"]
-        if "VCR_Brasil_Mundo_norm" in df_calc.columns
-        else 0
-    )
-    pci_norm = df_calc["PCI_norm"] if "PCI_norm" in df_calc.columns else 0
-    dist_norm = (
-        df_calc["Distancia_Parceiros_norm"]
-        if "Distancia_Parceiros_norm" in df_calc.columns
-        else 0
-    )
-
     # Lógica das colunas X, Y, Z, AA do .ods
-    df_calc["X"] = vcr_ce_norm * pesos.get("vcr_ceara", 0)
-    df_calc["Y"] = vcr_br_norm * pesos.get("vcr_brasil", 0)
-    df_calc["Z"] = pci_norm * pesos.get("pci", 0)
-    df_calc["AA"] = dist_norm * pesos.get("distancia", 0)
+    for coluna, parcela in _parcelas_indice_prioridade(df_calc, pesos).items():
+        df_calc[coluna] = parcela
 
     # Soma final (Coluna AC do .ods / Ranking da Planilha8)
     df_calc["INDICE_PRIORIDADE_AJUSTADO"] = (
@@ -0,0 +1,149 @@
+import numpy as np
+import pandas as pd
+
+from .complexity import complexidade_paises, matriz_rca
+from .config import VERSOES_HS_FONTES
+from .hs_concordance import converter
+from .hs_hierarchy import normalizar_codigo_hs
+from .runtime import cache_dados
+
+# Origem da distância usada no Índice de Prioridade: média mundial do Harvard
+# (coluna `distance`) ou distância do próprio estado no espaço-produto
+FONTES_DISTANCIA = ("harvard", "estado")
+
+COLUNAS_ESPACO_PRODUTO = ["headingCode", "Distancia_Estado", "Densidade", "COG"]
+
+
+# --- 1. MATRIZ BINÁRIA DE UM ANO ---
+
+
+def _matriz_binaria(df, local, produto, valor, ano, produtos):
+    """
+    M (locais x produtos) do ano, com RCA >= 1, nas colunas de `produtos`.
+    Densa: são poucos locais (países/estados) e o produto M^T M fica no BLAS.
+    """
+    dados = df[df["year"] == ano]
+    m = matriz_rca(dados, local, produto, valor)
+    locais = m["rotulos_linhas"][local].to_numpy()
+    coluna = pd.Index(produtos).get_indexer(m["rotulos_colunas"][produto].to_numpy())
+
+    matriz = np.zeros((len(locais), len(produtos)), dtype=np.float32)
+    entradas = coluna[m["colunas"]] >= 0
+    matriz[m["linhas"][entradas], coluna[m["colunas"]][entradas]] = 1.0
+    return locais, matriz
+
+
+def _ano_referencia(anos_disponiveis, ano):
+    """O próprio ano, senão o mais recente anterior, senão o primeiro disponível."""
+    anos = sorted(anos_disponiveis)
+    anteriores = [a for a in anos if a <= ano]
+    return anteriores[-1] if anteriores else anos[0]
+
+
+def _harvard_hs4(df_harvard):
+    df = df_harvard[["year", "country_iso3_code", "product_hs92_code", "export_value"]]
+    df = df.rename(columns={"product_hs92_code": "headingCode"})
+    df["headingCode"] = normalizar_codigo_hs(df["headingCode"], 4)
+    return df
+
+
+# --- 2. PROXIMIDADE ENTRE PRODUTOS (HARVARD, PAÍS x PRODUTO) ---
+
+
+@cache_dados
+def proximidade_produtos(df_harvard, ano):
+    """
+    Proximidade do espaço-produto no ano (Hidalgo et al., 2007):
+    phi[p, q] = (M^T M)[p, q] / max(u_p, u_q), a menor das probabilidades
+    condicionais de um país ter RCA em p e em q. Retorna (códigos HS4, phi).
+    """
+    df = _harvard_hs4(df_harvard)
+    produtos = np.sort(df.loc[df["year"] == ano, "headingCode"].dropna().unique())
+    _, m = _matriz_binaria(df, "country_iso3_code", "headingCode", "export_value", ano, produtos)
+
+    coocorrencia = m.T @ m
+    ubiquidade = np.diag(coocorrencia).copy()
+    maior = np.maximum.outer(ubiquidade, ubiquidade)
+    phi = np.divide(coocorrencia, maior, out=np.zeros_like(coocorrencia), where=maior > 0)
+    return produtos, phi
+
+
+# --- 3. DENSIDADE, DISTÂNCIA E COG DOS ESTADOS ---
+
+
+@cache_dados
+def espaco_produto_estados(df_comexstat, df_harvard, ano=None):
+    """
+    Densidade, distância e ganho de perspectiva de complexidade (COG) de cada
+    estado x HS4 no ano (padrão: o último do ComexStat), com a proximidade do ano
+    correspondente do Harvard (ou o anterior mais próximo) e o PCI calculado em
+    core.complexity.
+
+    - densidade[s, p] = sum_q M[s, q] phi[p, q] / sum_q phi[p, q]; distância = 1 - densidade
+    - COG[s, p] = sum_q phi[p, q] / sum_r phi[r, q] * (1 - M[s, q]) * PCI[q]
+    - COI[s] = sum_p densidade[s, p] * (1 - M[s, p]) * PCI[p]
+
+    M[s, p] é a RCA binária do estado contra o Brasil. O ComexStat é levado à
+    versão do SH do Harvard (core.hs_concordance) antes de montar M, então os
+    códigos de saída são os do Harvard (HS92). Retorna (df_estado_produto,
+    df_estados): [year, state, headingCode, RCA_binaria, Densidade,
+    Distancia_Estado, COG] e [year, state, COI].
+    """
+    if ano is None:
+        ano = int(df_comexstat["year"].max())
+    if df_harvard.empty or df_comexstat.empty:
+        return (
+            pd.DataFrame(columns=["year", "state", "RCA_binaria", *COLUNAS_ESPACO_PRODUTO]),
+            pd.DataFrame(columns=["year", "state", "COI"]),
+        )
+    ano_harvard = _ano_referencia(df_harvard["year"].dropna().unique(), ano)
+    produtos, phi = proximidade_produtos(df_harvard, ano_harvard)
+
+    df_comex = converter(
+        df_comexstat[["year", "state", "headingCode", "metricFOB"]],
+        VERSOES_HS_FONTES["comexstat"],
+        VERSOES_HS_FONTES["harvard"],
+        somar=["metricFOB"],
+    )
+    estados, m = _matriz_binaria(df_comex, "state", "headingCode", "metricFOB", ano, produtos)
+
+    _, df_pci = complexidade_paises(df_harvard)
+    df_pci = df_pci[df_pci["year"] == ano_harvard].set_index("headingCode")["PCI"]
+    pci = df_pci.reindex(produtos).fillna(0.0).to_numpy(dtype=np.float32)
+
+    soma_phi = phi.sum(axis=0)
+    soma_phi = np.where(soma_phi > 0, soma_phi, 1.0)
+    densidade = (m @ phi) / soma_phi  # phi é simétrica
+    cog = ((1.0 - m) * pci) @ (phi / soma_phi).T
+    coi = (densidade * (1.0 - m) * pci).sum(axis=1)
+
+    df_estado_produto = pd.DataFrame(
+        {
+            "year": ano,
+            "state": np.repeat(estados, len(produtos)),
+            "headingCode": np.tile(produtos, len(estados)),
+            "RCA_binaria": m.ravel().astype(bool),
+            "Densidade": densidade.ravel().astype(float),
+            "Distancia_Estado": 1.0 - densidade.ravel().astype(float),
+            "COG": cog.ravel().astype(float),
+        }
+    )
+    df_estados = pd.DataFrame({"year": ano, "state": estados, "COI": coi.astype(float)})
+    return df_estado_produto, df_estados
+
+
+def metricas_espaco_produto(df_comexstat, df_harvard, estado, ano=None):
+    """
+    Distância, densidade e COG de um estado por HS4, prontos para substituir a
+    distância do Harvard no Índice de Prioridade (ver consolidar_metricas): as
+    métricas, calculadas em HS92, voltam à versão do SH do ComexStat (médias
+    ponderadas pela concordância) para o join por headingCode.
+    """
+    df_estado_produto, _ = espaco_produto_estados(df_comexstat, df_harvard, ano)
+    df = df_estado_produto[df_estado_produto["state"] == estado]
+    return converter(
+        df[COLUNAS_ESPACO_PRODUTO],
+        VERSOES_HS_FONTES["harvard"],
+        VERSOES_HS_FONTES["comexstat"],
+        media=COLUNAS_ESPACO_PRODUTO[1:],
+    ).reset_index(drop=True)
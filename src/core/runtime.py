@@ -0,0 +1,155 @@
+import copy
+import functools
+import hashlib
+import inspect
+import logging
+import pickle
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from .tracing import rastrear_cache
+
+logger = logging.getLogger("zpe")
+
+
+class ErroDados(RuntimeError):
+    """Falha nos dados de entrada que impede o cálculo (ex.: arquivos ausentes)."""
+
+
+# --- 1. BACKENDS DE CACHE ---
+
+
+def _chave_argumento(valor):
+    """Representação hasheável de um argumento (DataFrames e arrays pelo conteúdo)."""
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        conteudo = pd.util.hash_pandas_object(valor, index=True).to_numpy()
+        colunas = tuple(valor.columns) if isinstance(valor, pd.DataFrame) else valor.name
+        return ("pandas", colunas, valor.shape, hashlib.sha1(conteudo.tobytes()).hexdigest())
+    if isinstance(valor, np.ndarray):
+        return ("numpy", valor.dtype.str, valor.shape, hashlib.sha1(valor.tobytes()).hexdigest())
+    if isinstance(valor, (list, tuple)):
+        return (type(valor).__name__, tuple(_chave_argumento(v) for v in valor))
+    if isinstance(valor, dict):
+        return ("dict", tuple(sorted((k, _chave_argumento(v)) for k, v in valor.items())))
+    try:
+        hash(valor)
+        return valor
+    except TypeError:
+        return hashlib.sha1(pickle.dumps(valor)).hexdigest()
+
+
+class CacheMemoria:
+    """
+    Backend padrão: memoização em memória, por processo e thread-safe.
+    Segue as regras do Streamlit: parâmetros com "_" no início não entram na chave,
+    e resultados de cache de dados são devolvidos como cópia (o chamador pode
+    alterá-los sem corromper o cache); recursos são compartilhados.
+    """
+
+    def envolver(self, func, tipo, max_entries=None, **_opcoes):
+        assinatura = inspect.signature(func)
+        entradas = OrderedDict()
+        trava = threading.Lock()
+
+        @functools.wraps(func)
+        def chamada(*args, **kwargs):
+            argumentos = assinatura.bind(*args, **kwargs)
+            argumentos.apply_defaults()
+            chave = tuple(
+                (nome, _chave_argumento(valor))
+                for nome, valor in argumentos.arguments.items()
+                if not nome.startswith("_")
+            )
+            with trava:
+                encontrado = chave in entradas
+                if encontrado:
+                    entradas.move_to_end(chave)
+                    resultado = entradas[chave]
+            if not encontrado:
+                resultado = func(*args, **kwargs)
+                with trava:
+                    entradas[chave] = resultado
+                    if max_entries is not None and len(entradas) > max_entries:
+                        entradas.popitem(last=False)
+            return resultado if tipo == "recurso" else copy.deepcopy(resultado)
+
+        chamada.clear = entradas.clear
+        return chamada
+
+
+class SemCache:
+    """Backend que desliga o cache (útil em benchmarks e testes de desempenho)."""
+
+    def envolver(self, func, tipo, **_opcoes):
+        return func
+
+
+# --- 2. CONFIGURAÇÃO (backend de cache e relato de erros) ---
+
+
+_estado = {"backend": CacheMemoria(), "relator": None}
+
+
+def configurar(backend=None, relator_erros=None):
+    """
+    Instala o backend de cache e/ou a função que exibe erros não fatais.
+    Pode ser chamado depois dos imports: os decoradores resolvem o backend na
+    primeira chamada de cada função.
+    """
+    if backend is not None:
+        _estado["backend"] = backend
+    if relator_erros is not None:
+        _estado["relator"] = relator_erros
+
+
+def relatar_erro(mensagem):
+    """Erro não fatal: registra no log e repassa ao relator instalado (ex.: st.error)."""
+    logger.error(mensagem)
+    if _estado["relator"] is not None:
+        _estado["relator"](mensagem)
+
+
+def falhar(mensagem):
+    """Erro fatal de dados: registra no log e interrompe com ErroDados."""
+    logger.error(mensagem)
+    raise ErroDados(mensagem)
+
+
+# --- 3. DECORADORES ---
+
+
+def _decorador(tipo):
+    def decorar(func=None, etapa="analise", **opcoes):
+        """
+        `etapa` é a etapa do span de rastreamento (core.tracing) de cada chamada,
+        que registra acerto/execução do cache; as demais opções vão para o backend.
+        """
+        if func is None:
+            return functools.partial(decorar, etapa=etapa, **opcoes)
+
+        def no_backend(executar):
+            envolvidas = {}
+
+            @functools.wraps(executar)
+            def wrapper(*args, **kwargs):
+                backend = _estado["backend"]
+                chamada = envolvidas.get(backend)
+                if chamada is None:
+                    chamada = envolvidas[backend] = backend.envolver(executar, tipo, **opcoes)
+                return chamada(*args, **kwargs)
+
+            return wrapper
+
+        return rastrear_cache(no_backend, etapa=etapa)(func)
+
+    return decorar
+
+
+# Resultado serializável, devolvido como cópia (equivalente a st.cache_data)
+cache_dados = _decorador("dados")
+
+# Objeto compartilhado entre chamadas, sem cópia (equivalente a st.cache_resource)
+cache_recurso = _decorador("recurso")
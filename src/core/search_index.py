@@ -0,0 +1,142 @@
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+from difflib import SequenceMatcher
+from math import log
+
+# Palavras sem valor de busca nas descrições da NCM/SH (já sem acento)
+STOPWORDS = {
+    "a", "as", "o", "os", "e", "ou", "de", "da", "das", "do", "dos", "em", "na",
+    "nas", "no", "nos", "para", "por", "com", "sem", "seus", "suas", "outros",
+    "outras", "mesmo", "mesmos", "the", "and", "of", "or", "other", "not",
+}
+
+# Pesos de cada tipo de correspondência no ranking
+PESO_EXATO = 1.0
+PESO_PREFIXO = 0.7
+PESO_APROXIMADO = 0.5
+PESO_CODIGO = 3.0
+
+MAX_EXPANSOES_PREFIXO = 50
+SIMILARIDADE_MINIMA = 0.8
+
+
+def dobrar_acentos(texto: str) -> str:
+    """Minúsculas sem acentos ('Óleos de açúcar' -> 'oleos de acucar')."""
+    decomposto = unicodedata.normalize("NFKD", str(texto).lower())
+    return "".join(c for c in decomposto if not unicodedata.combining(c))
+
+
+def tokenizar(texto: str) -> list[str]:
+    """Tokens alfanuméricos sem acento, descartando stopwords."""
+    return [
+        t for t in re.findall(r"[a-z0-9]+", dobrar_acentos(texto)) if t not in STOPWORDS
+    ]
+
+
+class IndiceBusca:
+    """
+    Índice invertido em memória sobre as descrições dos produtos (HS4).
+
+    Cada documento é um código HS4 com todo o texto associado a ele (descrição do
+    ComexStat, cmdDesc do Comtrade e descrições das NCMs da posição). A busca
+    combina correspondência exata, por prefixo (vocabulário ordenado + bisect) e
+    aproximada (SequenceMatcher restrito a termos de tamanho parecido), ponderadas
+    por IDF, além de prefixo do próprio código numérico.
+    """
+
+    def __init__(self, documentos: dict):
+        self._postings = defaultdict(dict)  # termo -> {código: frequência}
+        self.codigos = sorted(documentos)
+
+        for codigo, texto in documentos.items():
+            for termo in tokenizar(texto):
+                frequencias = self._postings[termo]
+                frequencias[codigo] = frequencias.get(codigo, 0) + 1
+
+        n_documentos = max(len(documentos), 1)
+        self._idf = {
+            termo: log(1 + n_documentos / len(docs))
+            for termo, docs in self._postings.items()
+        }
+        self._vocabulario = sorted(self._postings)
+
+        # Termos agrupados pela inicial, para limitar a busca aproximada
+        self._por_inicial = defaultdict(list)
+        for termo in self._vocabulario:
+            self._por_inicial[termo[0]].append(termo)
+
+    # --- EXPANSÃO DE TERMOS DA CONSULTA ---
+
+    def _termos_prefixo(self, termo: str) -> list[str]:
+        inicio = bisect_left(self._vocabulario, termo)
+        encontrados = []
+        for candidato in self._vocabulario[inicio : inicio + MAX_EXPANSOES_PREFIXO]:
+            if not candidato.startswith(termo):
+                break
+            encontrados.append(candidato)
+        return encontrados
+
+    def _termos_aproximados(self, termo: str) -> list[tuple[str, float]]:
+        encontrados = []
+        for candidato in self._por_inicial.get(termo[0], ()):
+            if abs(len(candidato) - len(termo)) > 2:
+                continue
+            similaridade = SequenceMatcher(None, termo, candidato).ratio()
+            if similaridade >= SIMILARIDADE_MINIMA:
+                encontrados.append((candidato, similaridade))
+        return encontrados
+
+    def _pontuar_termo(self, termo: str) -> dict:
+        """Melhor pontuação de cada código para um termo da consulta."""
+        pontos = {}
+
+        def acumular(termo_indice, peso):
+            escore = peso * self._idf[termo_indice]
+            for codigo in self._postings[termo_indice]:
+                if escore > pontos.get(codigo, 0):
+                    pontos[codigo] = escore
+
+        if termo in self._postings:
+            acumular(termo, PESO_EXATO)
+        for candidato in self._termos_prefixo(termo):
+            if candidato != termo:
+                acumular(candidato, PESO_PREFIXO)
+        if not pontos and len(termo) >= 4:
+            for candidato, similaridade in self._termos_aproximados(termo):
+                acumular(candidato, PESO_APROXIMADO * similaridade)
+
+        # Consulta numérica também casa com o prefixo do código (ex.: "87" ou "8703")
+        if termo.isdigit():
+            inicio = bisect_left(self.codigos, termo)
+            for codigo in self.codigos[inicio:]:
+                if not codigo.startswith(termo):
+                    break
+                pontos[codigo] = max(pontos.get(codigo, 0), PESO_CODIGO)
+        return pontos
+
+    def buscar(self, consulta: str, limite: int | None = 200) -> list[tuple[str, float]]:
+        """
+        Retorna pares (código, pontuação) em ordem de relevância. Códigos que casam
+        com todos os termos da consulta vêm antes dos que casam só com parte deles.
+        """
+        termos = tokenizar(consulta)
+        if not termos:
+            return []
+
+        total = defaultdict(float)
+        cobertura = defaultdict(int)
+        for termo in termos:
+            for codigo, escore in self._pontuar_termo(termo).items():
+                total[codigo] += escore
+                cobertura[codigo] += 1
+
+        ranking = sorted(total, key=lambda c: (-cobertura[c], -total[c], c))
+        if limite is not None:
+            ranking = ranking[:limite]
+        return [(codigo, total[codigo]) for codigo in ranking]
+
+    def codigos_encontrados(self, consulta: str, limite: int | None = 200) -> list[str]:
+        """Apenas os códigos da busca, na ordem de relevância."""
+        return [codigo for codigo, _ in self.buscar(consulta, limite)]
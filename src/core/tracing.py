@@ -0,0 +1,403 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+import pandas as pd
+import polars as pl
+
+# Etapas instrumentadas (cores e agrupamento no painel de depuração)
+ETAPAS = ("carga", "analise", "render")
+
+# Rerun sendo rastreado no contexto atual (None: instrumentação desligada, custo ~zero)
+_rerun_atual = contextvars.ContextVar("rerun_rastreado", default=None)
+
+
+# --- 1. SPANS E RERUNS ---
+
+
+class Span:
+    """
+    Trecho cronometrado de um rerun. Tempos em segundos, relativos ao início do
+    rerun; `tempo_funcao` é o tempo gasto dentro da função em cache (num acerto de
+    cache fica None: a diferença para `duracao` é o custo de hash/cópia do cache).
+    """
+
+    __slots__ = (
+        "nome",
+        "etapa",
+        "inicio",
+        "duracao",
+        "profundidade",
+        "linhas_entrada",
+        "linhas_saida",
+        "bytes_alocados",
+        "cache",
+        "tempo_funcao",
+        "_pico",
+    )
+
+    def __init__(self, nome, etapa, inicio, profundidade, linhas_entrada=None, cache=None):
+        self.nome = nome
+        self.etapa = etapa
+        self.inicio = inicio
+        self.duracao = None
+        self.profundidade = profundidade
+        self.linhas_entrada = linhas_entrada
+        self.linhas_saida = None
+        self.bytes_alocados = None
+        self.cache = cache
+        self.tempo_funcao = None
+        self._pico = 0
+
+    def como_dict(self):
+        return {nome: getattr(self, nome) for nome in self.__slots__ if nome != "_pico"}
+
+
+class Rerun:
+    """Spans de uma execução do script (ou de um fragmento), em ordem de término."""
+
+    def __init__(self, rotulo, alocacoes=False):
+        self.rotulo = rotulo
+        self.quando = time.time()
+        self.alocacoes = alocacoes
+        self.spans = []
+        self.duracao = None
+        self._inicio = time.perf_counter()
+        self._pilha = []
+
+    def agora(self):
+        return time.perf_counter() - self._inicio
+
+
+class _SpanAtivo:
+    """Context manager de um span; no __exit__ fecha tempo e alocações."""
+
+    __slots__ = ("_rerun", "_span", "_memoria_inicial")
+
+    def __init__(self, rerun, nome, etapa, linhas_entrada, cache):
+        self._rerun = rerun
+        self._span = Span(nome, etapa, 0.0, len(rerun._pilha), linhas_entrada, cache)
+
+    def __enter__(self):
+        rerun, span = self._rerun, self._span
+        if rerun.alocacoes:
+            # O pico do tracemalloc é global: guarda o do pai antes de zerá-lo
+            atual, pico = tracemalloc.get_traced_memory()
+            if rerun._pilha:
+                pai = rerun._pilha[-1]
+                pai._pico = max(pai._pico, pico)
+            tracemalloc.reset_peak()
+            self._memoria_inicial = atual
+        rerun._pilha.append(span)
+        span.inicio = rerun.agora()
+        return span
+
+    def __exit__(self, *_excecao):
+        rerun, span = self._rerun, self._span
+        span.duracao = rerun.agora() - span.inicio
+        rerun._pilha.pop()
+        if rerun.alocacoes:
+            pico = max(span._pico, tracemalloc.get_traced_memory()[1])
+            span.bytes_alocados = max(0, pico - self._memoria_inicial)
+            if rerun._pilha:
+                pai = rerun._pilha[-1]
+                pai._pico = max(pai._pico, pico)
+        rerun.spans.append(span)
+        return False
+
+
+class _SpanNulo:
+    """Span usado quando não há rerun rastreado: aceita atribuições e não mede nada."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_excecao):
+        return False
+
+    def __setattr__(self, _nome, _valor):
+        pass
+
+
+_NULO = _SpanNulo()
+
+
+def span(nome, etapa="analise", linhas_entrada=None, cache=None):
+    """
+    Context manager que mede um trecho do rerun atual. Devolve o Span, em que o
+    chamador pode preencher linhas_saida. Sem rerun rastreado, não faz nada.
+    """
+    rerun = _rerun_atual.get()
+    if rerun is None:
+        return _NULO
+    return _SpanAtivo(rerun, nome, etapa, linhas_entrada, cache)
+
+
+def rastreando():
+    return _rerun_atual.get() is not None
+
+
+# --- 2. DECORADORES ---
+
+
+def contar_linhas(valor):
+    """Linhas de um resultado (DataFrame, ou o primeiro DataFrame de uma tupla)."""
+    if isinstance(valor, (pd.DataFrame, pd.Series, pl.DataFrame)):
+        return len(valor)
+    if isinstance(valor, tuple):
+        for item in valor:
+            if isinstance(item, (pd.DataFrame, pl.DataFrame)):
+                return len(item)
+    return None
+
+
+def _linhas_argumentos(args, kwargs):
+    linhas = [
+        len(valor)
+        for valor in (*args, *kwargs.values())
+        if isinstance(valor, (pd.DataFrame, pl.DataFrame))
+    ]
+    return sum(linhas) if linhas else None
+
+
+def rastrear(etapa="analise", nome=None):
+    """Decorador: um span por chamada, com linhas de entrada (DataFrames) e de saída."""
+
+    def decorar(func):
+        rotulo = nome or func.__name__
+
+        @functools.wraps(func)
+        def chamada(*args, **kwargs):
+            if _rerun_atual.get() is None:
+                return func(*args, **kwargs)
+            with span(rotulo, etapa, _linhas_argumentos(args, kwargs)) as atual:
+                resultado = func(*args, **kwargs)
+                atual.linhas_saida = contar_linhas(resultado)
+            return resultado
+
+        return chamada
+
+    return decorar
+
+
+def rastrear_cache(decorador_cache, etapa="analise", nome=None):
+    """
+    Decorador para funções em cache (st.cache_data, cache_dados, ...): o span cobre a
+    chamada ao cache e registra acerto ("hit") ou execução ("miss"), com o tempo
+    gasto dentro da função. Uso:
+
+        @rastrear_cache(st.cache_data(show_spinner=False), etapa="render")
+        def preparar(...): ...
+    """
+
+    def decorar(func):
+        rotulo = nome or func.__name__
+
+        @functools.wraps(func)
+        def executar(*args, **kwargs):
+            rerun = _rerun_atual.get()
+            if rerun is None or not rerun._pilha:
+                return func(*args, **kwargs)
+            externo = rerun._pilha[-1]
+            externo.cache = "miss"
+            inicio = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                externo.tempo_funcao = time.perf_counter() - inicio
+
+        em_cache = decorador_cache(executar)
+
+        @functools.wraps(func)
+        def chamada(*args, **kwargs):
+            if _rerun_atual.get() is None:
+                return em_cache(*args, **kwargs)
+            with span(rotulo, etapa, _linhas_argumentos(args, kwargs), cache="hit") as atual:
+                resultado = em_cache(*args, **kwargs)
+                atual.linhas_saida = contar_linhas(resultado)
+            return resultado
+
+        if hasattr(em_cache, "clear"):
+            chamada.clear = em_cache.clear
+        return chamada
+
+    return decorar
+
+
+# --- 3. RASTREADOR (ÚLTIMOS RERUNS) ---
+
+# O tracemalloc é global ao processo e compartilhado entre as sessões: conta-se
+# quantos rastreadores o usam, e ele só é desligado quando o último o solta e se
+# foi ligado aqui (não interrompe quem já o usava, ex: benchmarks/medicao.py)
+_tracemalloc = {"usuarios": 0, "ligado_aqui": False}
+_trava_tracemalloc = threading.Lock()
+
+
+class Rastreador:
+    """
+    Guarda os últimos `max_reruns` reruns rastreados. No app há um por sessão
+    (st.session_state); `alocacoes=True` liga o tracemalloc (mais lento).
+    """
+
+    def __init__(self, max_reruns=20, alocacoes=False):
+        self.reruns = deque(maxlen=max_reruns)
+        self.alocacoes = alocacoes
+        self._usa_tracemalloc = False
+
+    def _segurar_tracemalloc(self):
+        with _trava_tracemalloc:
+            if _tracemalloc["usuarios"] == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _tracemalloc["ligado_aqui"] = True
+            _tracemalloc["usuarios"] += 1
+        self._usa_tracemalloc = True
+
+    def _soltar_tracemalloc(self):
+        with _trava_tracemalloc:
+            _tracemalloc["usuarios"] -= 1
+            if _tracemalloc["usuarios"] == 0 and _tracemalloc["ligado_aqui"]:
+                tracemalloc.stop()
+                _tracemalloc["ligado_aqui"] = False
+        self._usa_tracemalloc = False
+
+    def __del__(self):
+        # Sessão encerrada com as alocações ligadas
+        if getattr(self, "_usa_tracemalloc", False):
+            self._soltar_tracemalloc()
+
+    def iniciar(self, rotulo):
+        """Começa a rastrear um rerun no contexto atual (a thread do script)."""
+        if self.alocacoes and not self._usa_tracemalloc:
+            self._segurar_tracemalloc()
+        elif not self.alocacoes and self._usa_tracemalloc:
+            self._soltar_tracemalloc()
+        rerun = Rerun(rotulo, alocacoes=self.alocacoes)
+        self.reruns.append(rerun)
+        _rerun_atual.set(rerun)
+        return rerun
+
+    def finalizar(self, rerun):
+        rerun.duracao = rerun.agora()
+        if _rerun_atual.get() is rerun:
+            _rerun_atual.set(None)
+
+    def rerun(self, rotulo):
+        """Context manager equivalente a iniciar/finalizar."""
+        return _RerunAtivo(self, rotulo)
+
+
+class _RerunAtivo:
+    def __init__(self, rastreador, rotulo):
+        self._rastreador = rastreador
+        self._rotulo = rotulo
+
+    def __enter__(self):
+        self._anterior = _rerun_atual.get()
+        self._rerun = self._rastreador.iniciar(self._rotulo)
+        return self._rerun
+
+    def __exit__(self, *_excecao):
+        self._rastreador.finalizar(self._rerun)
+        _rerun_atual.set(self._anterior)
+        return False
+
+
+# --- 4. RESUMO E EXPORTAÇÃO (CHROME TRACE) ---
+
+
+def resumo_spans(rerun):
+    """
+    Uma linha por nome de span: chamadas, tempo total e próprio (sem os filhos),
+    linhas, acertos/execuções de cache e pico de alocação.
+    """
+    colunas = [
+        "nome",
+        "etapa",
+        "chamadas",
+        "total_ms",
+        "proprio_ms",
+        "linhas_entrada",
+        "linhas_saida",
+        "cache_hit",
+        "cache_miss",
+        "alocado_mb",
+    ]
+    if not rerun.spans:
+        return pd.DataFrame(columns=colunas)
+
+    df = pd.DataFrame([s.como_dict() for s in rerun.spans])
+    # Tempo dos filhos diretos: spans da profundidade seguinte contidos no intervalo
+    filhos = [0.0] * len(df)
+    ordenados = sorted(range(len(df)), key=lambda i: (df["inicio"].iat[i], df["profundidade"].iat[i]))
+    pilha = []
+    for i in ordenados:
+        while pilha and df["profundidade"].iat[pilha[-1]] >= df["profundidade"].iat[i]:
+            pilha.pop()
+        if pilha:
+            filhos[pilha[-1]] += df["duracao"].iat[i]
+        pilha.append(i)
+    df["proprio"] = df["duracao"] - pd.Series(filhos, index=df.index)
+
+    resumo = df.groupby(["nome", "etapa"], sort=False).agg(
+        chamadas=("duracao", "size"),
+        total=("duracao", "sum"),
+        proprio=("proprio", "sum"),
+        linhas_entrada=("linhas_entrada", "max"),
+        linhas_saida=("linhas_saida", "max"),
+        cache_hit=("cache", lambda c: int((c == "hit").sum())),
+        cache_miss=("cache", lambda c: int((c == "miss").sum())),
+        alocado=("bytes_alocados", "max"),
+    )
+    resumo["total_ms"] = resumo.pop("total") * 1000
+    resumo["proprio_ms"] = resumo.pop("proprio") * 1000
+    resumo["alocado_mb"] = resumo.pop("alocado") / 2**20
+    return resumo.reset_index()[colunas].sort_values("total_ms", ascending=False)
+
+
+def chrome_trace(reruns):
+    """
+    Reruns no formato Trace Event (JSON) do chrome://tracing / Perfetto: um "thread"
+    por rerun, eventos completos ("X") com tempos em microssegundos.
+    """
+    eventos = []
+    pid = os.getpid()
+    for tid, rerun in enumerate(reruns, start=1):
+        base_us = rerun.quando * 1e6
+        eventos.append(
+            {"ph": "M", "name": "thread_name", "pid": pid, "tid": tid, "args": {"name": rerun.rotulo}}
+        )
+        for s in rerun.spans:
+            argumentos = {
+                chave: valor
+                for chave, valor in s.como_dict().items()
+                if chave not in ("nome", "etapa", "inicio", "duracao", "profundidade")
+                and valor is not None
+            }
+            eventos.append(
+                {
+                    "name": s.nome,
+                    "cat": s.etapa,
+                    "ph": "X",
+                    "ts": round(base_us + s.inicio * 1e6, 1),
+                    "dur": round(s.duracao * 1e6, 1),
+                    "pid": pid,
+                    "tid": tid,
+                    "args": argumentos,
+                }
+            )
+    return {"traceEvents": eventos, "displayTimeUnit": "ms"}
+
+
+def exportar_chrome_trace(reruns, caminho):
+    """Grava os reruns em `caminho` (JSON do Chrome trace) e devolve o caminho."""
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        json.dump(chrome_trace(reruns), arquivo, ensure_ascii=False)
+    return caminho
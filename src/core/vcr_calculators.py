@@ -1,42 +1,56 @@
 import pandas as pd
 import numpy as np
-import streamlit as st
 
+from .runtime import cache_dados
 
-@st.cache_data
-def calcular_vcr_ceara_brasil(df_comexstat):
-    """Calcula o VCR (Vantagem Comparativa Revelada) do Ceará vs. Brasil."""
-    df_comexstat_valid = df_comexstat[df_comexstat["metricFOB"] > 0].copy()
+
+@cache_dados
+def calcular_vcr_estado_brasil(df_comexstat, estado="Ceará", ano=None):
+    """
+    Calcula o VCR (Vantagem Comparativa Revelada) de um estado vs. Brasil.
+    Com `ano`, numerador e denominador ficam restritos às exportações daquele ano.
+    """
+    validos = df_comexstat["metricFOB"] > 0
+    if ano is not None:
+        validos &= df_comexstat["year"] == ano
+    df_comexstat_valid = df_comexstat[validos].copy()
     df_comexstat_valid["headingCode"] = df_comexstat_valid["headingCode"].astype(str)
 
     X_total_brasil = df_comexstat_valid["metricFOB"].sum()
-    df_ceara = df_comexstat_valid[df_comexstat_valid["state"] == "Ceará"].copy()
-    X_total_ceara = df_ceara["metricFOB"].sum()
+    df_estado = df_comexstat_valid[df_comexstat_valid["state"] == estado]
+    X_total_estado = df_estado["metricFOB"].sum()
 
-    if X_total_brasil == 0 or X_total_ceara == 0 or df_comexstat_valid.empty:
-        return pd.DataFrame(columns=["headingCode", "VCR_Ceara_Brasil"])
+    if X_total_brasil == 0 or X_total_estado == 0 or df_comexstat_valid.empty:
+        return pd.DataFrame(columns=["headingCode", "VCR_Estado_Brasil"])
 
-    df_xi_ceara = df_ceara.groupby("headingCode")["metricFOB"].sum().reset_index()
-    df_xi_ceara = df_xi_ceara.rename(columns={"metricFOB": "Xi_Ceara"})
+    df_xi_estado = df_estado.groupby("headingCode")["metricFOB"].sum().reset_index()
+    df_xi_estado = df_xi_estado.rename(columns={"metricFOB": "Xi_Estado"})
 
     df_xi_brasil = (
         df_comexstat_valid.groupby("headingCode")["metricFOB"].sum().reset_index()
     )
     df_xi_brasil = df_xi_brasil.rename(columns={"metricFOB": "Xi_Brasil"})
 
-    df_vcr = df_xi_ceara.merge(df_xi_brasil, on="headingCode", how="outer").fillna(0)
+    df_vcr = df_xi_estado.merge(df_xi_brasil, on="headingCode", how="outer").fillna(0)
 
-    parcela_ceara = df_vcr["Xi_Ceara"] / X_total_ceara
+    parcela_estado = df_vcr["Xi_Estado"] / X_total_estado
     parcela_brasil = df_vcr["Xi_Brasil"] / X_total_brasil
 
-    df_vcr["VCR_Ceara_Brasil"] = np.where(
-        parcela_brasil > 0, parcela_ceara / parcela_brasil, 0
+    df_vcr["VCR_Estado_Brasil"] = np.where(
+        parcela_brasil > 0, parcela_estado / parcela_brasil, 0
     )
 
-    return df_vcr[["headingCode", "VCR_Ceara_Brasil"]]
+    return df_vcr[["headingCode", "VCR_Estado_Brasil"]]
+
+
+def calcular_vcr_ceara_brasil(df_comexstat):
+    """Calcula o VCR (Vantagem Comparativa Revelada) do Ceará vs. Brasil."""
+    return calcular_vcr_estado_brasil(df_comexstat, "Ceará").rename(
+        columns={"VCR_Estado_Brasil": "VCR_Ceara_Brasil"}
+    )
 
 
-@st.cache_data
+@cache_dados
 def calcular_vcr_dentro_selecao(df_comex_filtrado, df_comex_nacional):
     """
     Calcula o VCR local para o conjunto de estados selecionados,
@@ -51,10 +65,11 @@ def calcular_vcr_dentro_selecao(df_comex_filtrado, df_comex_nacional):
     selected_states = df_comex_filtrado["state"].unique()
 
     # 1. DEFINIÇÃO DA BASE DE COMPARAÇÃO
+    # (somente leitura: não há necessidade de copiar a base)
     if len(selected_states) == 1:
-        df_base_comparacao = df_comex_nacional.copy()
+        df_base_comparacao = df_comex_nacional
     else:
-        df_base_comparacao = df_comex_filtrado.copy()
+        df_base_comparacao = df_comex_filtrado
 
     X_total_comparacao = df_base_comparacao["metricFOB"].sum()
 
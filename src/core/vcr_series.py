@@ -0,0 +1,169 @@
+import numpy as np
+import pandas as pd
+
+from .hs_hierarchy import normalizar_codigo_hs
+from .runtime import cache_dados
+
+# Janela (em anos) da VCR móvel: FOB somado nos últimos N anos antes da razão
+JANELA_PADRAO = 3
+
+# Inclinação mínima da VCR (por ano) para classificar o produto em alta ou em queda
+LIMIAR_TENDENCIA = 0.05
+
+TENDENCIAS = ("Em alta", "Estável", "Em queda")
+
+
+# --- 1. CUBO ANO x LOCAL x PRODUTO ---
+
+
+def _cubo_fob(df, local, produto, valor, ano="year"):
+    """
+    FOB denso [ano, local, produto] numa única passada (factorize + bincount).
+    Os anos são posições ordenadas: anos ausentes no meio da série não viram zeros.
+    """
+    dados = df[[ano, local, produto, valor]].dropna()
+    dados = dados[dados[valor] > 0]
+    codigos_ano, anos = pd.factorize(dados[ano], sort=True)
+    codigos_local, locais = pd.factorize(dados[local], sort=True)
+    codigos_produto, produtos = pd.factorize(dados[produto], sort=True)
+
+    forma = (len(anos), len(locais), len(produtos))
+    plano = np.ravel_multi_index((codigos_ano, codigos_local, codigos_produto), forma)
+    fob = np.bincount(
+        plano, weights=dados[valor].to_numpy(dtype=float), minlength=int(np.prod(forma))
+    )
+    return np.asarray(anos), np.asarray(locais), np.asarray(produtos), fob.reshape(forma)
+
+
+def _dividir(numerador, denominador):
+    return np.divide(
+        numerador,
+        denominador,
+        out=np.zeros(np.broadcast_shapes(numerador.shape, denominador.shape)),
+        where=denominador > 0,
+    )
+
+
+def _vcr(fob):
+    """VCR de Balassa de cada [ano, local, produto] contra o total dos locais no ano."""
+    parcela_local = _dividir(fob, fob.sum(axis=2, keepdims=True))
+    total_produto = fob.sum(axis=1, keepdims=True)
+    parcela_produto = _dividir(total_produto, total_produto.sum(axis=2, keepdims=True))
+    return _dividir(parcela_local, parcela_produto)
+
+
+def _soma_movel(fob, anos, janela):
+    """
+    Soma nos últimos `janela` anos-calendário (eixo 0); nos primeiros, a soma
+    parcial. O cubo tem só os anos observados: para a soma, ele é levado à faixa
+    contínua de anos, com FOB zero nos ausentes, e volta aos anos observados.
+    """
+    if len(anos) == 0:
+        return fob.copy()
+    posicoes = (anos - anos[0]).astype(int)
+    continuo = np.zeros((posicoes[-1] + 1,) + fob.shape[1:])
+    continuo[posicoes] = fob
+    acumulado = np.cumsum(continuo, axis=0)
+    soma = acumulado.copy()
+    soma[janela:] -= acumulado[:-janela]
+    return soma[posicoes]
+
+
+# --- 2. TENDÊNCIA (INCLINAÇÃO E CAGR, VETORIZADOS) ---
+
+
+def _inclinacao(valores, anos):
+    """Inclinação de mínimos quadrados de `valores` contra os anos (eixo 0)."""
+    if len(anos) < 2:
+        return np.full(valores.shape[1:], np.nan)
+    x = anos.astype(float) - anos.mean()
+    centrado = valores - valores.mean(axis=0)
+    return np.tensordot(x, centrado, axes=1) / (x @ x)
+
+
+def _cagr(fob, anos):
+    """Crescimento anual composto do FOB entre o primeiro e o último ano."""
+    if len(anos) < 2:
+        return np.full(fob.shape[1:], np.nan)
+    inicial, final = fob[0], fob[-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        razao = np.where(inicial > 0, final / inicial, np.nan)
+        return razao ** (1.0 / (anos[-1] - anos[0])) - 1.0
+
+
+def classificar_tendencia(inclinacao, limiar=LIMIAR_TENDENCIA):
+    """Em alta / Estável / Em queda pela inclinação anual da VCR (NaN fica Estável)."""
+    return np.select(
+        [inclinacao > limiar, inclinacao < -limiar],
+        [TENDENCIAS[0], TENDENCIAS[2]],
+        TENDENCIAS[1],
+    )
+
+
+# --- 3. SÉRIES E TENDÊNCIAS POR LOCAL x PRODUTO ---
+
+
+def calcular_serie_vcr(df, local, produto, valor, ano="year", janela=JANELA_PADRAO):
+    """
+    VCR anual, VCR da janela móvel e métricas de tendência de todos os pares
+    local x produto numa passada vetorizada sobre o cubo [ano, local, produto].
+
+    Retorna (df_anual, df_tendencia):
+    - df_anual: [ano, local, produto, FOB, VCR, VCR_Janela], só pares com FOB no ano
+      ou na janela;
+    - df_tendencia: [local, produto, FOB_Total, VCR_Inicial, VCR_Final, VCR_Media,
+      VCR_Janela_Final, Inclinacao_VCR, CAGR_FOB, Tendencia, Serie_VCR], com a série
+      anual em lista (pronta para st.column_config.LineChartColumn).
+    """
+    anos, locais, produtos, fob = _cubo_fob(df, local, produto, valor, ano)
+    vcr = _vcr(fob)
+    # VCR do FOB acumulado na janela; NaN enquanto a janela não está completa
+    vcr_janela = _vcr(_soma_movel(fob, anos, janela))
+    if len(anos):
+        vcr_janela[anos < anos[0] + janela - 1] = np.nan
+
+    indice = pd.MultiIndex.from_product([anos, locais, produtos], names=[ano, local, produto])
+    df_anual = pd.DataFrame(
+        {"FOB": fob.ravel(), "VCR": vcr.ravel(), "VCR_Janela": vcr_janela.ravel()},
+        index=indice,
+    )
+    df_anual = df_anual[(df_anual["FOB"] > 0) | (df_anual["VCR_Janela"] > 0)].reset_index()
+
+    fob_total = fob.sum(axis=0)
+    inclinacao = _inclinacao(vcr, anos)
+    df_tendencia = pd.DataFrame(
+        {
+            "FOB_Total": fob_total.ravel(),
+            "VCR_Inicial": vcr[0].ravel(),
+            "VCR_Final": vcr[-1].ravel(),
+            "VCR_Media": vcr.mean(axis=0).ravel(),
+            "VCR_Janela_Final": vcr_janela[-1].ravel(),
+            "Inclinacao_VCR": inclinacao.ravel(),
+            "CAGR_FOB": _cagr(fob, anos).ravel(),
+            "Tendencia": classificar_tendencia(inclinacao).ravel(),
+            "Serie_VCR": list(vcr.reshape(len(anos), -1).T.round(4)),
+        },
+        index=pd.MultiIndex.from_product([locais, produtos], names=[local, produto]),
+    )
+    df_tendencia = df_tendencia[df_tendencia["FOB_Total"] > 0].reset_index()
+    df_tendencia["Serie_VCR"] = df_tendencia["Serie_VCR"].map(list)
+    return df_anual, df_tendencia
+
+
+@cache_dados
+def serie_vcr_estados(df_comexstat, janela=JANELA_PADRAO):
+    """VCR anual, móvel e tendências de cada estado x HS4 do ComexStat (base: Brasil)."""
+    df = df_comexstat[["year", "state", "headingCode", "metricFOB"]].copy()
+    df["headingCode"] = normalizar_codigo_hs(df["headingCode"], 4)
+    return calcular_serie_vcr(df, "state", "headingCode", "metricFOB", janela=janela)
+
+
+@cache_dados
+def serie_vcr_paises(df_harvard, janela=JANELA_PADRAO):
+    """VCR anual, móvel e tendências de cada país x HS4 do Harvard (base: mundo)."""
+    df = df_harvard[["year", "country_iso3_code", "product_hs92_code", "export_value"]]
+    df = df.rename(columns={"product_hs92_code": "headingCode"})
+    df["headingCode"] = normalizar_codigo_hs(df["headingCode"], 4)
+    return calcular_serie_vcr(
+        df, "country_iso3_code", "headingCode", "export_value", janela=janela
+    )
@@ -2,6 +2,8 @@ import polars as pl
 import requests, os
 from typing import Dict, List, Optional, Any
 
+from data import telemetry
+
 
 class Comexstat:
     """
@@ -18,6 +20,8 @@ class Comexstat:
             "certificate",
             "mdic-gov-br.pem",
         )
+        # Sessão com novas tentativas e métricas por requisição (data/telemetry.py)
+        self._sessao = telemetry.sessao()
 
     def _make_request(
         self,
@@ -28,22 +32,25 @@ class Comexstat:
     ) -> Optional[requests.Response]:
         """
         Método utilitário privado para fazer requisições e tratar exceções.
+        Cada chamada gera uma linha de telemetria (ou compõe a do chamador).
         """
         url = f"{self.BASE_URL}{endpoint}"
-        try:
-            if method.upper() == "GET":
-                response = requests.get(url, params=params, verify=self.CERT_PATH)
-            elif method.upper() == "POST":
-                response = requests.post(
-                    url, json=json_body, params=params, verify=self.CERT_PATH
-                )
-            else:
-                raise ValueError("Método HTTP não suportado.")
-            response.raise_for_status()
-            return response
-        except requests.exceptions.RequestException as e:
-            print(f"Erro na requisição para '{url}': {e}")
-            return None
+        with telemetry.medir("comexstat", endpoint):
+            try:
+                if method.upper() == "GET":
+                    response = self._sessao.get(url, params=params, verify=self.CERT_PATH)
+                elif method.upper() == "POST":
+                    response = self._sessao.post(
+                        url, json=json_body, params=params, verify=self.CERT_PATH
+                    )
+                else:
+                    raise ValueError("Método HTTP não suportado.")
+                response.raise_for_status()
+                return response
+            except requests.exceptions.RequestException as e:
+                telemetry.registrar_erro(e)
+                print(f"Erro na requisição para '{url}': {e}")
+                return None
 
     def get_last_updated_date(
         self, data_type: str = "general"
@@ -122,14 +129,23 @@ class Comexstat:
             "metrics": metrics or [],
         }
         params = {"language": language}
-        response = self._make_request("POST", endpoint, json_body=body, params=params)
-
-        if response and response.json().get("data"):
-            # A chave 'list' existe apenas para 'cities' e 'general', mas não para tabelas auxiliares
-            data = response.json()["data"].get("list", response.json()["data"])
-            return pl.DataFrame(data)
-
-        return pl.DataFrame()
+        fatia = " ".join(
+            [flow, f"{period_from}..{period_to}", ",".join(details or [])]
+            + [f"{f['filter']}={f['values']}" for f in filters or []]
+        )
+        with telemetry.medir("comexstat", endpoint, fatia=fatia) as medicao:
+            response = self._make_request(
+                "POST", endpoint, json_body=body, params=params
+            )
+            dados = response.json().get("data") if response else None
+
+            if dados:
+                # A chave 'list' existe apenas para 'cities' e 'general', mas não para tabelas auxiliares
+                df = pl.DataFrame(dados.get("list", dados))
+            else:
+                df = pl.DataFrame()
+            medicao["linhas"] = df.height
+            return df
 
     def get_auxiliary_table(
         self,
@@ -151,10 +167,11 @@ class Comexstat:
         return pl.DataFrame(response.json()["data"]) if response else None
 
     def fetch_comexstat_by_city(
-        self, year: int, state_code: int
+        self, year: int, state_code: int, month_detail: bool = False
     ) -> Optional[pl.DataFrame]:
         """
-        Extrai dados de exportação do ComexStat por município para um estado e ano.
+        Extrai dados de exportação do ComexStat por município e posição HS4 para
+        um estado e ano (opcionalmente mês a mês).
         """
         return self.query_comexstat_data(
             flow="export",
@@ -162,8 +179,9 @@ class Comexstat:
             period_to=f"{year}-12",
             data_type="cities",
             filters=[{"filter": "state", "values": [state_code]}],
-            details=["city"],
+            details=["city", "heading"],
             metrics=["metricFOB", "metricKG", "metricCIF"],
+            month_detail=month_detail,
         )
 
 
@@ -1,9 +1,12 @@
 from typing import TypedDict, Any, Dict
 import comtradeapicall as comtrade
 import polars as pd
+import requests
 import time
 import os
 
+from data import telemetry
+
 
 class _comtrade_filters(TypedDict, total=False):
     typeCode: str
@@ -70,27 +73,57 @@ class Comtrade:
         )
 
         final_filters = {**default_filters, **filters}
+        fatia = " ".join(
+            str(final_filters[k])
+            for k in ("period", "flowCode", "partnerCode", "cmdCode")
+            if final_filters.get(k) is not None
+        )
 
-        try:
-            print("🔎 Fetching data from UN Comtrade API...")
-            df = comtrade.getFinalData(
-                subscription_key=self.comtrade_key, **final_filters
-            )
+        # comtradeapicall faz o HTTP por conta própria: só a latência total (com as
+        # novas tentativas) entra na telemetria, sem a divisão conexão/TTFB/transferência
+        with telemetry.medir(
+            "comtrade",
+            "getFinalData",
+            fatia=fatia,
+            conexao_s=None,
+            ttfb_s=None,
+            transferencia_s=None,
+            bytes=None,
+        ) as medicao:
+            try:
+                print("🔎 Fetching data from UN Comtrade API...")
+                df = self._get_final_data(medicao, final_filters)
 
-            if df is None or df.empty:
-                print("⚠️ No data found for the given filters.")
-                return pd.DataFrame()
+                if df is None or df.empty:
+                    print("⚠️ No data found for the given filters.")
+                    medicao["linhas"] = 0
+                    return pd.DataFrame()
 
-            print(f"✅ Retrieved {len(df)} rows.")
+                print(f"✅ Retrieved {len(df)} rows.")
+                medicao["linhas"] = len(df)
 
-            if save_csv:
-                timestamp = time.strftime("%Y%m%d-%H%M%S")
-                file_name = f"comtrade_{timestamp}.csv"
-                df.to_csv(file_name, index=False, encoding="latin1")
-                print(f"💾 Data saved to '{file_name}'")
+                if save_csv:
+                    timestamp = time.strftime("%Y%m%d-%H%M%S")
+                    file_name = f"comtrade_{timestamp}.csv"
+                    df.to_csv(file_name, index=False, encoding="latin1")
+                    print(f"💾 Data saved to '{file_name}'")
 
-            return df
+                return df
 
-        except Exception as e:
-            print(f"❌ Error: {e}")
-            return pd.DataFrame()
+            except Exception as e:
+                telemetry.registrar_erro(e)
+                print(f"❌ Error: {e}")
+                return pd.DataFrame()
+
+    def _get_final_data(self, medicao, final_filters):
+        """getFinalData com novas tentativas (backoff exponencial) em falhas de rede."""
+        for tentativa in range(telemetry.TENTATIVAS_PADRAO + 1):
+            medicao["tentativas"] = tentativa + 1
+            try:
+                return comtrade.getFinalData(
+                    subscription_key=self.comtrade_key, **final_filters
+                )
+            except (requests.RequestException, OSError):
+                if tentativa == telemetry.TENTATIVAS_PADRAO:
+                    raise
+                time.sleep(telemetry.BACKOFF_PADRAO * 2**tentativa)
@@ -1,19 +1,45 @@
 import pandas as pd
-from core.vcr_calculators import calcular_vcr_ceara_brasil
+from core.analytics import carregar_tabela_ncm_xls, classificar_cenarios_vcr
+from core.config import VERSOES_HS_FONTES
+from core.cnae_allocation import ql_emprego_hs4
+from core.data_loader import NCM_CNAE_PATH
+from core.tracing import rastrear
+from core.vcr_calculators import calcular_vcr_estado_brasil
 from core.metric_fetchers import obter_vcr_brasil_mundo, obter_pci_e_distancia
 from core.normalization import normalizar_vcr
+from core.product_space import FONTES_DISTANCIA, metricas_espaco_produto
 from core.priority_index import (
     calcular_vcr_ajustado,
     calcular_indice_prioridade_ajustado,
 )
 
 
-def process_comparison_data(comexstat_df, harvard_df, pesos_dict):
+@rastrear("analise")
+def consolidar_metricas(
+    comexstat_df,
+    harvard_df,
+    estado="Ceará",
+    ano=None,
+    fonte_distancia="harvard",
+    df_emprego=None,
+    df_ql_emprego=None,
+):
     """
-    Processa todos os DataFrames para consolidar métricas, normalizá-las
-    e calcular o Índice de Prioridade Ajustado.
-    Responsabilidade Única: Pipeline de Processamento de Dados.
+    Consolida VCR estadual, VCR país, PCI e distância por HS4, normaliza as métricas
+    e classifica os cenários. Não depende dos pesos: pode ser reaproveitada para
+    vários presets. `ano` restringe o ComexStat e, se existir no Harvard, também ele.
+    Com fonte_distancia="estado", a distância do Harvard (média mundial) é trocada
+    pela distância do próprio estado no espaço-produto, e entram Densidade e COG.
+    Com df_emprego (UF x CNAE, data.emprego.ler_emprego), o VCR Ajustado usa o
+    quociente locacional do emprego levado ao HS4 pela ponte NCM <-> CNAE.
+    df_ql_emprego (ql_emprego_hs4 já calculado para o estado) dispensa df_emprego
+    e a leitura da tabela NCM x CNAE.
     """
+    if fonte_distancia not in FONTES_DISTANCIA:
+        raise ValueError(
+            f"fonte_distancia deve ser uma de {FONTES_DISTANCIA}, não {fonte_distancia!r}"
+        )
+    harvard_completo = harvard_df
 
     # 1. Obter Tabela de Referência
     df_referencia = comexstat_df[["headingCode", "heading"]].drop_duplicates()
@@ -25,23 +51,69 @@ def process_comparison_data(comexstat_df, harvard_df, pesos_dict):
         & (df_referencia["headingCode"].str.len() > 1)
     ]
 
+    if ano is not None and (harvard_df["year"] == ano).any():
+        harvard_df = harvard_df[harvard_df["year"] == ano]
+
     # 2. Cálculo e obtenção das métricas
-    df_vcr_ce_br = calcular_vcr_ceara_brasil(comexstat_df)
-    df_vcr_br_md = obter_vcr_brasil_mundo(harvard_df)
-    df_pci_dist = obter_pci_e_distancia(harvard_df)
+    # (a coluna mantém o nome histórico do .ods, mas vale para qualquer estado)
+    df_vcr_ce_br = calcular_vcr_estado_brasil(comexstat_df, estado, ano).rename(
+        columns={"VCR_Estado_Brasil": "VCR_Ceara_Brasil"}
+    )
+    # Harvard (HS92) convertido para a versão do SH do ComexStat antes do join
+    df_vcr_br_md = obter_vcr_brasil_mundo(harvard_df, VERSOES_HS_FONTES["comexstat"])
+    df_pci_dist = obter_pci_e_distancia(harvard_df, VERSOES_HS_FONTES["comexstat"])
 
     # 3. Consolidação dos DataFrames
     df_final = df_referencia.merge(df_vcr_ce_br, on="headingCode", how="left")
     df_final = df_final.merge(df_vcr_br_md, on="headingCode", how="left")
     df_final = df_final.merge(df_pci_dist, on="headingCode", how="left")
+    if fonte_distancia == "estado":
+        df_espaco = metricas_espaco_produto(comexstat_df, harvard_completo, estado, ano)
+        df_final = df_final.drop(columns="Distancia_Parceiros").merge(
+            df_espaco.rename(columns={"Distancia_Estado": "Distancia_Parceiros"}),
+            on="headingCode",
+            how="left",
+        )
 
-    # 4. Normalização e VCR Ajustado
+    # 4. Normalização, VCR Ajustado e Cenários
     df_final = normalizar_vcr(df_final, "VCR_Ceara_Brasil")
     df_final = normalizar_vcr(df_final, "VCR_Brasil_Mundo")
     df_final = normalizar_vcr(df_final, "PCI")
     df_final = normalizar_vcr(df_final, "Distancia_Parceiros")
-    df_final = calcular_vcr_ajustado(df_final)
+    if df_ql_emprego is None and df_emprego is not None:
+        df_ncm = carregar_tabela_ncm_xls(NCM_CNAE_PATH)
+        if df_ncm is not None:
+            df_ql_emprego = ql_emprego_hs4(df_emprego, df_ncm, estado)
+    df_final = calcular_vcr_ajustado(df_final, df_ql_emprego)
+    df_final = classificar_cenarios_vcr(df_final)
+
+    return df_final
+
+
+@rastrear("analise")
+def process_comparison_data(
+    comexstat_df,
+    harvard_df,
+    pesos_dict,
+    estado="Ceará",
+    ano=None,
+    fonte_distancia="harvard",
+    df_emprego=None,
+):
+    """
+    Processa todos os DataFrames para consolidar métricas, normalizá-las
+    e calcular o Índice de Prioridade Ajustado.
+    Responsabilidade Única: Pipeline de Processamento de Dados.
+    """
+    df_final = consolidar_metricas(
+        comexstat_df, harvard_df, estado, ano, fonte_distancia, df_emprego
+    )
+    return calcular_ranking(df_final, pesos_dict)
+
 
+@rastrear("analise")
+def calcular_ranking(df_final, pesos_dict):
+    """Índice de Prioridade Ajustado e colunas de saída a partir das métricas consolidadas."""
     # 5. Cálculo do Índice de Prioridade Ajustado
     df_final = calcular_indice_prioridade_ajustado(df_final, pesos_dict)
 
@@ -50,15 +122,15 @@ def process_comparison_data(comexstat_df, harvard_df, pesos_dict):
         columns={
             "headingCode": "Código HS",
             "VCR_Ceara_Brasil": "VCR estadual (Bruto)",
-            "VCR_Ceara_Brasil_NORM": "VCR estadual normalizada",
+            "VCR_Ceara_Brasil_norm": "VCR estadual normalizada",
             "VCR_Brasil_Mundo": "VCR país (Bruto)",
-            "VCR_Brasil_Mundo_NORM": "VCR país normalizada",
+            "VCR_Brasil_Mundo_norm": "VCR país normalizada",
             "Distancia_Parceiros": "distância entre parceiros (Bruto)",
-            "Distancia_Parceiros_NORM": "distância entre parceiros normalizada",
+            "Distancia_Parceiros_norm": "distância entre parceiros normalizada",
             "PCI": "PCI (Bruto)",
-            "PCI_NORM": "PCI normalizado",
+            "PCI_norm": "PCI normalizado",
             "VCR_AJUSTADO": "VCR Ajustado (Bruto)",
-            "VCR_AJUSTADO_NORM": "VCR Ajustado normalizado",
+            "VCR_AJUSTADO_norm": "VCR Ajustado normalizado",
             "INDICE_PRIORIDADE_AJUSTADO": "Índice de Prioridade Ajustado",
         }
     )
@@ -4,6 +4,7 @@ import polars as pl  # Alteração aqui para maior clareza
 from pyDataverse.api import NativeApi
 
 from core.config import HARVARD_API_KEY, HARVARD_BASE_URL, HARVARD_DOI
+from data import telemetry
 
 
 def _get_api(api_token: str | None):
@@ -25,6 +26,26 @@ class HarvardDataverse:
     ):
         self.api_token = _get_api(api_token)
         self.BASE_URL = base_url
+        # Downloads com novas tentativas e métricas por requisição (data/telemetry.py)
+        self._sessao = telemetry.sessao()
+
+    def _get_dataset(self, api, doi: str):
+        """Metadados do dataset (pyDataverse; só a latência total entra na telemetria)."""
+        with telemetry.medir(
+            "dataverse",
+            "get_dataset",
+            fatia=doi,
+            conexao_s=None,
+            ttfb_s=None,
+            transferencia_s=None,
+            bytes=None,
+        ) as medicao:
+            response = api.get_dataset(doi)
+            medicao["status"] = response.status_code
+            medicao["tentativas"] = 1
+            if response.status_code != 200:
+                medicao["erro"] = f"HTTP {response.status_code}"
+            return response
 
     def _download_files(self, doi: str, target_filename: str | None = None):
         api = NativeApi(self.BASE_URL, self.api_token)
@@ -33,7 +54,7 @@ class HarvardDataverse:
         os.makedirs(download_dir, exist_ok=True)
         print(f"Os arquivos serão salvos em: {download_dir}")
 
-        response = api.get_dataset(doi)
+        response = self._get_dataset(api, doi)
         if response.status_code != 200:
             print(f"Erro ao acessar o dataset: {response.text}")
             return
@@ -57,12 +78,16 @@ class HarvardDataverse:
             try:
                 download_url = f"{self.BASE_URL}/api/access/datafile/{file_id}"
                 headers = {"X-Dataverse-key": self.api_token}
-                file_response = requests.get(download_url, headers=headers, stream=True)
-                file_response.raise_for_status()
+                # Erros que escapam do bloco ficam registrados na linha de telemetria
+                with telemetry.medir("dataverse", "/api/access/datafile", fatia=file_name):
+                    file_response = self._sessao.get(
+                        download_url, headers=headers, stream=True
+                    )
+                    file_response.raise_for_status()
 
-                with open(os.path.join(download_dir, file_name), "wb") as f:
-                    for chunk in file_response.iter_content(chunk_size=8192):
-                        f.write(chunk)
+                    with open(os.path.join(download_dir, file_name), "wb") as f:
+                        for chunk in file_response.iter_content(chunk_size=8192):
+                            f.write(chunk)
 
                 print(f"Download de {file_name} concluído com sucesso.")
 
@@ -87,7 +112,7 @@ class HarvardDataverse:
         api = NativeApi(self.BASE_URL, self.api_token)
         dataframes = {}
 
-        response = api.get_dataset(doi)
+        response = self._get_dataset(api, doi)
         if response.status_code != 200:
             print(f"Erro ao acessar o dataset: {response.text}")
             return {}
@@ -118,14 +143,20 @@ class HarvardDataverse:
             try:
                 download_url = f"{self.BASE_URL}/api/access/datafile/{file_id}"
                 headers = {"X-Dataverse-key": self.api_token}
-                file_response = requests.get(download_url, headers=headers, stream=True)
-                file_response.raise_for_status()
-
-                file_content = io.BytesIO(file_response.content)
-
-                df = pl.read_csv(
-                    file_content, **polars_reader_options
-                )  # Alteração crucial para Polars
+                with telemetry.medir(
+                    "dataverse", "/api/access/datafile", fatia=file_name
+                ) as medicao:
+                    file_response = self._sessao.get(
+                        download_url, headers=headers, stream=True
+                    )
+                    file_response.raise_for_status()
+
+                    file_content = io.BytesIO(file_response.content)
+
+                    df = pl.read_csv(
+                        file_content, **polars_reader_options
+                    )  # Alteração crucial para Polars
+                    medicao["linhas"] = df.height
                 dataframes[file_name] = df
                 print(f"DataFrame para {file_name} criado com sucesso.")
 
@@ -0,0 +1,201 @@
+import os
+import re
+import time
+import unicodedata
+
+import polars as pl
+
+from core import runtime
+from core.config import CACHE_DIR, UFS_IBGE
+from data import store
+
+# Store de emprego (RAIS): cada arquivo importado vira, por ano, uma fatia já
+# agregada em CNAE x município; as leituras somam as fatias do ano
+EMPREGO_DIR = os.path.join(CACHE_DIR, "emprego")
+FATIAS_DIR = os.path.join(EMPREGO_DIR, "fatias")
+
+# Arquivos aceitos: vínculos (uma linha por vínculo) ou estabelecimentos (uma
+# linha por estabelecimento, com a quantidade de vínculos ativos)
+TIPOS_ARQUIVO = ("vinculos", "estabelecimentos")
+
+# Nomes de coluna aceitos para cada campo (microdados da RAIS, extrações da Base
+# dos Dados e nomes do próprio projeto). A comparação ignora caixa, acentos e
+# pontuação, então cabeçalhos em latin-1 lidos como utf8-lossy também casam.
+ALIASES_COLUNAS = {
+    "year": ("Ano", "ano", "year"),
+    "cityCode": ("Município", "id_municipio", "cityCode"),
+    "cnae7": ("CNAE 2.0 Classe", "cnae_2", "cnae_2_classe", "cnae7"),
+    "ativo": ("Vínculo Ativo 31/12", "vinculo_ativo_3112"),
+    "vinculos": ("Qtd Vínculos Ativos", "quantidade_vinculos_ativos"),
+}
+
+COLUNAS_AGREGADAS = ["year", "state", "cityCode", "cnae7", "Empregos", "Estabelecimentos"]
+
+
+# --- 1. INGESTÃO EM STREAMING ---
+
+
+def _chave_coluna(nome):
+    """Só as letras e dígitos ASCII do nome, em minúsculas ("Município" -> "municpio")."""
+    return re.sub(r"[^a-z0-9]", "", nome.lower())
+
+
+def _mapear_colunas(colunas):
+    """Campo -> coluna do arquivo, pelos aliases (campos ausentes ficam de fora)."""
+    por_chave = {_chave_coluna(c): c for c in colunas}
+    mapa = {}
+    for campo, aliases in ALIASES_COLUNAS.items():
+        for alias in aliases:
+            # Sem acento ("Município" -> "Municipio") e sem o caractere perdido
+            # na leitura de latin-1 ("Munic�pio" -> "municpio")
+            sem_acento = unicodedata.normalize("NFKD", alias).encode("ascii", "ignore").decode()
+            for chave in (_chave_coluna(sem_acento), _chave_coluna(alias)):
+                if chave in por_chave:
+                    mapa[campo] = por_chave[chave]
+                    break
+            if campo in mapa:
+                break
+    return mapa
+
+
+def _abrir(caminho, separador):
+    """LazyFrame de um CSV (RAIS: ';', latin-1) ou Parquet, sem ler o arquivo."""
+    if caminho.endswith(".parquet"):
+        return pl.scan_parquet(caminho)
+    return pl.scan_csv(
+        caminho,
+        separator=separador,
+        encoding="utf8-lossy",
+        infer_schema=False,  # tudo como texto; os campos usados são convertidos abaixo
+    )
+
+
+def _digitos(coluna):
+    return pl.col(coluna).cast(pl.Utf8).str.replace_all(r"\D", "")
+
+
+def agregar_arquivo(caminho, tipo="vinculos", ano=None, separador=";"):
+    """
+    Agrega um arquivo RAIS em ano x município x CNAE (classe, 5 dígitos) com o
+    motor de streaming do polars: o arquivo é lido em blocos e só o resultado
+    agregado (no máximo municípios x classes CNAE) fica na memória.
+
+    - vinculos: Empregos = vínculos ativos em 31/12 (todos, sem a coluna de
+      situação); Estabelecimentos não se aplica (nulo);
+    - estabelecimentos: Empregos = soma dos vínculos ativos; Estabelecimentos =
+      nº de linhas.
+
+    `ano` é obrigatório quando o arquivo não traz a coluna de ano.
+    """
+    if tipo not in TIPOS_ARQUIVO:
+        raise ValueError(f"tipo deve ser um de {TIPOS_ARQUIVO}, não {tipo!r}")
+    lf = _abrir(caminho, separador)
+    mapa = _mapear_colunas(lf.collect_schema().names())
+    for campo in ("cityCode", "cnae7"):
+        if campo not in mapa:
+            runtime.falhar(f"'{caminho}': coluna de {campo} não encontrada")
+    if "year" not in mapa and ano is None:
+        runtime.falhar(f"'{caminho}': sem coluna de ano; informe o ano do arquivo")
+
+    chaves = [
+        pl.lit(ano, pl.Int64).alias("year")
+        if ano is not None
+        else _digitos(mapa["year"]).cast(pl.Int64).alias("year"),
+        # Código IBGE de 6 ou 7 dígitos: os dois primeiros são a UF
+        _digitos(mapa["cityCode"]).str.slice(0, 6).cast(pl.Int32).alias("cityCode"),
+        _digitos(mapa["cnae7"]).str.zfill(5).alias("cnae7"),
+    ]
+    if tipo == "vinculos":
+        empregos = (
+            _digitos(mapa["ativo"]).cast(pl.Int64).fill_null(0)
+            if "ativo" in mapa
+            else pl.lit(1, pl.Int64)
+        )
+        estabelecimentos = pl.lit(None, pl.Int64)
+    else:
+        if "vinculos" not in mapa:
+            runtime.falhar(f"'{caminho}': coluna de vínculos ativos não encontrada")
+        empregos = _digitos(mapa["vinculos"]).cast(pl.Int64).fill_null(0)
+        estabelecimentos = pl.len().cast(pl.Int64)
+
+    return (
+        lf.select(chaves + [empregos.alias("Empregos")])
+        .filter(pl.col("cityCode").is_not_null() & (pl.col("cnae7") != "00000"))
+        .group_by("year", "cityCode", "cnae7")
+        .agg(pl.col("Empregos").sum(), estabelecimentos.alias("Estabelecimentos"))
+        .with_columns(
+            state=(pl.col("cityCode") // 10_000).replace_strict(
+                UFS_IBGE, default=None, return_dtype=pl.Utf8
+            )
+        )
+        .select(COLUNAS_AGREGADAS)
+        .collect(engine="streaming")
+    )
+
+
+def importar_arquivos(caminhos, tipo="vinculos", ano=None, destino=FATIAS_DIR, separador=";"):
+    """
+    Agrega cada arquivo (ver agregar_arquivo) e grava uma fatia por ano com o nome
+    do arquivo de origem; reimportar o mesmo arquivo substitui a sua fatia.
+    Retorna um resumo (linhas agregadas por arquivo e ano, tempo).
+    """
+    inicio = time.perf_counter()
+    linhas = {}
+    for caminho in caminhos:
+        agregado = agregar_arquivo(caminho, tipo, ano, separador)
+        nome = f"{tipo}-" + os.path.basename(caminho).split(".")[0]
+        for (ano_fatia,), fatia in agregado.group_by("year"):
+            store.gravar_fatia(
+                fatia.lazy().sort("state", "cityCode", "cnae7"),
+                store.pasta_particao(destino, year=ano_fatia),
+                nome,
+            )
+            linhas[nome, ano_fatia] = fatia.height
+    return {
+        "linhas": linhas,
+        "destino": destino,
+        "segundos": round(time.perf_counter() - inicio, 2),
+    }
+
+
+# --- 2. LEITURA DOS AGREGADOS ---
+
+
+def anos_disponiveis(diretorio=FATIAS_DIR):
+    return store.anos_disponiveis(diretorio)
+
+
+def versao_emprego(diretorio=FATIAS_DIR):
+    """Chave de versão do store de emprego (arquivos e datas de modificação)."""
+    return store.versao_store(diretorio)
+
+
+def ano_referencia(ano=None, diretorio=FATIAS_DIR):
+    """O próprio ano, senão o mais recente anterior, senão o primeiro (None sem dados)."""
+    anos = anos_disponiveis(diretorio)
+    if not anos:
+        return None
+    if ano is None:
+        return anos[-1]
+    anteriores = [a for a in anos if a <= ano]
+    return anteriores[-1] if anteriores else anos[0]
+
+
+def ler_emprego(ano, nivel=("state",), diretorio=FATIAS_DIR):
+    """
+    Empregos e estabelecimentos do ano por `nivel` x CNAE, somando as fatias do
+    ano (ex: nivel=("state",) para UF x CNAE; ("state", "cityCode") por município).
+    """
+    return (
+        pl.scan_parquet(os.path.join(diretorio, f"year={ano}", "*.parquet"))
+        .group_by(list(nivel) + ["cnae7"])
+        .agg(
+            pl.col("Empregos").sum(),
+            # Nulo quando só há fatias de vínculos (sem contagem de estabelecimentos)
+            pl.when(pl.col("Estabelecimentos").is_not_null().any())
+            .then(pl.col("Estabelecimentos").sum()),
+        )
+        .sort(list(nivel) + ["cnae7"])
+        .collect()
+        .to_pandas()
+    )
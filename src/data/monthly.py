@@ -0,0 +1,306 @@
+import glob
+import json
+import os
+import shutil
+import time
+
+import polars as pl
+
+from core import runtime
+from core.config import CACHE_DIR
+from data import store
+
+# Modo mensal: linhas brutas do ComexStat por mês (year=/monthNumber=) e roll-ups
+# pré-calculados, atualizados só nas partições afetadas pelos meses que chegam
+MENSAL_DIR = os.path.join(CACHE_DIR, "mensal")
+BRUTO_DIR = os.path.join(MENSAL_DIR, "bruto")
+ROLLUPS_DIR = os.path.join(MENSAL_DIR, "rollups")
+MANIFESTO_PATH = os.path.join(MENSAL_DIR, "manifesto.json")
+
+COLUNAS_BRUTAS = {
+    "year": pl.Int64,
+    "monthNumber": pl.Int8,
+    "state": pl.Utf8,
+    "headingCode": pl.Utf8,
+    "heading": pl.Utf8,
+    "metricFOB": pl.Float64,
+}
+
+# Roll-ups: tipo -> coluna do período dentro do ano (partição hive ao lado de year)
+#   mensal: o mês; trimestral: o trimestre; t12m: 12 meses terminados no mês;
+#   acumulado: janeiro até o mês (year-to-date)
+ROLLUPS = {
+    "mensal": "monthNumber",
+    "trimestral": "quarter",
+    "t12m": "monthNumber",
+    "acumulado": "monthNumber",
+}
+CHAVES = ["state", "headingCode"]
+
+
+def _indice_mes(ano, mes):
+    return ano * 12 + mes - 1
+
+
+def _ano_mes(indice):
+    return indice // 12, indice % 12 + 1
+
+
+# --- 1. INGESTÃO (UMA PARTIÇÃO POR MÊS) ---
+
+
+def _normalizar(lf):
+    return store.normalizar_colunas(lf, COLUNAS_BRUTAS).with_columns(
+        pl.col("headingCode").str.zfill(4)
+    )
+
+
+def _pasta_mes(destino, ano, mes):
+    return store.pasta_particao(destino, year=ano, monthNumber=mes)
+
+
+def importar_parquet(origem, destino=BRUTO_DIR, anos=None):
+    """
+    Importa um dataset Parquet mensal (hive year=/monthNumber=, como as escalas
+    100x e municipal_mensal do synthetic_cli) para o store, um mês por vez e sem
+    carregar a origem. Linhas municipais entram como estão (o roll-up agrega por UF).
+    Cada mês importado substitui o que já havia nele (ex: um mês baixado da API).
+    Retorna as linhas gravadas por (ano, mês).
+    """
+    return store.importar_parquet(
+        origem,
+        destino,
+        _normalizar,
+        particoes=("year", "monthNumber"),
+        anos=anos,
+        escopo=store.PARTICAO_INTEIRA,
+    )
+
+
+def baixar_meses(inicio, fim, destino=BRUTO_DIR):
+    """
+    Baixa da API do ComexStat as exportações por UF x HS4 de cada mês entre
+    `inicio` e `fim` ("AAAA-MM"), com month_detail, uma requisição e uma partição
+    por mês: rodar de novo só regrava os meses pedidos, e o mês baixado substitui
+    o que já havia nele (ex: uma extração importada). Retorna linhas por (ano, mês).
+    """
+    from data.comexstat import Comexstat
+
+    api = Comexstat()
+    primeiro = _indice_mes(*map(int, inicio.split("-")))
+    ultimo = _indice_mes(*map(int, fim.split("-")))
+    linhas = {}
+    for indice in range(primeiro, ultimo + 1):
+        ano, mes = _ano_mes(indice)
+        periodo = f"{ano}-{mes:02d}"
+        df = api.query_comexstat_data(
+            flow="export",
+            period_from=periodo,
+            period_to=periodo,
+            details=["state", "heading"],
+            metrics=["metricFOB"],
+            month_detail=True,
+        )
+        if df is None or df.is_empty():
+            runtime.relatar_erro(f"ComexStat sem dados mensais para {periodo}")
+            continue
+        store.gravar_fatia(
+            _normalizar(df.lazy()),
+            _pasta_mes(destino, ano, mes),
+            "api",
+            escopo=store.PARTICAO_INTEIRA,
+        )
+        linhas[ano, mes] = df.height
+    return linhas
+
+
+# --- 2. ROLL-UPS INCREMENTAIS ---
+
+
+def _assinaturas(origem):
+    """Assinatura (arquivos, tamanhos e datas) de cada mês do store bruto."""
+    assinaturas = {}
+    for pasta in glob.glob(os.path.join(origem, "year=*", "monthNumber=*")):
+        arquivos = sorted(glob.glob(os.path.join(pasta, "*.parquet")))
+        if not arquivos:
+            continue
+        ano = int(os.path.basename(os.path.dirname(pasta)).removeprefix("year="))
+        mes = int(os.path.basename(pasta).removeprefix("monthNumber="))
+        assinaturas[f"{ano}-{mes:02d}"] = [
+            [os.path.basename(a), os.path.getsize(a), os.path.getmtime(a)] for a in arquivos
+        ]
+    return assinaturas
+
+
+def _ler_manifesto(caminho):
+    if not os.path.exists(caminho):
+        return {"meses": {}}
+    with open(caminho, encoding="utf-8") as arquivo:
+        return json.load(arquivo)
+
+
+def _com_vcr(lf):
+    """VCR de cada UF x HS4 no período contra o Brasil (totais por janela)."""
+    total = pl.col("FOB").sum()
+    return lf.with_columns(
+        VCR=(pl.col("FOB") / total.over("state"))
+        / (total.over("headingCode") / total)
+    )
+
+
+def _rollup_mensal(origem, ano, mes):
+    """UF x HS4 de um mês, a partir das linhas brutas (streaming)."""
+    brutas = pl.scan_parquet(os.path.join(_pasta_mes(origem, ano, mes), "*.parquet"))
+    return (
+        brutas.filter(pl.col("metricFOB") > 0)
+        .group_by(CHAVES)
+        .agg(pl.col("metricFOB").sum().alias("FOB"), pl.col("heading").first())
+        .pipe(_com_vcr)
+    )
+
+
+def _somar_meses(destino, indices):
+    """Soma dos roll-ups mensais de vários meses (os que existem), com a contagem."""
+    pasta_mensal = os.path.join(destino, "mensal")
+    arquivos = [
+        os.path.join(_pasta_mes(pasta_mensal, *_ano_mes(i)), "parte.parquet") for i in indices
+    ]
+    arquivos = [caminho for caminho in arquivos if os.path.exists(caminho)]
+    return (
+        pl.scan_parquet(arquivos)
+        .group_by(CHAVES)
+        .agg(pl.col("FOB").sum(), pl.col("heading").first())
+        .with_columns(Meses=pl.lit(len(arquivos), pl.Int8))
+        .pipe(_com_vcr)
+    )
+
+
+def _particoes_afetadas(alterados, disponiveis):
+    """
+    Partições de cada roll-up que dependem dos meses alterados: o próprio mês, o
+    trimestre, os 12 meses seguintes (T12M) e o resto do ano (acumulado), só até
+    o último mês existente no store.
+    """
+    afetadas = {tipo: set() for tipo in ROLLUPS}
+    for indice in alterados:
+        ano, mes = _ano_mes(indice)
+        afetadas["mensal"].add((ano, mes))
+        afetadas["trimestral"].add((ano, (mes - 1) // 3 + 1))
+        # A partição do próprio mês entra mesmo se ele saiu do store (para ser apagada)
+        afetadas["t12m"].add((ano, mes))
+        afetadas["acumulado"].add((ano, mes))
+        for posterior in disponiveis:
+            if indice <= posterior < indice + 12:
+                afetadas["t12m"].add(_ano_mes(posterior))
+            if indice <= posterior and _ano_mes(posterior)[0] == ano:
+                afetadas["acumulado"].add(_ano_mes(posterior))
+    return afetadas
+
+
+def _meses_do_periodo(tipo, ano, periodo):
+    fim = _indice_mes(ano, periodo)
+    if tipo == "trimestral":
+        return range(_indice_mes(ano, 3 * periodo - 2), _indice_mes(ano, 3 * periodo) + 1)
+    if tipo == "t12m":
+        return range(fim - 11, fim + 1)
+    return range(_indice_mes(ano, 1), fim + 1)  # acumulado
+
+
+def atualizar_rollups(origem=BRUTO_DIR, destino=ROLLUPS_DIR, manifesto=MANIFESTO_PATH):
+    """
+    Atualiza os roll-ups mensal, trimestral, T12M e acumulado no ano a partir do
+    store bruto. Só os meses novos ou alterados desde a última execução (pela
+    assinatura dos arquivos no manifesto) são relidos, e só as partições que
+    dependem deles são regravadas; meses removidos do store saem dos roll-ups.
+    Retorna um resumo (meses alterados, partições regravadas por tipo, tempo).
+    """
+    inicio = time.perf_counter()
+    anterior = _ler_manifesto(manifesto)["meses"]
+    atual = _assinaturas(origem)
+    if not atual:
+        runtime.falhar(f"Store mensal vazio em '{origem}'. Importe ou baixe os meses antes.")
+
+    alterados = {k for k, v in atual.items() if anterior.get(k) != v} | (
+        set(anterior) - set(atual)
+    )
+    indices = {_indice_mes(*map(int, k.split("-"))) for k in alterados}
+    disponiveis = sorted(_indice_mes(*map(int, k.split("-"))) for k in atual)
+    afetadas = _particoes_afetadas(indices, disponiveis)
+
+    # Mensal primeiro: os demais somam os roll-ups mensais, não as linhas brutas
+    for ano, mes in sorted(afetadas["mensal"]):
+        pasta = _pasta_mes(os.path.join(destino, "mensal"), ano, mes)
+        if f"{ano}-{mes:02d}" in atual:
+            store.gravar_fatia(_rollup_mensal(origem, ano, mes), pasta, "parte")
+        else:
+            shutil.rmtree(pasta, ignore_errors=True)
+    presentes = set(disponiveis)
+    for tipo in ("trimestral", "t12m", "acumulado"):
+        for ano, periodo in sorted(afetadas[tipo]):
+            meses = [i for i in _meses_do_periodo(tipo, ano, periodo) if i in presentes]
+            pasta = store.pasta_particao(
+                os.path.join(destino, tipo), year=ano, **{ROLLUPS[tipo]: periodo}
+            )
+            # T12M e acumulado só existem para meses presentes no store
+            fim_presente = tipo == "trimestral" or _indice_mes(ano, periodo) in presentes
+            if meses and fim_presente:
+                store.gravar_fatia(_somar_meses(destino, meses), pasta, "parte")
+            else:
+                shutil.rmtree(pasta, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(manifesto), exist_ok=True)
+    with open(manifesto, "w", encoding="utf-8") as arquivo:
+        json.dump({"meses": atual}, arquivo)
+    return {
+        "meses_alterados": sorted(alterados),
+        "particoes": {tipo: len(p) for tipo, p in afetadas.items()},
+        "destino": destino,
+        "segundos": round(time.perf_counter() - inicio, 2),
+    }
+
+
+# --- 3. LEITURA DOS ROLL-UPS (DASHBOARD) ---
+
+
+def versao_rollups(manifesto=MANIFESTO_PATH):
+    """Chave de versão dos roll-ups (data do manifesto gravado por atualizar_rollups)."""
+    return store.versao_arquivo(manifesto)
+
+
+def meses_disponiveis(manifesto=MANIFESTO_PATH):
+    """(ano, mês) presentes nos roll-ups, em ordem."""
+    return sorted(tuple(map(int, k.split("-"))) for k in _ler_manifesto(manifesto)["meses"])
+
+
+def ler_rollup(tipo, estado=None, anos=None, periodos=None, destino=ROLLUPS_DIR):
+    """
+    Roll-up `tipo` filtrado por estado, anos e períodos (mês ou trimestre); as
+    partições fora do filtro não são lidas.
+    """
+    lf = pl.scan_parquet(
+        os.path.join(destino, tipo, "**", "*.parquet"), hive_partitioning=True
+    )
+    if anos:
+        lf = lf.filter(pl.col("year").is_in(list(anos)))
+    if periodos:
+        lf = lf.filter(pl.col(ROLLUPS[tipo]).is_in(list(periodos)))
+    if estado is not None:
+        lf = lf.filter(pl.col("state") == estado)
+    return lf.collect().to_pandas()
+
+
+def indice_sazonal(df_mensal):
+    """
+    Índice sazonal por mês do ano: FOB do mês / FOB médio mensal do ano, médio
+    entre os anos completos (12 meses), ou entre todos se nenhum estiver completo.
+    `df_mensal` é o roll-up mensal já filtrado (estado e, se for o caso, produtos).
+    """
+    por_mes = df_mensal.groupby(["year", "monthNumber"], as_index=False)["FOB"].sum()
+    meses_no_ano = por_mes.groupby("year")["monthNumber"].transform("size")
+    if (meses_no_ano == 12).any():
+        por_mes = por_mes[meses_no_ano == 12]
+    por_mes["Indice"] = por_mes["FOB"] / por_mes.groupby("year")["FOB"].transform("mean")
+    resumo = por_mes.groupby("monthNumber").agg(
+        Indice=("Indice", "mean"), FOB_Medio=("FOB", "mean"), Anos=("year", "size")
+    )
+    return resumo.reindex(range(1, 13)).rename_axis("monthNumber").reset_index()
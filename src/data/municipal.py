@@ -0,0 +1,189 @@
+import os
+import time
+
+import polars as pl
+
+from core import runtime
+from core.config import CACHE_DIR, UFS_IBGE
+from data import store
+
+# Store municipal: linhas brutas (município x HS4 x mês) particionadas por ano e,
+# à parte, os agregados de VCR lidos pela aba de municípios
+MUNICIPAL_DIR = os.path.join(CACHE_DIR, "municipal")
+BRUTO_DIR = os.path.join(MUNICIPAL_DIR, "bruto")
+AGREGADOS_DIR = os.path.join(MUNICIPAL_DIR, "agregados")
+
+# Colunas do nível fino (monthNumber é opcional: consultas anuais não a trazem)
+COLUNAS_BRUTAS = {
+    "year": pl.Int64,
+    "monthNumber": pl.Int8,
+    "state": pl.Utf8,
+    "cityCode": pl.Int32,
+    "city": pl.Utf8,
+    "headingCode": pl.Utf8,
+    "heading": pl.Utf8,
+    "metricFOB": pl.Float64,
+}
+CHAVES_MUNICIPIO = ["state", "cityCode", "city"]
+
+
+# --- 1. INGESTÃO NO STORE PARTICIONADO ---
+
+
+def _normalizar(lf):
+    """Colunas e tipos do store (HS4 com zero à esquerda, mês ausente vira nulo)."""
+    return store.normalizar_colunas(lf, COLUNAS_BRUTAS).with_columns(
+        pl.col("headingCode").str.zfill(4)
+    )
+
+
+def importar_parquet(origem, destino=BRUTO_DIR, anos=None):
+    """
+    Importa para o store um dataset Parquet (particionado por ano/mês no estilo
+    hive, como o gerado por synthetic_cli com a escala municipal_mensal), ano a ano
+    e sem carregar a origem na memória. A extração cobre o ano inteiro: substitui
+    as fatias por UF já baixadas para ele. Retorna as linhas gravadas por ano.
+    """
+    return store.importar_parquet(
+        origem, destino, _normalizar, anos=anos, escopo=store.PARTICAO_INTEIRA
+    )
+
+
+def baixar_api(anos, codigos_uf=None, destino=BRUTO_DIR, mensal=True):
+    """
+    Baixa da API do ComexStat (Comexstat.fetch_comexstat_by_city) as exportações
+    por município x HS4 de cada UF e ano, gravando uma fatia por UF. As linhas da
+    UF saem das demais fatias do ano (ex: uma extração importada antes), para não
+    serem somadas duas vezes. Falhas de uma UF são relatadas e não interrompem as
+    demais. Retorna linhas por (UF, ano).
+    """
+    from data.comexstat import Comexstat
+
+    api = Comexstat()
+    linhas = {}
+    for ano in anos:
+        for codigo in codigos_uf or sorted(UFS_IBGE):
+            df = api.fetch_comexstat_by_city(ano, codigo, month_detail=mensal)
+            if df is None or df.is_empty():
+                runtime.relatar_erro(f"ComexStat sem dados municipais para UF {codigo}/{ano}")
+                continue
+            if "state" not in df.columns:
+                df = df.with_columns(pl.lit(UFS_IBGE.get(codigo, str(codigo))).alias("state"))
+            if "year" not in df.columns:
+                df = df.with_columns(pl.lit(ano).alias("year"))
+            store.gravar_fatia(
+                _normalizar(df.lazy()),
+                store.pasta_particao(destino, year=ano),
+                f"uf-{codigo}",
+                escopo=pl.col("state").is_in(df["state"].unique().to_list()),
+            )
+            linhas[codigo, ano] = df.height
+    return linhas
+
+
+# --- 2. VCR MUNICIPAL (AGREGAÇÃO FORA DA MEMÓRIA) ---
+
+
+def _vcr_municipal_ano(origem, ano):
+    """
+    VCR de cada município x HS4 num ano contra o próprio estado e contra o Brasil.
+
+    A única passada sobre as linhas brutas (meses, todas as UFs) é um group-by no
+    motor de streaming do polars, que lê o Parquet em blocos: a memória é a do
+    resultado agregado (município x HS4 do ano), não a da base bruta. Os totais
+    por município, estado e produto saem desse agregado, com janelas (over).
+    """
+    brutas = pl.scan_parquet(os.path.join(origem, f"year={ano}", "*.parquet"))
+    fob = (
+        brutas.filter(pl.col("metricFOB") > 0)
+        .group_by(CHAVES_MUNICIPIO + ["headingCode"])
+        .agg(pl.col("metricFOB").sum().alias("FOB"), pl.col("heading").first())
+        .collect(engine="streaming")
+    )
+    total = pl.col("FOB").sum()
+    parcela_municipio = pl.col("FOB") / total.over("cityCode")
+    return (
+        fob.lazy()
+        .with_columns(
+            VCR_Estado=parcela_municipio
+            / (total.over("state", "headingCode") / total.over("state")),
+            VCR_Brasil=parcela_municipio / (total.over("headingCode") / total),
+            Participacao_Estado=pl.col("FOB") / total.over("state", "headingCode"),
+        )
+        .with_columns(pl.lit(ano, pl.Int64).alias("year"))
+        .sort(["state", "cityCode", "headingCode"])
+    )
+
+
+def agregar_vcr_municipal(origem=BRUTO_DIR, destino=AGREGADOS_DIR, anos=None):
+    """
+    Calcula a VCR municipal (vs. estado e vs. Brasil) de cada ano do store bruto e
+    grava os agregados em `destino/year=<ano>/vcr.parquet`, ordenados por estado e
+    município (a leitura filtrada por estado usa as estatísticas dos row groups).
+    Processa um ano por vez. Retorna um resumo (contagens e tempo).
+    """
+    inicio = time.perf_counter()
+    anos_store = store.anos_disponiveis(origem)
+    if not anos_store:
+        runtime.falhar(f"Store municipal vazio em '{origem}'. Importe ou baixe os dados antes.")
+    anos = [a for a in anos_store if not anos or a in anos]
+
+    linhas = {}
+    for ano in anos:
+        caminho = store.gravar_fatia(
+            _vcr_municipal_ano(origem, ano), store.pasta_particao(destino, year=ano), "vcr"
+        )
+        linhas[ano] = store.contar_linhas(caminho)
+    return {
+        "anos": anos,
+        "linhas": linhas,
+        "destino": destino,
+        "segundos": round(time.perf_counter() - inicio, 2),
+    }
+
+
+# --- 3. LEITURA DOS AGREGADOS (ABA DE MUNICÍPIOS) ---
+
+
+def versao_agregados(diretorio=AGREGADOS_DIR):
+    """Chave de versão dos agregados (arquivos e datas de modificação)."""
+    return store.versao_store(diretorio)
+
+
+def opcoes_agregados(diretorio=AGREGADOS_DIR):
+    """Anos e estados disponíveis nos agregados ({} se ainda não foram gerados)."""
+    anos = store.anos_disponiveis(diretorio)
+    if not anos:
+        return {}
+    estados = (
+        pl.scan_parquet(os.path.join(diretorio, "year=*", "*.parquet"))
+        .select(pl.col("state").unique().sort())
+        .collect()["state"]
+        .to_list()
+    )
+    return {"anos": anos, "estados": estados}
+
+
+def ler_vcr_municipal(estado, ano, diretorio=AGREGADOS_DIR):
+    """VCR municipal de um estado e ano (só a partição do ano é aberta)."""
+    return (
+        pl.scan_parquet(os.path.join(diretorio, f"year={ano}", "*.parquet"))
+        .filter(pl.col("state") == estado)
+        .collect()
+        .to_pandas()
+    )
+
+
+def resumo_municipios(df_vcr):
+    """
+    Uma linha por município: FOB total, nº de HS4 exportados, diversidade (HS4 com
+    VCR vs. Brasil >= 1) e o principal produto, ordenada por FOB.
+    """
+    df = df_vcr.sort_values("FOB", ascending=False)
+    resumo = df.groupby(["cityCode", "city"], as_index=False).agg(
+        FOB=("FOB", "sum"),
+        Produtos=("headingCode", "size"),
+        Diversidade=("VCR_Brasil", lambda vcr: int((vcr >= 1).sum())),
+        Principal_HS4=("headingCode", "first"),
+    )
+    return resumo.sort_values("FOB", ascending=False, ignore_index=True)
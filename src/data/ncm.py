@@ -0,0 +1,212 @@
+import glob
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import polars as pl
+import pyarrow.parquet as pq
+
+from core import runtime
+from core.config import CACHE_DIR
+from data import store
+
+# Fatos NCM-8 do ComexStat: linhas brutas por ano e uma tabela de fatos única,
+# ordenada por NCM, com o índice HS4 -> faixa de linhas nos metadados do Parquet
+NCM_DIR = os.path.join(CACHE_DIR, "ncm")
+BRUTO_DIR = os.path.join(NCM_DIR, "bruto")
+FATOS_PATH = os.path.join(NCM_DIR, "fatos.parquet")
+
+# Row groups pequenos: uma posição HS4 ocupa poucos grupos, e só eles são lidos
+LINHAS_POR_GRUPO = 8192
+CHAVE_INDICE = b"zpe.indice_hs4"
+
+COLUNAS_BRUTAS = {
+    "year": pl.Int64,
+    "state": pl.Utf8,
+    "ncm8": pl.Utf8,
+    "metricFOB": pl.Float64,
+    "metricKG": pl.Float64,
+}
+# Nomes do código NCM nas respostas da API (detalhe "ncm") e em extrações locais
+ALIASES_NCM = ("ncmCode", "coNcm", "ncm8")
+
+
+# --- 1. INGESTÃO ---
+
+
+def _normalizar(lf):
+    """Colunas e tipos do store (código NCM renomeado para ncm8, com 8 dígitos)."""
+    colunas = lf.collect_schema().names()
+    alias = next((a for a in ALIASES_NCM if a in colunas), None)
+    if alias is None:
+        runtime.falhar(f"Coluna de código NCM ausente (esperado um de {ALIASES_NCM})")
+    lf = lf.rename({alias: "ncm8"}) if alias != "ncm8" else lf
+    return store.normalizar_colunas(lf, COLUNAS_BRUTAS).with_columns(
+        pl.col("ncm8").str.replace(r"\.0$", "").str.zfill(8)
+    )
+
+
+def importar_parquet(origem, destino=BRUTO_DIR, anos=None):
+    """
+    Importa para o store um dataset Parquet por UF x NCM-8 (particionado por ano
+    no estilo hive), ano a ano e em streaming. Cada ano importado substitui o que
+    já havia nele (ex: o ano baixado da API). Retorna as linhas gravadas por ano.
+    """
+    return store.importar_parquet(
+        origem, destino, _normalizar, anos=anos, escopo=store.PARTICAO_INTEIRA
+    )
+
+
+def baixar_anos(anos, destino=BRUTO_DIR):
+    """
+    Baixa da API do ComexStat as exportações por UF x NCM-8 (FOB e kg) de cada ano,
+    uma requisição e uma partição por ano; o ano baixado substitui o que já havia
+    nele (ex: uma extração importada). Retorna linhas por ano.
+    """
+    from data.comexstat import Comexstat
+
+    api = Comexstat()
+    linhas = {}
+    for ano in anos:
+        df = api.query_comexstat_data(
+            flow="export",
+            period_from=f"{ano}-01",
+            period_to=f"{ano}-12",
+            details=["state", "ncm"],
+            metrics=["metricFOB", "metricKG"],
+        )
+        if df is None or df.is_empty():
+            runtime.relatar_erro(f"ComexStat sem dados por NCM para {ano}")
+            continue
+        if "year" not in df.columns:
+            df = df.with_columns(pl.lit(ano).alias("year"))
+        store.gravar_fatia(
+            _normalizar(df.lazy()),
+            store.pasta_particao(destino, year=ano),
+            "api",
+            escopo=store.PARTICAO_INTEIRA,
+        )
+        linhas[ano] = df.height
+    return linhas
+
+
+# --- 2. TABELA DE FATOS ORDENADA POR NCM ---
+
+
+def construir_fatos(origem=BRUTO_DIR, destino=FATOS_PATH):
+    """
+    Agrega o store bruto em NCM-8 x ano x UF (FOB, kg e VCR da UF no NCM contra o
+    Brasil, no ano) e grava uma tabela de fatos ordenada por NCM, em row groups de
+    LINHAS_POR_GRUPO linhas. Como o HS4 é prefixo do NCM, cada posição ocupa uma
+    faixa contígua de linhas; a faixa de cada HS4 vai nos metadados do arquivo.
+    Retorna um resumo (linhas, posições HS4, tempo).
+    """
+    inicio = time.perf_counter()
+    arquivos = glob.glob(os.path.join(origem, "year=*", "*.parquet"))
+    if not arquivos:
+        runtime.falhar(f"Store NCM vazio em '{origem}'. Importe ou baixe os dados antes.")
+
+    total = pl.col("metricFOB").sum()
+    fatos = (
+        pl.scan_parquet(arquivos)
+        .filter(pl.col("metricFOB") > 0)
+        .group_by("ncm8", "year", "state")
+        .agg(pl.col("metricFOB").sum(), pl.col("metricKG").sum())
+        .with_columns(
+            VCR=(pl.col("metricFOB") / total.over("year", "state"))
+            / (total.over("year", "ncm8") / total.over("year"))
+        )
+        .with_columns(headingCode=pl.col("ncm8").str.slice(0, 4))
+        .sort("ncm8", "year", "state")
+        .select("headingCode", "ncm8", "year", "state", "metricFOB", "metricKG", "VCR")
+        .collect(engine="streaming")
+    )
+
+    posicoes, inicios = np.unique(fatos["headingCode"].to_numpy(), return_index=True)
+    fins = np.append(inicios[1:], fatos.height)
+    indice = {p: [int(i), int(f)] for p, i, f in zip(posicoes, inicios, fins)}
+
+    tabela = fatos.to_arrow()
+    tabela = tabela.replace_schema_metadata(
+        {**(tabela.schema.metadata or {}), CHAVE_INDICE: json.dumps(indice).encode()}
+    )
+    os.makedirs(os.path.dirname(destino) or ".", exist_ok=True)
+    pq.write_table(
+        tabela,
+        destino + ".tmp",
+        row_group_size=LINHAS_POR_GRUPO,
+        compression="zstd",
+        write_statistics=["headingCode", "ncm8"],
+    )
+    os.replace(destino + ".tmp", destino)
+    return {
+        "linhas": fatos.height,
+        "posicoes": len(indice),
+        "destino": destino,
+        "segundos": round(time.perf_counter() - inicio, 2),
+    }
+
+
+# --- 3. DRILL-DOWN POR POSIÇÃO HS4 (LEITURA SOB DEMANDA) ---
+
+
+class FatosNCM:
+    """
+    Acesso à tabela de fatos NCM por posição HS4. Ao abrir, só os metadados são
+    lidos (índice HS4 -> faixa de linhas e tamanho dos row groups); cada consulta
+    lê apenas os row groups que cobrem a faixa da posição pedida.
+    """
+
+    def __init__(self, caminho: str = FATOS_PATH):
+        self._arquivo = pq.ParquetFile(caminho)
+        metadados = self._arquivo.schema_arrow.metadata or {}
+        self._indice = json.loads(metadados.get(CHAVE_INDICE, b"{}"))
+        linhas_grupo = [
+            self._arquivo.metadata.row_group(i).num_rows
+            for i in range(self._arquivo.num_row_groups)
+        ]
+        self._inicio_grupo = np.concatenate(([0], np.cumsum(linhas_grupo)))
+
+    @property
+    def posicoes(self) -> list:
+        return list(self._indice)
+
+    def __contains__(self, posicao: str) -> bool:
+        return posicao in self._indice
+
+    def linhas(self, posicao: str) -> pd.DataFrame:
+        """Todas as linhas NCM-8 x ano x UF de uma posição HS4 (vazio se não houver)."""
+        if posicao not in self._indice:
+            return self._arquivo.schema_arrow.empty_table().to_pandas()
+        inicio, fim = self._indice[posicao]
+        primeiro = int(np.searchsorted(self._inicio_grupo, inicio, side="right")) - 1
+        ultimo = int(np.searchsorted(self._inicio_grupo, fim, side="left"))
+        tabela = self._arquivo.read_row_groups(range(primeiro, ultimo))
+        deslocamento = int(self._inicio_grupo[primeiro])
+        return tabela.slice(inicio - deslocamento, fim - inicio).to_pandas()
+
+    def detalhar(self, posicao: str, estado: str, anos=None) -> pd.DataFrame:
+        """
+        Linhas NCM-8 de uma posição para uma UF: FOB, kg e VCR por ano, com o preço
+        médio (US$/kg) e a participação do NCM no FOB da posição.
+        """
+        df = self.linhas(posicao)
+        df = df[df["state"] == estado]
+        if anos:
+            df = df[df["year"].isin(anos)]
+        df = df.drop(columns=["state"]).reset_index(drop=True)
+        df["US$/kg"] = np.where(df["metricKG"] > 0, df["metricFOB"] / df["metricKG"], np.nan)
+        df["Participacao"] = df["metricFOB"] / df.groupby("year")["metricFOB"].transform("sum")
+        return df
+
+
+def versao_fatos(caminho: str = FATOS_PATH) -> str:
+    """Chave de versão da tabela de fatos (vazia se ainda não foi construída)."""
+    return store.versao_arquivo(caminho)
+
+
+def abrir_fatos(caminho: str = FATOS_PATH):
+    """FatosNCM do arquivo, ou None se a tabela de fatos ainda não foi construída."""
+    return FatosNCM(caminho) if os.path.exists(caminho) else None
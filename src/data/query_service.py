@@ -0,0 +1,326 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from core.bitmap_index import IndiceBitmap
+from core.config import PRESETS_PESOS, TARGET_STATE_NAME
+from core.data_loader import DIMENSOES_COMEXSTAT, carregar_indice_busca
+from core.export import FORMATOS_EXPORTACAO, TAMANHO_LOTE, exportar
+from core.filters import materializar
+from core.hs_hierarchy import HierarquiaHS, normalizar_codigo_hs
+from core.vcr_calculators import calcular_vcr_dentro_selecao
+from data.data_processor import consolidar_metricas
+from data.ranking_cube import RANKING_CUBE_DIR
+
+# Ordem das métricas normalizadas na matriz e o peso correspondente de cada uma
+COLUNAS_NORMALIZADAS = [
+    "VCR_Ceara_Brasil_norm",
+    "VCR_Brasil_Mundo_norm",
+    "PCI_norm",
+    "Distancia_Parceiros_norm",
+]
+CHAVES_PESOS = ["vcr_ceara", "vcr_brasil", "pci", "distancia"]
+
+# Colunas devolvidas pelo endpoint de ranking (mesmos nomes de process_comparison_data)
+COLUNAS_RANKING = {
+    "headingCode": "Código HS",
+    "Descrição": "Descrição",
+    "VCR_Ceara_Brasil": "VCR estadual (Bruto)",
+    "VCR_Brasil_Mundo": "VCR país (Bruto)",
+    "PCI": "PCI (Bruto)",
+    "Distancia_Parceiros": "distância entre parceiros (Bruto)",
+    "Cenário ID": "Cenário ID",
+}
+
+TAMANHO_CACHE_RESPOSTAS = 1024
+LIMITE_PADRAO = 100
+
+FORMATOS = {
+    "json": "application/json; charset=utf-8",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+class ErroConsulta(ValueError):
+    """Parâmetro de consulta inválido (vira HTTP 400)."""
+
+
+def _lista(parametros, nome):
+    """Valores de um parâmetro repetível ou separado por vírgulas."""
+    valores = []
+    for bruto in parametros.get(nome, []):
+        valores.extend(v.strip() for v in bruto.split(",") if v.strip())
+    return valores
+
+
+def _unico(parametros, nome, padrao=None):
+    valores = parametros.get(nome)
+    return valores[-1] if valores else padrao
+
+
+def _inteiro(nome, valor):
+    """Converte um parâmetro inteiro; valor inválido vira ErroConsulta com o nome dele."""
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        raise ErroConsulta(f"{nome} deve ser um inteiro, não {valor!r}") from None
+
+
+class ServicoConsultas:
+    """
+    Consultas do painel comparativo respondidas a partir de estruturas pré-calculadas.
+
+    Na construção, as métricas de cada (estado, ano) são consolidadas uma única vez;
+    as colunas normalizadas ficam numa matriz numpy (n_produtos x 4), de modo que
+    um ranking com pesos arbitrários é só uma combinação linear + ordenação.
+    Respostas serializadas ficam num cache LRU pela consulta canônica, e o ETag é
+    derivado da versão dos dados + consulta (validável sem recalcular nada).
+    """
+
+    def __init__(
+        self,
+        comexstat_df,
+        harvard_df,
+        versao,
+        estados=None,
+        anos=None,
+        diretorio_cubo=RANKING_CUBE_DIR,
+    ):
+        self.versao = versao
+        self.diretorio_cubo = diretorio_cubo
+        self.comexstat_df = comexstat_df
+        self.estados = estados or sorted(comexstat_df["state"].dropna().unique())
+        self.anos = anos or sorted(int(a) for a in comexstat_df["year"].dropna().unique())
+
+        self._bases = {}
+        self._matrizes = {}
+        for ano in self.anos:
+            comex_ano = comexstat_df[comexstat_df["year"] == ano]
+            for estado in self.estados:
+                df_metricas = consolidar_metricas(comex_ano, harvard_df, estado, ano)
+                self._bases[estado, ano] = (
+                    df_metricas[list(COLUNAS_RANKING)]
+                    .rename(columns=COLUNAS_RANKING)
+                    .reset_index(drop=True)
+                )
+                self._matrizes[estado, ano] = np.column_stack(
+                    [
+                        pd.to_numeric(df_metricas[c], errors="coerce").to_numpy(dtype=float)
+                        for c in COLUNAS_NORMALIZADAS
+                    ]
+                )
+
+        # Índice de filtros (VCR por seleção) e hierarquia HS (consultas por código)
+        self._indice = IndiceBitmap.de_dataframe(comexstat_df, DIMENSOES_COMEXSTAT)
+        df_hs = (
+            pd.DataFrame(
+                {
+                    "codigo": normalizar_codigo_hs(comexstat_df["headingCode"], 4),
+                    "descricao": comexstat_df["heading"],
+                    "fob_brasil": comexstat_df["metricFOB"],
+                }
+            )
+            .groupby("codigo", as_index=False)
+            .agg(descricao=("descricao", "first"), fob_brasil=("fob_brasil", "sum"))
+        )
+        self._produtos = df_hs
+        self._hierarquia = HierarquiaHS(df_hs["codigo"], df_hs[["fob_brasil"]])
+        self._busca = carregar_indice_busca()
+
+        self._respostas = OrderedDict()
+        self._trava = threading.Lock()
+
+    # --- CACHE DE RESPOSTAS ---
+
+    def etag(self, rota, parametros):
+        # Valores repetidos na ordem original: _unico usa o último, então
+        # ?preset=a&preset=b e ?preset=b&preset=a são consultas diferentes
+        canonica = "&".join(f"{k}={','.join(v)}" for k, v in sorted(parametros.items()))
+        resumo = hashlib.sha1(f"{self.versao}|{rota}|{canonica}".encode()).hexdigest()
+        return f'"{resumo[:20]}"'
+
+    def responder(self, rota, parametros):
+        """
+        Retorna (etag, tipo de conteúdo, corpo em bytes) de uma rota. Erros de
+        parâmetro levantam ErroConsulta; rotas desconhecidas, KeyError.
+        """
+        etag = self.etag(rota, parametros)
+        with self._trava:
+            if etag in self._respostas:
+                self._respostas.move_to_end(etag)
+                return self._respostas[etag]
+
+        consultar = {
+            "/ranking": self.ranking,
+            "/vcr": self.vcr_selecao,
+            "/hs": self.produtos_hs,
+        }[rota]
+        formato = _unico(parametros, "formato", "json")
+        if formato not in FORMATOS:
+            raise ErroConsulta(f"formato deve ser um de {sorted(FORMATOS)}")
+        resposta = (etag, FORMATOS[formato], serializar(consultar(parametros), formato))
+
+        with self._trava:
+            self._respostas[etag] = resposta
+            if len(self._respostas) > TAMANHO_CACHE_RESPOSTAS:
+                self._respostas.popitem(last=False)
+        return resposta
+
+    # --- EXPORTAÇÕES (STREAMING, FORA DO CACHE) ---
+
+    def exportacao(self, rota, parametros):
+        """
+        Retorna (tipo de conteúdo, nome do arquivo, gerador de blocos) de uma rota
+        /export/<consulta>. Parâmetros são validados aqui, antes do primeiro byte;
+        os blocos saem lote a lote, sem montar o arquivo inteiro em memória.
+        """
+        formato = _unico(parametros, "formato", "csv")
+        if formato not in FORMATOS_EXPORTACAO:
+            raise ErroConsulta(f"formato deve ser um de {sorted(FORMATOS_EXPORTACAO)}")
+
+        nome = rota.removeprefix("/export/")
+        consultar = {
+            "ranking": lambda p: self.ranking(p, limite_padrao=None),
+            "vcr": self.vcr_selecao,
+            "cubo": self.cubo,
+        }[nome]
+        tipo, extensao = FORMATOS_EXPORTACAO[formato]
+        return tipo, f"{nome}{extensao}", exportar(consultar(parametros), formato)
+
+    def cubo(self, parametros):
+        """
+        Leitura incremental do cubo de rankings (Parquet particionado) filtrada por
+        estados/anos/presets; as partições fora do filtro nem são abertas.
+        """
+        if not os.path.isdir(self.diretorio_cubo):
+            raise ErroConsulta("cubo de rankings não gerado; execute src/ranking_cli.py")
+
+        filtro = None
+        for coluna, valores in (
+            ("estado", _lista(parametros, "estados")),
+            ("ano", [_inteiro("anos", a) for a in _lista(parametros, "anos")]),
+            ("preset", _lista(parametros, "presets")),
+        ):
+            if valores:
+                condicao = pc.field(coluna).isin(valores)
+                filtro = condicao if filtro is None else filtro & condicao
+
+        dataset = ds.dataset(self.diretorio_cubo, format="parquet", partitioning="hive")
+        # Leitura sob demanda, com no máximo um lote adiantado: com threads e a
+        # antecipação padrão, o scanner não espera o cliente e a memória cresce
+        # até o tamanho do cubo
+        return dataset.scanner(
+            filter=filtro,
+            batch_size=TAMANHO_LOTE,
+            use_threads=False,
+            batch_readahead=1,
+            fragment_readahead=1,
+        )
+
+    # --- CONSULTAS ---
+
+    def _estado_ano(self, parametros):
+        estado = _unico(parametros, "estado", TARGET_STATE_NAME)
+        ano = _unico(parametros, "ano")
+        if ano is None:
+            if not self.anos:
+                raise ErroConsulta("nenhum ano com dados")
+            ano = self.anos[-1]
+        ano = _inteiro("ano", ano)
+        if (estado, ano) not in self._bases:
+            raise ErroConsulta(f"estado/ano sem dados: {estado}/{ano}")
+        return estado, ano
+
+    def _pesos(self, parametros):
+        preset = _unico(parametros, "preset", "padrao")
+        if preset not in PRESETS_PESOS:
+            raise ErroConsulta(f"preset desconhecido: {preset}")
+        pesos = dict(PRESETS_PESOS[preset])
+        for chave in CHAVES_PESOS:
+            if chave in parametros:
+                try:
+                    pesos[chave] = float(_unico(parametros, chave))
+                except ValueError:
+                    raise ErroConsulta(f"peso inválido para {chave}") from None
+        return pesos
+
+    def ranking(self, parametros, limite_padrao=LIMITE_PADRAO):
+        """
+        Ranking do Índice de Prioridade Ajustado para um estado/ano e pesos.
+        limite_padrao=None devolve todos os produtos quando `limite` não é informado.
+        """
+        estado, ano = self._estado_ano(parametros)
+        pesos = self._pesos(parametros)
+        limite = _unico(parametros, "limite", limite_padrao)
+        if limite is not None:
+            limite = _inteiro("limite", limite)
+            if limite < 0:
+                raise ErroConsulta("limite não pode ser negativo")
+
+        normas = self._matrizes[estado, ano]
+        # Mesma ordem de soma de calcular_indice_prioridade_ajustado (X + Y + Z + AA)
+        # e mesmo arredondamento de calcular_ranking, para empates iguais aos do cubo
+        indice = normas[:, 0] * pesos["vcr_ceara"]
+        for coluna, chave in enumerate(CHAVES_PESOS[1:], start=1):
+            indice = indice + normas[:, coluna] * pesos[chave]
+        indice = np.round(indice, 3)
+
+        # Ordem decrescente, NaN por último; só as `limite` primeiras linhas saem
+        ordem = np.argsort(np.where(np.isnan(indice), np.inf, -indice), kind="stable")
+        ordem = ordem[:limite]
+        df = self._bases[estado, ano].iloc[ordem].reset_index(drop=True)
+        df["Índice de Prioridade Ajustado"] = indice[ordem]
+        df["ranking"] = np.arange(1, len(df) + 1)
+        return df
+
+    def vcr_selecao(self, parametros):
+        """VCR dentro da seleção de estados/anos/produtos (mesma regra da aba ComexStat)."""
+        anos = [_inteiro("anos", a) for a in _lista(parametros, "anos")]
+        posicoes = self._indice.selecionar(
+            (
+                ("state", _lista(parametros, "estados")),
+                ("year", anos),
+                ("headingCode", _lista(parametros, "hs")),
+            )
+        )
+        df_filtrado = materializar(
+            self.comexstat_df, posicoes, ["state", "headingCode", "heading", "metricFOB"]
+        )
+        return calcular_vcr_dentro_selecao(df_filtrado, self.comexstat_df).reset_index(drop=True)
+
+    def produtos_hs(self, parametros):
+        """Produtos HS4 por prefixo (codigo), intervalo (inicio/fim) ou busca textual (q)."""
+        consulta = _unico(parametros, "q")
+        if consulta:
+            codigos = self._busca.codigos_encontrados(consulta)
+            por_codigo = self._produtos.set_index("codigo")
+            return por_codigo.reindex([c for c in codigos if c in por_codigo.index]).reset_index()
+
+        codigo = _unico(parametros, "codigo")
+        if codigo:
+            if not codigo.isdigit():
+                raise ErroConsulta("codigo deve conter apenas dígitos")
+            inicio, fim = codigo, codigo
+        else:
+            inicio, fim = _unico(parametros, "inicio"), _unico(parametros, "fim")
+        posicoes = self._hierarquia.posicoes(inicio, fim)
+        return self._produtos.iloc[posicoes].reset_index(drop=True)
+
+
+def serializar(df, formato):
+    """DataFrame -> bytes em JSON (registros) ou Arrow IPC (stream)."""
+    if formato == "arrow":
+        tabela = pa.Table.from_pandas(df, preserve_index=False)
+        destino = io.BytesIO()
+        with pa.ipc.new_stream(destino, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+        return destino.getvalue()
+    return df.to_json(orient="records", force_ascii=False).encode("utf-8")
@@ -0,0 +1,218 @@
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from core import runtime
+from core.analytics import carregar_tabela_ncm_xls
+from core.cnae_allocation import matriz_alocacao, ql_emprego_alocado
+from core.config import CACHE_DIR, PRESETS_PESOS
+from core.data_loader import COMEXSTAT_PATH, HARVARD_PATH, NCM_CNAE_PATH, load_data
+from data.data_processor import calcular_ranking, consolidar_metricas
+from data.emprego import ano_referencia, ler_emprego
+
+# Diretório padrão do cubo de rankings (particionado por ano e preset)
+RANKING_CUBE_DIR = os.path.join(CACHE_DIR, "ranking_cube")
+COLUNAS_PARTICAO = ["ano", "preset"]
+
+# Colunas lidas de cada base (o restante não entra nos snapshots)
+COLUNAS_COMEXSTAT = ["year", "state", "headingCode", "heading", "metricFOB"]
+COLUNAS_HARVARD = ["year", "product_hs92_code", "export_rca", "pci", "distance"]
+COLUNAS_QL_EMPREGO = ["year", "state", "headingCode", "QL_Emprego"]
+
+
+# --- 1. SNAPSHOTS ARROW IPC (compartilhados entre processos via memory map) ---
+
+
+def gravar_snapshots(comexstat_df, harvard_df, diretorio, ql_emprego_df=None):
+    """
+    Grava as bases em Arrow IPC sem compressão. Os workers abrem os arquivos com
+    memory map: as páginas ficam no cache do sistema e são compartilhadas, em vez
+    de cada processo receber uma cópia serializada dos DataFrames.
+    O QL do emprego por HS4 (estado x ano do cubo) também vai por snapshot: é
+    calculado no processo principal, porque os workers não leem o store com
+    polars (não é seguro depois de um fork) e, sem cache, refariam a leitura da
+    tabela NCM x CNAE e a matriz de alocação a cada tarefa.
+    """
+    caminhos = {}
+    bases = [
+        ("comexstat", comexstat_df, COLUNAS_COMEXSTAT),
+        ("harvard", harvard_df, COLUNAS_HARVARD),
+    ]
+    if ql_emprego_df is not None:
+        bases.append(("ql_emprego", ql_emprego_df, COLUNAS_QL_EMPREGO))
+    for nome, df, colunas in bases:
+        caminho = os.path.join(diretorio, f"{nome}.arrow")
+        tabela = pa.Table.from_pandas(df[colunas], preserve_index=False)
+        with pa.OSFile(caminho, "wb") as arquivo:
+            with pa.ipc.new_file(arquivo, tabela.schema) as escritor:
+                escritor.write_table(tabela)
+        caminhos[nome] = caminho
+    return caminhos
+
+
+# Estado de cada worker: tabelas Arrow mapeadas em memória e fatias por ano já lidas
+_snapshots = {}
+_fatias_ano = {}
+
+
+def _iniciar_worker(caminhos):
+    """
+    Inicializador do processo: mapeia os snapshots (leitura zero-copy) e desliga o
+    cache do núcleo, já que cada tarefa é única.
+    """
+    runtime.configurar(backend=runtime.SemCache())
+    for nome, caminho in caminhos.items():
+        _snapshots[nome] = pa.ipc.open_file(pa.memory_map(caminho, "r")).read_all()
+    _fatias_ano.clear()
+
+
+def _fatia_do_ano(ano):
+    """Linhas do ano (ComexStat) e a base Harvard, materializadas uma vez por worker."""
+    if ano not in _fatias_ano:
+        comex = _snapshots["comexstat"].filter(pc.field("year") == ano).to_pandas()
+        harvard = _snapshots["harvard"].to_pandas()
+        _fatias_ano[ano] = (comex, harvard)
+    return _fatias_ano[ano]
+
+
+def _ql_emprego_do_par(estado, ano):
+    """QL do emprego por HS4 do estado no ano (snapshot); None sem store de emprego."""
+    if "ql_emprego" not in _snapshots:
+        return None
+    filtro = (pc.field("year") == ano) & (pc.field("state") == estado)
+    return (
+        _snapshots["ql_emprego"].filter(filtro).select(["headingCode", "QL_Emprego"]).to_pandas()
+    )
+
+
+def _ql_emprego_dos_anos(estados, anos):
+    """
+    QL do emprego por HS4 de cada estado x ano do cubo, calculado no processo
+    principal: emprego UF x CNAE do store RAIS (ano sem dados usa o anterior mais
+    próximo), tabela NCM x CNAE e matriz de alocação HS4 montados uma vez.
+    None se o store estiver vazio ou a tabela NCM x CNAE não puder ser lida.
+    """
+    referencias = {ano: ano_referencia(ano) for ano in anos}
+    if None in referencias.values():
+        return None
+    df_ncm = carregar_tabela_ncm_xls(NCM_CNAE_PATH)
+    if df_ncm is None:
+        return None
+
+    alocacao = matriz_alocacao(df_ncm, "headingCode")
+    emprego = {ref: ler_emprego(ref) for ref in set(referencias.values())}
+    partes = [pd.DataFrame(columns=COLUNAS_QL_EMPREGO)]
+    for ano, referencia in referencias.items():
+        for estado in estados:
+            ql = ql_emprego_alocado(emprego[referencia], estado, alocacao)
+            partes.append(ql.assign(year=ano, state=estado)[COLUNAS_QL_EMPREGO])
+    return pd.concat(partes, ignore_index=True).astype(
+        {"year": "int64", "state": str, "headingCode": str, "QL_Emprego": float}
+    )
+
+
+# --- 2. TAREFA (um estado x um ano, todos os presets) ---
+
+
+def _ranking_estado_ano(estado, ano, presets):
+    """
+    Métricas do par (estado, ano) calculadas uma vez e reaproveitadas para cada
+    preset de pesos. Retorna as linhas do cubo já com as colunas de partição.
+    """
+    comex, harvard = _fatia_do_ano(ano)
+    df_metricas = consolidar_metricas(
+        comex, harvard, estado, ano, df_ql_emprego=_ql_emprego_do_par(estado, ano)
+    )
+
+    partes = []
+    for preset in presets:
+        df_ranking = calcular_ranking(df_metricas, PRESETS_PESOS[preset])
+        df_ranking["ranking"] = (
+            df_ranking["Índice de Prioridade Ajustado"]
+            .rank(ascending=False, method="first")
+            .astype("Int32")
+        )
+        df_ranking.insert(0, "estado", estado)
+        df_ranking["ano"] = ano
+        df_ranking["preset"] = preset
+        partes.append(df_ranking)
+    return pd.concat(partes, ignore_index=True)
+
+
+# --- 3. ORQUESTRAÇÃO ---
+
+
+def gerar_cubo_rankings(
+    comexstat_df,
+    harvard_df,
+    estados=None,
+    anos=None,
+    presets=None,
+    destino=RANKING_CUBE_DIR,
+    workers=None,
+):
+    """
+    Calcula VCR, cenários e Índice de Prioridade para todo estado x ano x preset,
+    distribuindo os pares (estado, ano) num pool de processos, e grava um único
+    cubo Parquet particionado por ano/preset em `destino`.
+    Retorna um resumo (contagens e tempo).
+    """
+    inicio = time.perf_counter()
+    estados = estados or sorted(comexstat_df["state"].dropna().unique())
+    anos = anos or sorted(int(a) for a in comexstat_df["year"].dropna().unique())
+    presets = presets or list(PRESETS_PESOS)
+    desconhecidos = set(presets) - set(PRESETS_PESOS)
+    if desconhecidos:
+        runtime.falhar(f"Preset(s) de pesos desconhecido(s): {sorted(desconhecidos)}")
+
+    # Ordenadas por ano, as tarefas de um mesmo ano tendem a cair no mesmo worker
+    tarefas = [(estado, ano) for ano in anos for estado in estados]
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=CACHE_DIR) as diretorio:
+        caminhos = gravar_snapshots(
+            comexstat_df, harvard_df, diretorio, _ql_emprego_dos_anos(estados, anos)
+        )
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_iniciar_worker, initargs=(caminhos,)
+        ) as pool:
+            futuros = [
+                pool.submit(_ranking_estado_ano, estado, ano, presets)
+                for estado, ano in tarefas
+            ]
+            partes = [futuro.result() for futuro in futuros]
+
+    df_cubo = pd.concat(partes, ignore_index=True)
+    pq.write_to_dataset(
+        pa.Table.from_pandas(df_cubo, preserve_index=False),
+        destino,
+        partition_cols=COLUNAS_PARTICAO,
+        existing_data_behavior="delete_matching",
+    )
+
+    return {
+        "estados": len(estados),
+        "anos": anos,
+        "presets": presets,
+        "linhas": len(df_cubo),
+        "destino": destino,
+        "segundos": round(time.perf_counter() - inicio, 2),
+    }
+
+
+def carregar_bases():
+    """ComexStat e Harvard nos mesmos formatos usados pelo dashboard."""
+    for path in (COMEXSTAT_PATH, HARVARD_PATH):
+        if not os.path.exists(path):
+            runtime.falhar(
+                f"Arquivo '{path}' não encontrado. Execute o script 'main.py' primeiro."
+            )
+    comexstat_df = load_data(COMEXSTAT_PATH)
+    comexstat_df["headingCode"] = comexstat_df["headingCode"].astype(str)
+    return comexstat_df, load_data(HARVARD_PATH)
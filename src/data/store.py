@@ -0,0 +1,131 @@
+import glob
+import os
+
+import polars as pl
+
+from core.data_loader import versao_arquivos
+
+# Stores locais particionados no estilo hive (year=<ano>/[monthNumber=<mês>/]):
+# cada partição guarda uma ou mais fatias <nome>.parquet, identificadas pela origem
+# (ex: "importado" para extrações locais, "api" ou "uf-<código>" para downloads)
+FATIA_IMPORTADA = "importado"
+
+# Escopo de uma fatia que cobre a partição inteira (ex: o ano ou mês completo)
+PARTICAO_INTEIRA = pl.lit(True)
+
+
+# --- 1. GRAVAÇÃO ---
+
+
+def pasta_particao(destino, **chaves):
+    """`destino/<coluna>=<valor>/...`, na ordem das chaves."""
+    return os.path.join(destino, *(f"{coluna}={valor}" for coluna, valor in chaves.items()))
+
+
+def gravar_fatia(lf, pasta, nome, escopo=None):
+    """
+    Grava `pasta/<nome>.parquet` em streaming (o LazyFrame não é materializado),
+    num temporário trocado de uma vez: leitores nunca veem um arquivo pela metade.
+    Regravar o mesmo nome substitui só essa fatia.
+
+    `escopo` é a expressão das linhas que a fatia cobre (ex: pl.col("state") ==
+    "Ceará", ou PARTICAO_INTEIRA): essas linhas saem das outras fatias da
+    partição, que são apagadas se ficarem vazias. Assim uma extração local e um
+    download do mesmo período não são somados nas leituras da partição.
+    """
+    os.makedirs(pasta, exist_ok=True)
+    caminho = os.path.join(pasta, f"{nome}.parquet")
+    lf.sink_parquet(caminho + ".tmp", compression="zstd")
+    if escopo is not None:
+        _remover_escopo(pasta, caminho, escopo.fill_null(False))
+    os.replace(caminho + ".tmp", caminho)
+    return caminho
+
+
+def _remover_escopo(pasta, caminho, escopo):
+    """Tira das outras fatias da partição as linhas cobertas pela nova fatia."""
+    for outra in glob.glob(os.path.join(pasta, "*.parquet")):
+        if outra == caminho:
+            continue
+        fatia = pl.scan_parquet(outra)
+        cobertas = fatia.filter(escopo).select(pl.len()).collect().item()
+        if cobertas == 0:
+            continue
+        if cobertas == contar_linhas(outra):
+            os.remove(outra)
+        else:
+            fatia.filter(~escopo).sink_parquet(outra + ".tmp", compression="zstd")
+            os.replace(outra + ".tmp", outra)
+
+
+def contar_linhas(caminho):
+    return pl.scan_parquet(caminho).select(pl.len()).collect().item()
+
+
+# --- 2. INGESTÃO DE DATASETS PARQUET ---
+
+
+def normalizar_colunas(lf, colunas):
+    """Colunas e tipos do store: cada coluna de `colunas` convertida, ou nula se ausente."""
+    presentes = lf.collect_schema().names()
+    return lf.select(
+        [
+            pl.col(nome).cast(tipo) if nome in presentes else pl.lit(None, tipo).alias(nome)
+            for nome, tipo in colunas.items()
+        ]
+    )
+
+
+def importar_parquet(
+    origem, destino, normalizar, particoes=("year",), anos=None, escopo=None
+):
+    """
+    Importa um dataset Parquet (particionado no estilo hive) para o store, uma
+    partição por vez e em streaming, sem carregar a origem na memória. Cada
+    partição vira a fatia FATIA_IMPORTADA, passada por `normalizar` (LazyFrame ->
+    LazyFrame no esquema do store) e gravada com `escopo` (ver gravar_fatia). Retorna as linhas gravadas por partição (o ano,
+    ou a tupla de valores com mais de uma coluna de partição).
+    """
+    particoes = list(particoes)
+    fonte = pl.scan_parquet(os.path.join(origem, "**", "*.parquet"), hive_partitioning=True)
+    combinacoes = (
+        fonte.select(particoes).unique().sort(particoes).collect(engine="streaming")
+    )
+    linhas = {}
+    for valores in combinacoes.iter_rows():
+        if anos and valores[0] not in anos:
+            continue
+        chaves = dict(zip(particoes, valores))
+        filtro = pl.all_horizontal([pl.col(c) == v for c, v in chaves.items()])
+        caminho = gravar_fatia(
+            normalizar(fonte.filter(filtro)),
+            pasta_particao(destino, **chaves),
+            FATIA_IMPORTADA,
+            escopo,
+        )
+        linhas[valores[0] if len(valores) == 1 else valores] = contar_linhas(caminho)
+    return linhas
+
+
+# --- 3. LEITURA: PARTIÇÕES E VERSÃO ---
+
+
+def anos_disponiveis(diretorio):
+    """Anos (year=) do store com pelo menos uma fatia gravada."""
+    return sorted(
+        int(os.path.basename(pasta).removeprefix("year="))
+        for pasta in glob.glob(os.path.join(diretorio, "year=*"))
+        if glob.glob(os.path.join(pasta, "**", "*.parquet"), recursive=True)
+    )
+
+
+def versao_store(diretorio):
+    """Chave de versão do store (caminho e data de modificação de cada fatia)."""
+    return versao_arquivos(
+        *sorted(glob.glob(os.path.join(diretorio, "year=*", "**", "*.parquet"), recursive=True))
+    )
+
+
+def versao_arquivo(caminho):
+    """Chave de versão de um arquivo derivado (vazia se ainda não foi gerado)."""
+    return versao_arquivos(caminho) if os.path.exists(caminho) else ""
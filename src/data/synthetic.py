@@ -0,0 +1,623 @@
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+from core import runtime
+from core.config import CACHE_DIR
+from core.data_loader import COMEXSTAT_PATH, COMTRADE_PATH, HARVARD_PATH
+from core.hs_hierarchy import normalizar_codigo_hs
+
+# Diretório padrão das bases sintéticas (um subdiretório por escala)
+SYNTHETIC_DIR = os.path.join(CACHE_DIR, "sintetico")
+SEMENTE_PADRAO = 42
+ANO_FINAL_PADRAO = 2023
+
+# Escalas relativas à amostra do repositório (1 ano, estado x HS4, ~13,5 mil linhas).
+# "100x" e "municipal_mensal" detalham mês (e município); o CSV anual por estado
+# continua sendo gerado, agregado do nível fino.
+ESCALAS = {
+    "1x": {"anos": 1, "mensal": False, "municipal": False},
+    "10x": {"anos": 10, "mensal": False, "municipal": False},
+    "100x": {"anos": 10, "mensal": True, "municipal": False},
+    "municipal_mensal": {"anos": 3, "mensal": True, "municipal": True},
+}
+
+# UF: (sigla, código IBGE, nº de municípios, % do FOB nacional, nº de HS4 exportados).
+# Participação e diversificação aproximam as exportações de 2023 (amostra do repo).
+ESTADOS = {
+    "São Paulo": ("SP", 35, 645, 20.0, 1156),
+    "Rio de Janeiro": ("RJ", 33, 92, 13.0, 912),
+    "Minas Gerais": ("MG", 31, 853, 11.0, 890),
+    "Mato Grosso": ("MT", 51, 141, 9.0, 186),
+    "Paraná": ("PR", 41, 399, 7.0, 979),
+    "Rio Grande do Sul": ("RS", 43, 497, 6.5, 975),
+    "Pará": ("PA", 15, 144, 6.0, 526),
+    "Goiás": ("GO", 52, 246, 4.0, 489),
+    "Santa Catarina": ("SC", 42, 295, 3.5, 949),
+    "Mato Grosso do Sul": ("MS", 50, 79, 3.0, 388),
+    "Bahia": ("BA", 29, 417, 3.0, 637),
+    "Espírito Santo": ("ES", 32, 78, 2.8, 720),
+    "Não Declarada": ("ND", 0, 1, 3.0, 516),
+    "Maranhão": ("MA", 21, 217, 1.5, 491),
+    "Tocantins": ("TO", 17, 139, 0.8, 43),
+    "Pernambuco": ("PE", 26, 185, 0.8, 438),
+    "Ceará": ("CE", 23, 184, 0.6, 584),
+    "Rondônia": ("RO", 11, 52, 0.6, 173),
+    "Amazonas": ("AM", 13, 62, 0.3, 522),
+    "Piauí": ("PI", 22, 224, 0.3, 47),
+    "Alagoas": ("AL", 27, 102, 0.2, 415),
+    "Rio Grande do Norte": ("RN", 24, 167, 0.2, 187),
+    "Paraíba": ("PB", 25, 223, 0.1, 113),
+    "Distrito Federal": ("DF", 53, 1, 0.1, 178),
+    "Sergipe": ("SE", 28, 75, 0.05, 64),
+    "Amapá": ("AP", 16, 16, 0.05, 370),
+    "Roraima": ("RR", 14, 15, 0.03, 410),
+    "Acre": ("AC", 12, 22, 0.01, 147),
+}
+
+# Economias do Atlas (Harvard) e repórteres do Comtrade; o restante até N_PAISES
+# recebe códigos sintéticos (X01, X02...). country_id cabe no Int8 de load_data.
+PAISES = [
+    ("CHN", 156, "China"), ("USA", 842, "USA"), ("DEU", 276, "Germany"),
+    ("NLD", 528, "Netherlands"), ("JPN", 392, "Japan"), ("ITA", 380, "Italy"),
+    ("FRA", 251, "France"), ("KOR", 410, "Rep. of Korea"), ("CAN", 124, "Canada"),
+    ("MEX", 484, "Mexico"), ("BEL", 56, "Belgium"), ("GBR", 826, "United Kingdom"),
+    ("IND", 699, "India"), ("SGP", 702, "Singapore"), ("ESP", 724, "Spain"),
+    ("CHE", 757, "Switzerland"), ("RUS", 643, "Russian Federation"),
+    ("SAU", 682, "Saudi Arabia"), ("ARE", 784, "United Arab Emirates"),
+    ("AUS", 36, "Australia"), ("VNM", 704, "Viet Nam"), ("MYS", 458, "Malaysia"),
+    ("POL", 616, "Poland"), ("THA", 764, "Thailand"), ("IDN", 360, "Indonesia"),
+    ("BRA", 76, "Brazil"), ("SWE", 752, "Sweden"), ("AUT", 40, "Austria"),
+    ("CZE", 203, "Czechia"), ("IRL", 372, "Ireland"), ("NOR", 579, "Norway"),
+    ("TUR", 792, "Türkiye"), ("DNK", 208, "Denmark"), ("ISR", 376, "Israel"),
+    ("ZAF", 710, "South Africa"), ("CHL", 152, "Chile"), ("ARG", 32, "Argentina"),
+    ("PHL", 608, "Philippines"), ("HUN", 348, "Hungary"), ("FIN", 246, "Finland"),
+    ("PRT", 620, "Portugal"), ("QAT", 634, "Qatar"), ("KAZ", 398, "Kazakhstan"),
+    ("NGA", 566, "Nigeria"), ("COL", 170, "Colombia"), ("PER", 604, "Peru"),
+    ("EGY", 818, "Egypt"), ("MAR", 504, "Morocco"), ("PAK", 586, "Pakistan"),
+    ("BGD", 50, "Bangladesh"), ("NZL", 554, "New Zealand"), ("GRC", 300, "Greece"),
+    ("ROU", 642, "Romania"), ("UKR", 804, "Ukraine"), ("ECU", 218, "Ecuador"),
+    ("URY", 858, "Uruguay"), ("PRY", 600, "Paraguay"), ("BOL", 68, "Bolivia"),
+    ("AGO", 24, "Angola"), ("COD", 180, "Dem. Rep. of the Congo"),
+]
+N_PAISES = 120
+
+# Mês com fatia menor que isto (do valor anual do fluxo) não é registrado
+LIMIAR_MES = 0.02
+
+COLUNAS_PARTICAO = {"comexstat": ["year"], "harvard": ["year"], "comtrade": ["refYear"]}
+
+SCHEMA_COMEXSTAT = pa.schema(
+    [
+        ("year", pa.int64()),
+        ("state", pa.string()),
+        ("headingCode", pa.string()),
+        ("heading", pa.string()),
+        ("metricFOB", pa.int64()),
+    ]
+)
+# Nível fino (Parquet): mês e município, quando a escala os detalha
+COLUNAS_MENSAIS = [("monthNumber", pa.int8())]
+COLUNAS_MUNICIPAIS = [("cityCode", pa.int32()), ("city", pa.string())]
+
+SCHEMA_HARVARD = pa.schema(
+    [
+        ("country_id", pa.int8()),
+        ("country_iso3_code", pa.string()),
+        ("product_id", pa.int64()),
+        ("product_hs92_code", pa.string()),
+        ("year", pa.int64()),
+        ("export_value", pa.int64()),
+        ("import_value", pa.int64()),
+        ("global_share", pa.float64()),
+        ("export_rca", pa.float64()),
+        ("distance", pa.float64()),
+        ("cog", pa.float64()),
+        ("pci", pa.float64()),
+    ]
+)
+
+SCHEMA_COMTRADE = pa.schema(
+    [
+        ("typeCode", pa.string()),
+        ("freqCode", pa.string()),
+        ("refPeriodId", pa.int32()),
+        ("refYear", pa.int16()),
+        ("refMonth", pa.int16()),
+        ("period", pa.int64()),
+        ("reporterCode", pa.string()),
+        ("reporterISO", pa.string()),
+        ("reporterDesc", pa.string()),
+        ("flowCode", pa.string()),
+        ("flowDesc", pa.string()),
+        ("partnerCode", pa.string()),
+        ("partnerISO", pa.string()),
+        ("partnerDesc", pa.string()),
+        ("partner2Code", pa.string()),
+        ("partner2ISO", pa.string()),
+        ("partner2Desc", pa.string()),
+        ("classificationCode", pa.string()),
+        ("classificationSearchCode", pa.string()),
+        ("isOriginalClassification", pa.bool_()),
+        ("cmdCode", pa.string()),
+        ("cmdDesc", pa.string()),
+        ("aggrLevel", pa.int8()),
+        ("isLeaf", pa.bool_()),
+        ("customsCode", pa.string()),
+        ("customsDesc", pa.string()),
+        ("mosCode", pa.string()),
+        ("motCode", pa.string()),
+        ("motDesc", pa.string()),
+        ("qtyUnitCode", pa.string()),
+        ("qtyUnitAbbr", pa.string()),
+        ("qty", pa.float64()),
+        ("isQtyEstimated", pa.bool_()),
+        ("altQtyUnitCode", pa.string()),
+        ("altQtyUnitAbbr", pa.string()),
+        ("altQty", pa.float64()),
+        ("isAltQtyEstimated", pa.bool_()),
+        ("netWgt", pa.float64()),
+        ("isNetWgtEstimated", pa.bool_()),
+        ("grossWgt", pa.float64()),
+        ("isGrossWgtEstimated", pa.bool_()),
+        ("cifvalue", pa.float64()),
+        ("fobvalue", pa.float64()),
+        ("primaryValue", pa.float64()),
+        ("legacyEstimationFlag", pa.string()),
+        ("isReported", pa.bool_()),
+        ("isAggregate", pa.bool_()),
+    ]
+)
+
+# Colunas do Comtrade fixas na consulta do projeto (exportações para o Brasil, HS4)
+CONSTANTES_COMTRADE = {
+    "typeCode": "C",
+    "flowCode": "X",
+    "flowDesc": "Export",
+    "partnerCode": "76",
+    "partnerISO": "BRA",
+    "partnerDesc": "Brazil",
+    "partner2Code": "0",
+    "partner2ISO": "W00",
+    "partner2Desc": "World",
+    "classificationCode": "H4",
+    "classificationSearchCode": "HS",
+    "isOriginalClassification": True,
+    "aggrLevel": 4,
+    "isLeaf": False,
+    "customsCode": "C00",
+    "customsDesc": "TOTAL CPC",
+    "mosCode": "0",
+    "motCode": "0",
+    "motDesc": "TOTAL MOT",
+    "qtyUnitCode": "8",
+    "qtyUnitAbbr": "kg",
+    "isQtyEstimated": False,
+    "altQtyUnitCode": "8",
+    "altQtyUnitAbbr": "kg",
+    "isAltQtyEstimated": False,
+    "isNetWgtEstimated": False,
+    "grossWgt": 0.0,
+    "isGrossWgtEstimated": False,
+    "cifvalue": None,
+    "legacyEstimationFlag": "0",
+    "isReported": False,
+    "isAggregate": True,
+}
+
+# Exportações totais do país no ano final (US$) e crescimento médio anual
+FOB_TOTAL_BRASIL = 340e9
+CRESCIMENTO_ANUAL = 0.05
+
+
+# --- 1. CATÁLOGO E PARÂMETROS LATENTES ---
+
+
+def catalogo_produtos(caminho=COMEXSTAT_PATH):
+    """
+    Produtos HS4 (código, descrição) das bases sintéticas: os da amostra do
+    ComexStat, quando o arquivo existe, ou um catálogo sintético de ~1.250 posições.
+    """
+    if os.path.exists(caminho):
+        df = pd.read_csv(caminho, usecols=["headingCode", "heading"], dtype=str)
+        df["headingCode"] = normalizar_codigo_hs(df["headingCode"], 4)
+        df = df.dropna().groupby("headingCode", as_index=False)["heading"].first()
+        return df.rename(columns={"headingCode": "codigo", "heading": "descricao"})
+
+    codigos = [f"{cap:02d}{pos:02d}" for cap in range(1, 98) if cap != 77 for pos in range(1, 14)]
+    return pd.DataFrame(
+        {"codigo": codigos, "descricao": [f"Produto sintético {c}" for c in codigos]}
+    )
+
+
+class GeradorSintetico:
+    """
+    Modelo das bases sintéticas. Os parâmetros latentes (porte, ubiquidade e
+    complexidade de cada produto; afinidade estado x produto) são sorteados uma vez
+    a partir da semente; cada tabela/ano usa um gerador derivado de
+    (semente, tabela, ano), então o resultado não depende da ordem de geração.
+
+    - Cobertura esparsa e aninhada: estados/países pouco diversificados exportam só
+      produtos ubíquos (P = cobertura ** rigidez do produto).
+    - Valores de cauda pesada: porte do produto e afinidade são log-normais; o total
+      de cada estado segue a participação em ESTADOS.
+    """
+
+    def __init__(self, produtos, semente=SEMENTE_PADRAO, ano_final=ANO_FINAL_PADRAO):
+        self.produtos = produtos.reset_index(drop=True)
+        self.semente = semente
+        self.ano_final = ano_final
+        self.estados = list(ESTADOS)
+        n_produtos = len(self.produtos)
+        rng = self._rng("latentes")
+
+        # Rigidez > 1: produto pouco ubíquo (e, no modelo, mais complexo)
+        self.rigidez = np.exp(rng.normal(0.0, 0.9, n_produtos))
+        self.porte = np.exp(rng.normal(0.0, 2.2, n_produtos))
+        pci = np.log(self.rigidez) + rng.normal(0.0, 0.35, n_produtos)
+        self.pci = (pci - pci.mean()) / pci.std()
+
+        cobertura = np.array([v[4] for v in ESTADOS.values()]) / 1206
+        self.p_estado = np.clip(cobertura[:, None] ** self.rigidez[None, :], 0.0, 1.0)
+        self.u_estado = rng.random((len(ESTADOS), n_produtos))
+        self.afinidade_estado = np.exp(rng.normal(0.0, 2.6, (len(ESTADOS), n_produtos)))
+        self.participacao = np.array([v[3] for v in ESTADOS.values()])
+        self.participacao = self.participacao / self.participacao.sum()
+
+        # Países: BRA usa o total do ComexStat; os demais, porte de Pareto
+        paises = list(PAISES) + [
+            (f"X{i:02d}", 900 + i, f"Synthetic Economy {i:02d}")
+            for i in range(1, N_PAISES - len(PAISES) + 1)
+        ]
+        self.paises = pd.DataFrame(paises, columns=["iso3", "codigo", "nome"])
+        ordem = np.arange(1, len(paises) + 1)
+        self.porte_pais = ordem ** -1.1
+        cobertura_pais = np.clip(0.97 * ordem ** -0.3, 0.02, 1.0)
+        self.p_pais = cobertura_pais[:, None] ** self.rigidez[None, :]
+        self.u_pais = rng.random((len(paises), n_produtos))
+        self.afinidade_pais = np.exp(rng.normal(0.0, 1.6, (len(paises), n_produtos)))
+        self.sazonalidade_fase = rng.uniform(0, 12, n_produtos)
+        self.sazonalidade_amplitude = rng.uniform(0.0, 0.8, n_produtos)
+        self.preco_kg = np.exp(rng.normal(1.0, 1.5, n_produtos))
+
+    def _rng(self, *chave):
+        """Gerador derivado de (semente, chave...), estável entre execuções."""
+        entropia = [self.semente] + [
+            int.from_bytes(str(parte).encode(), "little") % (2**32) for parte in chave
+        ]
+        return np.random.default_rng(entropia)
+
+    def _fob_total(self, ano, rng):
+        anos_antes = self.ano_final - ano
+        return FOB_TOTAL_BRASIL * (1 + CRESCIMENTO_ANUAL) ** -anos_antes * rng.lognormal(0, 0.05)
+
+    # --- 2. COMEXSTAT ---
+
+    def comexstat(self, ano, mensal=False, municipal=False):
+        """
+        Linhas do ComexStat de um ano no nível fino da escala (estado ou município,
+        anual ou mensal), com as colunas de load_data + monthNumber/cityCode/city.
+        """
+        rng = self._rng("comexstat", ano)
+        presente = (self.u_estado + rng.normal(0.0, 0.04, self.u_estado.shape)) < self.p_estado
+        valores = np.where(
+            presente,
+            self.porte[None, :] * self.afinidade_estado * rng.lognormal(0, 0.3, presente.shape),
+            0.0,
+        )
+        # Total de cada estado conforme a participação no FOB nacional
+        totais = valores.sum(axis=1, keepdims=True)
+        valores *= np.divide(
+            self.participacao[:, None] * self._fob_total(ano, rng),
+            totais,
+            out=np.zeros_like(totais),
+            where=totais > 0,
+        )
+        i_estado, i_produto = np.nonzero(valores)
+        df = pd.DataFrame(
+            {"estado": i_estado, "produto": i_produto, "fob": valores[i_estado, i_produto]}
+        )
+
+        if municipal:
+            df = self._distribuir_municipios(df, rng)
+        if mensal:
+            df = self._distribuir_meses(df, rng)
+
+        df["fob"] = np.floor(df["fob"]).astype("int64")
+        saida = pd.DataFrame(
+            {
+                "year": np.int64(ano),
+                "state": np.array(self.estados, dtype=object)[df["estado"].to_numpy()],
+                "headingCode": self.produtos["codigo"].to_numpy()[df["produto"].to_numpy()],
+                "heading": self.produtos["descricao"].to_numpy()[df["produto"].to_numpy()],
+                "metricFOB": df["fob"].to_numpy(),
+            }
+        )
+        if mensal:
+            saida["monthNumber"] = df["mes"].to_numpy().astype("int8")
+        if municipal:
+            saida["cityCode"] = df["municipio_codigo"].to_numpy().astype("int32")
+            saida["city"] = df["municipio"].to_numpy()
+        return saida
+
+    def _distribuir_municipios(self, df, rng):
+        """
+        Reparte o valor de cada (estado, produto) entre poucos municípios do estado,
+        escolhidos com peso de Zipf (a exportação é concentrada em poucos polos).
+        """
+        partes = []
+        for i_estado, grupo in df.groupby("estado", sort=True):
+            nome = self.estados[i_estado]
+            sigla, ibge, n_municipios = ESTADOS[nome][:3]
+            pesos = np.arange(1, n_municipios + 1) ** -1.2
+            pesos /= pesos.sum()
+
+            n_por_linha = 1 + rng.poisson(min(3.0, n_municipios / 40), len(grupo))
+            linha = np.repeat(np.arange(len(grupo)), n_por_linha)
+            municipio = rng.choice(n_municipios, size=len(linha), p=pesos)
+            fatias = pd.DataFrame(
+                {"linha": linha, "municipio": municipio, "peso": rng.gamma(0.7, 1.0, len(linha))}
+            ).groupby(["linha", "municipio"], as_index=False)["peso"].sum()
+            fatias["peso"] /= fatias.groupby("linha")["peso"].transform("sum")
+
+            base = grupo.iloc[fatias["linha"].to_numpy()].reset_index(drop=True)
+            base["fob"] = base["fob"].to_numpy() * fatias["peso"].to_numpy()
+            indice = fatias["municipio"].to_numpy()
+            if sigla == "ND":
+                base["municipio_codigo"] = 0
+                base["municipio"] = nome
+            else:
+                base["municipio_codigo"] = ibge * 100000 + indice + 1
+                base["municipio"] = [f"Município {sigla}-{i + 1:04d}" for i in indice]
+            partes.append(base)
+        return pd.concat(partes, ignore_index=True)
+
+    def _distribuir_meses(self, df, rng):
+        """
+        Reparte cada fluxo anual em meses (gama x sazonalidade do produto); meses
+        com fatia < LIMIAR_MES ficam sem registro e o restante é renormalizado.
+        """
+        meses = np.arange(1, 13)
+        produto = df["produto"].to_numpy()
+        sazonal = 1 + self.sazonalidade_amplitude[produto, None] * np.cos(
+            2 * np.pi * (meses[None, :] - self.sazonalidade_fase[produto, None]) / 12
+        )
+        pesos = rng.gamma(1.2, 1.0, (len(df), 12)) * sazonal
+        pesos /= pesos.sum(axis=1, keepdims=True)
+        pesos[pesos < LIMIAR_MES] = 0.0
+        pesos /= pesos.sum(axis=1, keepdims=True)
+
+        linha, mes = np.nonzero(pesos)
+        mensal = df.iloc[linha].reset_index(drop=True)
+        mensal["fob"] = mensal["fob"].to_numpy() * pesos[linha, mes]
+        mensal["mes"] = mes + 1
+        return mensal
+
+    # --- 3. HARVARD (ATLAS) ---
+
+    def harvard(self, ano, fob_brasil):
+        """
+        Linhas país x produto do ano, no formato do Atlas. A linha do Brasil usa o FOB
+        por produto do ComexStat sintético (fob_brasil, indexado como o catálogo),
+        para que VCR estadual e VCR país-mundo venham da mesma base.
+        """
+        rng = self._rng("harvard", ano)
+        presente = (self.u_pais + rng.normal(0.0, 0.04, self.u_pais.shape)) < self.p_pais
+        valores = np.where(
+            presente,
+            self.porte_pais[:, None]
+            * self.porte[None, :]
+            * self.afinidade_pais
+            * rng.lognormal(0, 0.3, presente.shape),
+            0.0,
+        )
+        # Mundo ~ 20x o Brasil; cada país recebe seu porte relativo
+        valores *= 20 * self._fob_total(ano, rng) / valores.sum()
+        i_brasil = int(np.flatnonzero(self.paises["iso3"] == "BRA")[0])
+        valores[i_brasil] = fob_brasil
+
+        total_pais = valores.sum(axis=1, keepdims=True)
+        total_produto = valores.sum(axis=0, keepdims=True)
+        total = valores.sum()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rca = (valores / total_pais) / (total_produto / total)
+            participacao = valores / total_produto
+
+        i_pais, i_produto = np.nonzero(valores)
+        rca = rca[i_pais, i_produto]
+        pci = self.pci[i_produto] + rng.normal(0, 0.05, len(i_produto))
+        distancia = np.clip(
+            0.93 - 0.06 * np.log1p(rca) + rng.normal(0, 0.03, len(rca)), 0.5, 1.0
+        )
+        return pd.DataFrame(
+            {
+                "country_id": (i_pais + 1).astype("int8"),
+                "country_iso3_code": self.paises["iso3"].to_numpy()[i_pais],
+                "product_id": i_produto.astype("int64"),
+                "product_hs92_code": self.produtos["codigo"].to_numpy()[i_produto],
+                "year": np.int64(ano),
+                "export_value": np.floor(valores[i_pais, i_produto]).astype("int64"),
+                "import_value": np.floor(
+                    valores[i_pais, i_produto] * rng.lognormal(0, 1.0, len(i_pais))
+                ).astype("int64"),
+                "global_share": participacao[i_pais, i_produto],
+                "export_rca": rca,
+                "distance": distancia,
+                "cog": (pci - pci.mean()) * (1 - distancia) + rng.normal(0, 0.05, len(pci)),
+                "pci": pci,
+            }
+        )
+
+    # --- 4. COMTRADE ---
+
+    def comtrade(self, ano, df_harvard, mensal=False):
+        """
+        Exportações de outros países para o Brasil (parceiro 76) por HS4: uma fração
+        pequena das linhas do Atlas do ano, com o valor destinado ao Brasil.
+        """
+        rng = self._rng("comtrade", ano)
+        base = df_harvard[df_harvard["country_iso3_code"] != "BRA"]
+        base = base[rng.random(len(base)) < 0.05].reset_index(drop=True)
+        df = pd.DataFrame(
+            {
+                "estado": base["country_id"].to_numpy().astype(int) - 1,  # índice do país
+                "produto": base["product_id"].to_numpy(),
+                "fob": base["export_value"].to_numpy() * rng.beta(0.6, 25.0, len(base)),
+            }
+        )
+        if mensal:
+            df = self._distribuir_meses(df, rng)
+            meses = df["mes"].to_numpy()
+            periodo = ano * 100 + meses
+            ref_periodo = periodo * 100 + 1
+            frequencia = "M"
+        else:
+            meses = np.full(len(df), 52)  # 52 = ano inteiro, como na API
+            periodo = np.full(len(df), ano)
+            ref_periodo = np.full(len(df), ano * 10000 + 101)
+            frequencia = "A"
+
+        fob = np.round(df["fob"].to_numpy(), 3)
+        peso = np.round(fob / self.preco_kg[df["produto"].to_numpy()], 1)
+        paises = self.paises.iloc[df["estado"].to_numpy()]
+        produtos = self.produtos.iloc[df["produto"].to_numpy()]
+        colunas = {
+            "freqCode": frequencia,
+            "refPeriodId": ref_periodo.astype("int32"),
+            "refYear": np.int16(ano),
+            "refMonth": meses.astype("int16"),
+            "period": periodo.astype("int64"),
+            "reporterCode": paises["codigo"].astype(str).to_numpy(),
+            "reporterISO": paises["iso3"].to_numpy(),
+            "reporterDesc": paises["nome"].to_numpy(),
+            "cmdCode": produtos["codigo"].to_numpy(),
+            "cmdDesc": produtos["descricao"].to_numpy(),
+            "qty": peso,
+            "altQty": peso,
+            "netWgt": peso,
+            "fobvalue": fob,
+            "primaryValue": fob,
+        }
+        saida = pd.DataFrame({"typeCode": np.full(len(df), CONSTANTES_COMTRADE["typeCode"])})
+        for nome in SCHEMA_COMTRADE.names:
+            saida[nome] = colunas.get(nome, CONSTANTES_COMTRADE.get(nome))
+        return saida
+
+
+# --- 5. GRAVAÇÃO (CSV NOS FORMATOS DE load_data + PARQUET PARTICIONADO) ---
+
+
+def _tabela(df, schema):
+    return pa.Table.from_pandas(df[schema.names], schema=schema, preserve_index=False)
+
+
+def gerar_bases_sinteticas(
+    escala="1x",
+    semente=SEMENTE_PADRAO,
+    destino=None,
+    ano_final=ANO_FINAL_PADRAO,
+    produtos=None,
+):
+    """
+    Gera ComexStat, Harvard e Comtrade sintéticos na escala pedida, ano a ano:
+
+    - `destino/resources/*.csv`: mesmos nomes e colunas de load_data (ComexStat anual
+      por estado), para rodar dashboard, API e CLIs com `destino` como diretório atual;
+    - `destino/parquet/<base>/`: Parquet particionado por ano (e mês), no nível fino da
+      escala (mês/município no ComexStat);
+    - `destino/manifesto.json`: parâmetros e contagens de linhas.
+
+    A mesma semente (e o mesmo catálogo) reproduz os mesmos arquivos.
+    """
+    if escala not in ESCALAS:
+        runtime.falhar(f"Escala desconhecida: {escala} (opções: {sorted(ESCALAS)})")
+    inicio = time.perf_counter()
+    parametros = ESCALAS[escala]
+    destino = destino or os.path.join(SYNTHETIC_DIR, escala)
+    anos = list(range(ano_final - parametros["anos"] + 1, ano_final + 1))
+    gerador = GeradorSintetico(
+        catalogo_produtos() if produtos is None else produtos, semente, ano_final
+    )
+
+    schema_fino = SCHEMA_COMEXSTAT
+    for coluna, tipo in (COLUNAS_MENSAIS if parametros["mensal"] else []) + (
+        COLUNAS_MUNICIPAIS if parametros["municipal"] else []
+    ):
+        schema_fino = schema_fino.append(pa.field(coluna, tipo))
+    particoes = dict(COLUNAS_PARTICAO)
+    if parametros["mensal"]:
+        particoes["comexstat"] = ["year", "monthNumber"]
+
+    pasta_csv = os.path.join(destino, "resources")
+    pasta_parquet = os.path.join(destino, "parquet")
+    os.makedirs(pasta_csv, exist_ok=True)
+    for base in particoes:
+        shutil.rmtree(os.path.join(pasta_parquet, base), ignore_errors=True)
+
+    opcoes_csv = pacsv.WriteOptions(quoting_style="needed")
+    caminhos_csv = {
+        "comexstat": (os.path.join(destino, COMEXSTAT_PATH), SCHEMA_COMEXSTAT),
+        "harvard": (os.path.join(destino, HARVARD_PATH), SCHEMA_HARVARD),
+        "comtrade": (os.path.join(destino, COMTRADE_PATH), SCHEMA_COMTRADE),
+    }
+    escritores = {
+        base: pacsv.CSVWriter(caminho, schema, write_options=opcoes_csv)
+        for base, (caminho, schema) in caminhos_csv.items()
+    }
+    linhas = {"comexstat": 0, "comexstat_csv": 0, "harvard": 0, "comtrade": 0}
+    try:
+        for ano in anos:
+            df_fino = gerador.comexstat(ano, parametros["mensal"], parametros["municipal"])
+            df_anual = df_fino.groupby(
+                ["year", "state", "headingCode", "heading"], as_index=False, sort=False
+            )["metricFOB"].sum()
+            fob_brasil = (
+                df_anual.groupby("headingCode")["metricFOB"]
+                .sum()
+                .reindex(gerador.produtos["codigo"], fill_value=0)
+                .to_numpy(dtype=float)
+            )
+            df_harvard = gerador.harvard(ano, fob_brasil)
+            df_comtrade = gerador.comtrade(ano, df_harvard, parametros["mensal"])
+
+            for base, df, schema in (
+                ("comexstat", df_fino, schema_fino),
+                ("harvard", df_harvard, SCHEMA_HARVARD),
+                ("comtrade", df_comtrade, SCHEMA_COMTRADE),
+            ):
+                pq.write_to_dataset(
+                    _tabela(df, schema),
+                    os.path.join(pasta_parquet, base),
+                    partition_cols=particoes[base],
+                    existing_data_behavior="delete_matching",
+                )
+                linhas[base] += len(df)
+            escritores["comexstat"].write_table(_tabela(df_anual, SCHEMA_COMEXSTAT))
+            escritores["harvard"].write_table(_tabela(df_harvard, SCHEMA_HARVARD))
+            escritores["comtrade"].write_table(_tabela(df_comtrade, SCHEMA_COMTRADE))
+            linhas["comexstat_csv"] += len(df_anual)
+    finally:
+        for escritor in escritores.values():
+            escritor.close()
+
+    resumo = {
+        "escala": escala,
+        "semente": semente,
+        "anos": anos,
+        "mensal": parametros["mensal"],
+        "municipal": parametros["municipal"],
+        "produtos": len(gerador.produtos),
+        "linhas": linhas,
+        "destino": destino,
+        "segundos": round(time.perf_counter() - inicio, 2),
+    }
+    with open(os.path.join(destino, "manifesto.json"), "w", encoding="utf-8") as arquivo:
+        json.dump(resumo, arquivo, ensure_ascii=False, indent=2)
+    return resumo
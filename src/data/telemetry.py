@@ -0,0 +1,368 @@
+import contextvars
+import json
+import logging
+import os
+import statistics
+import time
+import uuid
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import MaxRetryError
+from urllib3.util.retry import Retry
+
+from core.config import CACHE_DIR
+
+logger = logging.getLogger("zpe")
+
+# Uma linha JSON por requisição (tipo "requisicao") e por rodada de atualização ("resumo")
+TELEMETRIA_PATH = os.path.join(CACHE_DIR, "telemetria", "ingestao.jsonl")
+
+# Novas tentativas em falhas de conexão e respostas 429/5xx (backoff exponencial)
+TENTATIVAS_PADRAO = 3
+BACKOFF_PADRAO = 1.0
+STATUS_REPETIR = (429, 500, 502, 503, 504)
+
+# Upstream lento: latência mediana da rodada acima de LIMIAR_LENTIDAO x a mediana
+# histórica da mesma fatia (com pelo menos MINIMO_HISTORICO medições anteriores)
+LIMIAR_LENTIDAO = 2.0
+MINIMO_HISTORICO = 3
+
+# Cabeçalhos de cache de CDN/proxy mais comuns (status de cache do upstream)
+CABECALHOS_CACHE = ("cf-cache-status", "x-cache", "x-cache-status", "age")
+
+_medicao_atual = contextvars.ContextVar("medicao_ingestao", default=None)
+_rodada_atual = contextvars.ContextVar("rodada_ingestao", default=None)
+
+
+# --- 1. MEDIÇÃO POR REQUISIÇÃO ---
+
+
+def _nova_medicao(fonte, endpoint, campos):
+    rodada = _rodada_atual.get()
+    return {
+        "tipo": "requisicao",
+        "rodada": None if rodada is None else rodada.id,
+        "quando": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "fonte": fonte,
+        "endpoint": endpoint,
+        "fatia": None,
+        "status": None,
+        "bytes_enviados": 0,
+        "bytes": 0,
+        "conexao_s": 0.0,
+        "ttfb_s": 0.0,
+        "transferencia_s": 0.0,
+        "latencia_s": None,
+        "tentativas": 0,
+        "linhas": None,
+        "cache": None,
+        "erro": None,
+        **campos,
+    }
+
+
+@contextmanager
+def medir(fonte, endpoint, **campos):
+    """
+    Mede uma requisição lógica de um cliente (pode envolver várias trocas HTTP e
+    novas tentativas). O dicionário devolvido aceita `linhas`, `cache` e `erro`;
+    a linha é gravada na saída do bloco. Aninhado em outro medir, reusa a medição
+    de fora (ex.: _make_request dentro de query_comexstat_data).
+    """
+    externa = _medicao_atual.get()
+    if externa is not None:
+        yield externa
+        return
+
+    medicao = _nova_medicao(fonte, endpoint, campos)
+    token = _medicao_atual.set(medicao)
+    inicio = time.perf_counter()
+    try:
+        yield medicao
+    except Exception as erro:
+        medicao["erro"] = medicao["erro"] or f"{type(erro).__name__}: {erro}"
+        raise
+    finally:
+        medicao["latencia_s"] = round(time.perf_counter() - inicio, 4)
+        for chave in ("conexao_s", "ttfb_s", "transferencia_s"):
+            if medicao[chave] is not None:
+                medicao[chave] = round(medicao[chave], 4)
+        _medicao_atual.reset(token)
+        registrar(medicao)
+
+
+def registrar_erro(erro):
+    """Anota o erro na medição atual (para clientes que tratam a exceção e seguem)."""
+    medicao = _medicao_atual.get()
+    if medicao is not None:
+        medicao["erro"] = f"{type(erro).__name__}: {erro}"
+
+
+def registrar(evento, caminho=None):
+    """Acrescenta um evento ao arquivo de métricas e à rodada atual (se houver)."""
+    caminho = caminho or TELEMETRIA_PATH
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    with open(caminho, "a", encoding="utf-8") as arquivo:
+        arquivo.write(json.dumps(evento, ensure_ascii=False) + "\n")
+    rodada = _rodada_atual.get()
+    if rodada is not None and evento.get("tipo") == "requisicao":
+        rodada.requisicoes.append(evento)
+
+
+# --- 2. SESSÃO HTTP INSTRUMENTADA (requests + urllib3) ---
+
+
+def _somar(chave, valor):
+    medicao = _medicao_atual.get()
+    if medicao is not None and medicao[chave] is not None:
+        medicao[chave] += valor
+
+
+class _ConexaoHTTP(HTTPConnection):
+    def connect(self):
+        inicio = time.perf_counter()
+        super().connect()
+        _somar("conexao_s", time.perf_counter() - inicio)
+
+
+class _ConexaoHTTPS(HTTPSConnection):
+    """Conexão TLS: o tempo de connect inclui o handshake."""
+
+    def connect(self):
+        inicio = time.perf_counter()
+        super().connect()
+        _somar("conexao_s", time.perf_counter() - inicio)
+
+
+class _PoolHTTP(HTTPConnectionPool):
+    ConnectionCls = _ConexaoHTTP
+
+
+class _PoolHTTPS(HTTPSConnectionPool):
+    ConnectionCls = _ConexaoHTTPS
+
+
+class AdaptadorInstrumentado(HTTPAdapter):
+    """
+    HTTPAdapter que preenche a medição atual (ver medir): tempo de conexão
+    (TCP + TLS, só em conexões novas), TTFB (envio até os cabeçalhos, sem a
+    conexão), transferência do corpo, bytes, status, tentativas e cabeçalhos de
+    cache. Fora de um bloco medir, funciona como um HTTPAdapter comum.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _PoolHTTP, "https": _PoolHTTPS}
+
+    def send(self, request, stream=False, **kwargs):
+        medicao = _medicao_atual.get()
+        if medicao is None:
+            return super().send(request, stream=stream, **kwargs)
+
+        conexao_antes = medicao["conexao_s"]
+        inicio = time.perf_counter()
+        try:
+            resposta = super().send(request, stream=stream, **kwargs)
+        except requests.RequestException as erro:
+            # Sem resposta (ex.: conexão recusada), o histórico de tentativas não
+            # volta: se o urllib3 esgotou as novas tentativas, foram total + 1
+            esgotou = bool(erro.args) and isinstance(erro.args[0], MaxRetryError)
+            total = getattr(self.max_retries, "total", None)
+            medicao["tentativas"] += 1 + (total if esgotou and total else 0)
+            raise
+        decorrido = time.perf_counter() - inicio
+
+        medicao["ttfb_s"] += max(0.0, decorrido - (medicao["conexao_s"] - conexao_antes))
+        medicao["bytes_enviados"] += len(request.body or b"")
+        medicao["status"] = resposta.status_code
+        retries = getattr(resposta.raw, "retries", None)
+        medicao["tentativas"] += 1 + (len(retries.history) if retries else 0)
+        for cabecalho in CABECALHOS_CACHE:
+            if cabecalho in resposta.headers:
+                medicao["cache"] = f"{cabecalho}: {resposta.headers[cabecalho]}"
+                break
+        if resposta.status_code == 304:
+            medicao["cache"] = "revalidado (304)"
+
+        # requests lê o corpo via iter_content (também em .content): mede ali
+        iter_original = resposta.iter_content
+
+        def iter_content(*args, **kwargs):
+            inicio_corpo = time.perf_counter()
+            try:
+                for pedaco in iter_original(*args, **kwargs):
+                    medicao["bytes"] += len(pedaco)
+                    yield pedaco
+            finally:
+                medicao["transferencia_s"] += time.perf_counter() - inicio_corpo
+
+        resposta.iter_content = iter_content
+        return resposta
+
+
+def sessao(tentativas=TENTATIVAS_PADRAO, backoff=BACKOFF_PADRAO):
+    """requests.Session com o adaptador instrumentado e novas tentativas."""
+    repetir = Retry(
+        total=tentativas,
+        backoff_factor=backoff,
+        status_forcelist=STATUS_REPETIR,
+        allowed_methods=None,  # inclui POST: as consultas do ComexStat são leituras
+        raise_on_status=False,
+        respect_retry_after_header=True,
+    )
+    adaptador = AdaptadorInstrumentado(max_retries=repetir)
+    cliente = requests.Session()
+    cliente.mount("https://", adaptador)
+    cliente.mount("http://", adaptador)
+    return cliente
+
+
+# --- 3. RODADA DE ATUALIZAÇÃO E RESUMO ---
+
+
+class Rodada:
+    def __init__(self, nome):
+        self.nome = nome
+        self.id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        self.requisicoes = []
+        self.resumo = None
+
+
+@contextmanager
+def rodada(nome, caminho=None):
+    """
+    Agrupa as requisições de uma atualização (ex.: main.py). Na saída, grava uma
+    linha "resumo" e deixa o resumo em `rodada.resumo` (ver formatar_resumo).
+    """
+    atual = Rodada(nome)
+    token = _rodada_atual.set(atual)
+    inicio = time.perf_counter()
+    try:
+        yield atual
+    finally:
+        _rodada_atual.reset(token)
+        atual.resumo = resumir(atual, time.perf_counter() - inicio, caminho)
+        registrar(atual.resumo, caminho)
+
+
+def _historico(caminho, rodada_id):
+    """Latências anteriores por (fonte, endpoint, fatia), de outras rodadas."""
+    latencias = {}
+    if not os.path.exists(caminho):
+        return latencias
+    with open(caminho, encoding="utf-8") as arquivo:
+        for linha in arquivo:
+            try:
+                evento = json.loads(linha)
+            except json.JSONDecodeError:
+                continue
+            if (
+                evento.get("tipo") == "requisicao"
+                and evento.get("rodada") != rodada_id
+                and not evento.get("erro")
+                and evento.get("latencia_s") is not None
+            ):
+                chave = (evento["fonte"], evento["endpoint"], evento.get("fatia"))
+                latencias.setdefault(chave, []).append(evento["latencia_s"])
+    return latencias
+
+
+def resumir(atual, duracao, caminho=None):
+    """
+    Resumo da rodada por fatia (fonte, endpoint, fatia), ordenado pela parcela do
+    tempo total, com as fatias que ficaram LIMIAR_LENTIDAO x mais lentas que o
+    histórico.
+    """
+    historico = _historico(caminho or TELEMETRIA_PATH, atual.id)
+    grupos = {}
+    for r in atual.requisicoes:
+        grupos.setdefault((r["fonte"], r["endpoint"], r["fatia"]), []).append(r)
+
+    def _soma(requisicoes, chave):
+        valores = [r[chave] for r in requisicoes if r[chave] is not None]
+        return round(sum(valores), 4) if valores else None
+
+    fatias = []
+    for (fonte, endpoint, fatia), requisicoes in grupos.items():
+        latencias = [r["latencia_s"] for r in requisicoes]
+        anteriores = historico.get((fonte, endpoint, fatia), [])
+        mediana_anterior = (
+            statistics.median(anteriores) if len(anteriores) >= MINIMO_HISTORICO else None
+        )
+        mediana = statistics.median(latencias)
+        fatias.append(
+            {
+                "fonte": fonte,
+                "endpoint": endpoint,
+                "fatia": fatia,
+                "requisicoes": len(requisicoes),
+                "latencia_s": round(sum(latencias), 4),
+                "parcela": round(sum(latencias) / duracao, 4) if duracao else None,
+                "conexao_s": _soma(requisicoes, "conexao_s"),
+                "ttfb_s": _soma(requisicoes, "ttfb_s"),
+                "transferencia_s": _soma(requisicoes, "transferencia_s"),
+                "bytes": _soma(requisicoes, "bytes"),
+                "linhas": _soma(requisicoes, "linhas"),
+                "novas_tentativas": sum(max(0, r["tentativas"] - 1) for r in requisicoes),
+                "erros": sum(1 for r in requisicoes if r["erro"]),
+                "mediana_historica_s": mediana_anterior,
+                "lenta": bool(mediana_anterior and mediana > LIMIAR_LENTIDAO * mediana_anterior),
+            }
+        )
+    fatias.sort(key=lambda f: f["latencia_s"], reverse=True)
+
+    for f in fatias:
+        if f["lenta"]:
+            logger.warning(
+                "Upstream lento: %s %s %s levou %.1fs (mediana histórica %.1fs)",
+                f["fonte"],
+                f["endpoint"],
+                f["fatia"] or "",
+                f["latencia_s"] / f["requisicoes"],
+                f["mediana_historica_s"],
+            )
+    return {
+        "tipo": "resumo",
+        "rodada": atual.id,
+        "nome": atual.nome,
+        "quando": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "duracao_s": round(duracao, 4),
+        "requisicoes": len(atual.requisicoes),
+        "erros": sum(f["erros"] for f in fatias),
+        "novas_tentativas": sum(f["novas_tentativas"] for f in fatias),
+        "bytes": sum(f["bytes"] or 0 for f in fatias),
+        "linhas": sum(f["linhas"] or 0 for f in fatias),
+        "fatias": fatias,
+    }
+
+
+def _segundos(valor):
+    return "-" if valor is None else f"{valor:.2f}"
+
+
+def formatar_resumo(resumo):
+    """Texto do resumo de uma rodada (tabela por fatia, das mais demoradas)."""
+    linhas = [
+        f"Rodada {resumo['nome']} ({resumo['rodada']}): {resumo['duracao_s']:.1f}s, "
+        f"{resumo['requisicoes']} requisições, {resumo['bytes'] / 2**20:.1f} MB, "
+        f"{resumo['linhas']} linhas, {resumo['novas_tentativas']} novas tentativas, "
+        f"{resumo['erros']} erros",
+        f"{'fonte':<10} {'endpoint':<28} {'fatia':<30} {'total s':>8} {'%':>5} "
+        f"{'conex s':>8} {'ttfb s':>8} {'transf s':>9} {'MB':>8} {'linhas':>9}",
+    ]
+    for f in resumo["fatias"]:
+        parcela = "-" if f["parcela"] is None else f"{f['parcela']:.0%}"
+        megabytes = "-" if f["bytes"] is None else f"{f['bytes'] / 2**20:.1f}"
+        alerta = "  LENTA" if f["lenta"] else ""
+        alerta += f"  {f['erros']} erro(s)" if f["erros"] else ""
+        linhas.append(
+            f"{f['fonte']:<10} {f['endpoint'][:28]:<28} {(f['fatia'] or '-')[:30]:<30} "
+            f"{f['latencia_s']:>8.2f} {parcela:>5} {_segundos(f['conexao_s']):>8} "
+            f"{_segundos(f['ttfb_s']):>8} {_segundos(f['transferencia_s']):>9} "
+            f"{megabytes:>8} {f['linhas'] if f['linhas'] is not None else '-':>9}{alerta}"
+        )
+    return "\n".join(linhas)
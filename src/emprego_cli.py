@@ -0,0 +1,58 @@
+"""
+Agrega arquivos da RAIS (vínculos ou estabelecimentos) em emprego por CNAE x município x ano.
+
+Uso (a partir da raiz do projeto):
+    python src/emprego_cli.py importar RAIS_VINC_PUB_NORDESTE.txt --ano 2022
+    python src/emprego_cli.py importar rais_estab_2022.parquet --tipo estabelecimentos
+    python src/emprego_cli.py resumo
+"""
+
+import argparse
+import logging
+
+from data.emprego import (
+    FATIAS_DIR,
+    TIPOS_ARQUIVO,
+    anos_disponiveis,
+    importar_arquivos,
+    ler_emprego,
+)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--store", default=FATIAS_DIR, help="Store de emprego (year=)")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    importar = comandos.add_parser("importar", help="Agrega arquivos CSV/Parquet da RAIS")
+    importar.add_argument("arquivos", nargs="+", help="Arquivos CSV (';') ou Parquet")
+    importar.add_argument("--tipo", choices=TIPOS_ARQUIVO, default="vinculos")
+    importar.add_argument("--ano", type=int, help="Ano (se o arquivo não tiver a coluna)")
+    importar.add_argument("--separador", default=";", help="Separador dos CSVs")
+
+    comandos.add_parser("resumo", help="Empregos por ano no store")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+
+    if args.comando == "importar":
+        resumo = importar_arquivos(
+            args.arquivos, args.tipo, args.ano, args.store, args.separador
+        )
+        for (nome, ano), linhas in sorted(resumo["linhas"].items()):
+            logging.info("%s/%s: %s linhas CNAE x município", nome, ano, linhas)
+        logging.info("Fatias gravadas em %s em %ss", resumo["destino"], resumo["segundos"])
+
+    for ano in anos_disponiveis(args.store):
+        df = ler_emprego(ano, diretorio=args.store)
+        logging.info(
+            "%s: %s empregos em %s UFs e %s classes CNAE",
+            ano,
+            int(df["Empregos"].sum()),
+            df["state"].nunique(),
+            df["cnae7"].nunique(),
+        )
+
+
+if __name__ == "__main__":
+    main()
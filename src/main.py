@@ -1,6 +1,8 @@
 import polars as pl
 import os
 
+from data import telemetry
+
 
 def comtrade():
     from data.comtrade import Comtrade
@@ -39,7 +41,8 @@ def harvard():
     return harvard_df
 
 
-def comexstat():
+def comexstat(mensal=False):
+    # Mês a mês (monthNumber), use src/mensal_cli.py, que grava um mês por partição
     from data.comexstat import Comexstat
 
     comex = Comexstat()
@@ -50,30 +53,37 @@ def comexstat():
         # filters=[{"filter": "state", "values": [23]}],
         metrics=["metricFOB"],
         details=["state", "heading"],
+        month_detail=mensal,
     )
     return comexstat_df
 
 
 if __name__ == "__main__":
-    # print("Comexstat schema:")
-    # comexstat_df = comexstat()
-    # print(comexstat_df.schema)
-    # comexstat_df.write_csv("resources/comexstat_data.csv")
-
-    # print("\nHarvard schema:")
-    # # harvard_df = pl.read_csv(
-    # #     "Dashboard-Base/harvard_data.csv",
-    # #     schema_overrides={"product_hs92_code": pl.Utf8},
-    # # )
-    # harvard_df = harvard()
-    # print(harvard_df.schema)
-    # harvard_df.write_csv("resources/harvard_data.csv")
-
-    print("\nComtrade schema:")
-    # comtrade_df = pl.read_csv("Dashboard-Base/comtrade_data.csv")
-    comtrade_df = comtrade()
-    print(comtrade_df.schema)
-    comtrade_df.write_csv("resources/comtrade_data.csv")
+    # Telemetria da atualização: uma linha por requisição e um resumo da rodada
+    # em data_cache/telemetria/ingestao.jsonl
+    with telemetry.rodada("atualizacao") as rodada:
+        # print("Comexstat schema:")
+        # comexstat_df = comexstat()
+        # print(comexstat_df.schema)
+        # comexstat_df.write_csv("resources/comexstat_data.csv")
+
+        # print("\nHarvard schema:")
+        # # harvard_df = pl.read_csv(
+        # #     "Dashboard-Base/harvard_data.csv",
+        # #     schema_overrides={"product_hs92_code": pl.Utf8},
+        # # )
+        # harvard_df = harvard()
+        # print(harvard_df.schema)
+        # harvard_df.write_csv("resources/harvard_data.csv")
+
+        print("\nComtrade schema:")
+        # comtrade_df = pl.read_csv("Dashboard-Base/comtrade_data.csv")
+        comtrade_df = comtrade()
+        print(comtrade_df.schema)
+        comtrade_df.write_csv("resources/comtrade_data.csv")
+
+    print()
+    print(telemetry.formatar_resumo(rodada.resumo))
 
 # # Convert columns to consistent data types
 # # Fix year columns - convert all to Int64
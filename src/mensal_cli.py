@@ -0,0 +1,56 @@
+"""
+Alimenta o store mensal do ComexStat e atualiza os roll-ups mensais, trimestrais, T12M e YTD.
+
+Uso (a partir da raiz do projeto):
+    python src/mensal_cli.py importar data_cache/sintetico/100x/parquet/comexstat
+    python src/mensal_cli.py baixar 2024-01 2024-03
+    python src/mensal_cli.py atualizar
+"""
+
+import argparse
+import logging
+
+from data.monthly import BRUTO_DIR, atualizar_rollups, baixar_meses, importar_parquet
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--store", default=BRUTO_DIR, help="Store bruto (year=/monthNumber=)")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    importar = comandos.add_parser("importar", help="Importa um dataset Parquet mensal local")
+    importar.add_argument("origem", help="Diretório Parquet (hive: year=/monthNumber=)")
+    importar.add_argument("--anos", nargs="+", type=int, help="Anos (padrão: todos)")
+
+    baixar = comandos.add_parser("baixar", help="Baixa meses da API do ComexStat")
+    baixar.add_argument("inicio", help="Primeiro mês (AAAA-MM)")
+    baixar.add_argument("fim", help="Último mês (AAAA-MM)")
+
+    comandos.add_parser("atualizar", help="Atualiza os roll-ups dos meses novos/alterados")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+
+    # Importar e baixar já atualizam os roll-ups em seguida
+    linhas = None
+    if args.comando == "importar":
+        linhas = importar_parquet(args.origem, args.store, args.anos)
+    elif args.comando == "baixar":
+        linhas = baixar_meses(args.inicio, args.fim, args.store)
+    if linhas is not None:
+        logging.info(
+            "%s mês(es) (%s linhas) gravados em %s", len(linhas), sum(linhas.values()), args.store
+        )
+
+    resumo = atualizar_rollups(args.store)
+    logging.info(
+        "Roll-ups em %s: %s mês(es) novo(s)/alterado(s), partições regravadas %s em %ss",
+        resumo["destino"],
+        len(resumo["meses_alterados"]),
+        resumo["particoes"],
+        resumo["segundos"],
+    )
+
+
+if __name__ == "__main__":
+    main()
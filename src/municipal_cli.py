@@ -0,0 +1,60 @@
+"""
+Alimenta o store municipal do ComexStat e gera os agregados de VCR da aba de municípios.
+
+Uso (a partir da raiz do projeto):
+    python src/municipal_cli.py importar data_cache/sintetico/municipal_mensal/parquet/comexstat
+    python src/municipal_cli.py baixar --anos 2022 2023 --ufs 23 26
+    python src/municipal_cli.py agregar
+"""
+
+import argparse
+import logging
+
+from data.municipal import (
+    AGREGADOS_DIR,
+    BRUTO_DIR,
+    agregar_vcr_municipal,
+    baixar_api,
+    importar_parquet,
+)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--store", default=BRUTO_DIR, help="Store bruto (Parquet por ano)")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    importar = comandos.add_parser("importar", help="Importa um dataset Parquet local")
+    importar.add_argument("origem", help="Diretório Parquet (hive: year=/monthNumber=)")
+    importar.add_argument("--anos", nargs="+", type=int, help="Anos (padrão: todos)")
+
+    baixar = comandos.add_parser("baixar", help="Baixa da API do ComexStat por UF e ano")
+    baixar.add_argument("--anos", nargs="+", type=int, required=True)
+    baixar.add_argument("--ufs", nargs="+", type=int, help="Códigos IBGE (padrão: todas)")
+    baixar.add_argument("--anual", action="store_true", help="Sem detalhamento mensal")
+
+    agregar = comandos.add_parser("agregar", help="Calcula a VCR municipal do store")
+    agregar.add_argument("--anos", nargs="+", type=int, help="Anos (padrão: todos)")
+    agregar.add_argument("--destino", default=AGREGADOS_DIR, help="Diretório dos agregados")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+
+    if args.comando == "importar":
+        linhas = importar_parquet(args.origem, args.store, args.anos)
+        logging.info("Importado para %s: linhas por ano %s", args.store, linhas)
+    elif args.comando == "baixar":
+        linhas = baixar_api(args.anos, args.ufs, args.store, mensal=not args.anual)
+        logging.info("Baixado para %s: %s fatias UF/ano", args.store, len(linhas))
+    else:
+        resumo = agregar_vcr_municipal(args.store, args.destino, args.anos)
+        logging.info(
+            "Agregados gravados em %s: linhas por ano %s em %ss",
+            resumo["destino"],
+            resumo["linhas"],
+            resumo["segundos"],
+        )
+
+
+if __name__ == "__main__":
+    main()
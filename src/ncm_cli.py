@@ -0,0 +1,56 @@
+"""
+Alimenta o store NCM-8 do ComexStat e constrói a tabela de fatos do drill-down HS4 -> NCM.
+
+Uso (a partir da raiz do projeto):
+    python src/ncm_cli.py importar caminho/para/parquet_ncm
+    python src/ncm_cli.py baixar 2022 2023
+    python src/ncm_cli.py construir
+"""
+
+import argparse
+import logging
+
+from data.ncm import BRUTO_DIR, FATOS_PATH, baixar_anos, construir_fatos, importar_parquet
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--store", default=BRUTO_DIR, help="Store bruto (year=)")
+    parser.add_argument("--fatos", default=FATOS_PATH, help="Tabela de fatos de saída")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    importar = comandos.add_parser("importar", help="Importa um dataset Parquet NCM local")
+    importar.add_argument("origem", help="Diretório Parquet (hive: year=)")
+    importar.add_argument("--anos", nargs="+", type=int, help="Anos (padrão: todos)")
+
+    baixar = comandos.add_parser("baixar", help="Baixa anos da API do ComexStat")
+    baixar.add_argument("anos", nargs="+", type=int)
+
+    comandos.add_parser("construir", help="Reconstrói a tabela de fatos a partir do store")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+
+    # Importar e baixar já reconstroem a tabela de fatos em seguida
+    linhas = None
+    if args.comando == "importar":
+        linhas = importar_parquet(args.origem, args.store, args.anos)
+    elif args.comando == "baixar":
+        linhas = baixar_anos(args.anos, args.store)
+    if linhas is not None:
+        logging.info(
+            "%s ano(s) (%s linhas) gravados em %s", len(linhas), sum(linhas.values()), args.store
+        )
+
+    resumo = construir_fatos(args.store, args.fatos)
+    logging.info(
+        "Tabela de fatos %s: %s linhas, %s posições HS4 em %ss",
+        resumo["destino"],
+        resumo["linhas"],
+        resumo["posicoes"],
+        resumo["segundos"],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Gera o cubo de rankings (estado x ano x preset de pesos) sem abrir o dashboard.
+
+Uso (a partir da raiz do projeto):
+    python src/ranking_cli.py
+    python src/ranking_cli.py --anos 2023 --presets padrao complexidade --workers 4
+"""
+
+import argparse
+import logging
+
+from core.config import PRESETS_PESOS
+from data.ranking_cube import RANKING_CUBE_DIR, carregar_bases, gerar_cubo_rankings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--estados", nargs="+", help="UFs como no ComexStat (padrão: todas)")
+    parser.add_argument("--anos", nargs="+", type=int, help="Anos (padrão: todos)")
+    parser.add_argument(
+        "--presets",
+        nargs="+",
+        choices=sorted(PRESETS_PESOS),
+        help="Presets de pesos (padrão: todos)",
+    )
+    parser.add_argument("--destino", default=RANKING_CUBE_DIR, help="Diretório do cubo Parquet")
+    parser.add_argument("--workers", type=int, help="Processos (padrão: nº de CPUs)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+
+    comexstat_df, harvard_df = carregar_bases()
+    resumo = gerar_cubo_rankings(
+        comexstat_df,
+        harvard_df,
+        estados=args.estados,
+        anos=args.anos,
+        presets=args.presets,
+        destino=args.destino,
+        workers=args.workers,
+    )
+    logging.info(
+        "Cubo gravado em %s: %s linhas (%s estados, anos %s, presets %s) em %ss",
+        resumo["destino"],
+        resumo["linhas"],
+        resumo["estados"],
+        resumo["anos"],
+        resumo["presets"],
+        resumo["segundos"],
+    )
+
+
+if __name__ == "__main__":
+    main()
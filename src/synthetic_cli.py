@@ -0,0 +1,49 @@
+"""
+Gera bases sintéticas (ComexStat, Harvard, Comtrade) determinísticas, em escala.
+
+Uso (a partir da raiz do projeto):
+    python src/synthetic_cli.py --escala 10x
+    python src/synthetic_cli.py --escala municipal_mensal --semente 7 --destino /tmp/zpe
+
+Depois, para rodar o dashboard/API/CLIs sobre a base gerada:
+    cd data_cache/sintetico/10x && streamlit run ../../../src/App.py
+"""
+
+import argparse
+import logging
+
+from data.synthetic import ANO_FINAL_PADRAO, ESCALAS, SEMENTE_PADRAO, gerar_bases_sinteticas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--escala", choices=list(ESCALAS), default="1x")
+    parser.add_argument("--semente", type=int, default=SEMENTE_PADRAO)
+    parser.add_argument("--ano-final", type=int, default=ANO_FINAL_PADRAO)
+    parser.add_argument(
+        "--destino", help="Diretório de saída (padrão: data_cache/sintetico/<escala>)"
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+
+    resumo = gerar_bases_sinteticas(
+        escala=args.escala,
+        semente=args.semente,
+        destino=args.destino,
+        ano_final=args.ano_final,
+    )
+    logging.info(
+        "Bases sintéticas (%s, semente %s, anos %s-%s) em %s: %s em %ss",
+        resumo["escala"],
+        resumo["semente"],
+        resumo["anos"][0],
+        resumo["anos"][-1],
+        resumo["destino"],
+        resumo["linhas"],
+        resumo["segundos"],
+    )
+
+
+if __name__ == "__main__":
+    main()